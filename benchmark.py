@@ -0,0 +1,303 @@
+"""Throughput and memory benchmarks that run without SQL Server.
+
+    python benchmark.py --rows 100000 --columns 12 -o report.json
+    python benchmark.py --rows 100000 --columns 12 -o after.json --compare report.json
+
+The engine is pointed at fake_odbc, an in-process driver serving synthetic
+tables, and each scenario replays what one GUI action does, minus the Tk
+widget calls: view_table and execute_query fetch, format and spool every
+row as the result grid does when scrolled to the end, view_paged walks the
+pager, insert_row/insert_rows/import_file are the Insert tab paths,
+export_* the Export button and copy_table Copy Table into another
+database. Every scenario is timed ``--repeat`` times (the median counts)
+and then run once more under tracemalloc for peak memory. The JSON report
+records the parameters, so reports made with the same options on
+different versions can be compared with ``--compare``.
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import connection_pool
+import fake_odbc
+from db_engine import DatabaseEngine
+from fan_out import Target
+from formatters import row_formatter
+from instrumentation import Instrumentation, current_operation, set_current_operation
+from result_grid import RowSpool
+
+
+TABLE_NAME = "BenchmarkRows"
+SCENARIOS = (
+    "view_table", "view_paged", "execute_query", "export_csv", "export_jsonl",
+    "insert_row", "insert_rows", "import_file", "copy_table",
+)
+COPY_TABLE_NAME = "BenchmarkCopy"
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        fake_odbc.server = fake_odbc.Server(latency=args.latency / 1000)
+        self.table = fake_odbc.server.add_table(TABLE_NAME, args.rows, args.columns)
+        fake_odbc.server.add_table(COPY_TABLE_NAME, 0, args.columns)
+        connection_pool.driver = fake_odbc
+        self.engine = DatabaseEngine(pool_size=1)
+        self.engine.connect("benchmark", "benchmark")
+        self.instrumentation = Instrumentation()
+        self.directory = tempfile.mkdtemp(prefix="db-benchmark-")
+        self.import_path = os.path.join(self.directory, "import.csv")
+        self.text_rows = self._text_rows(min(args.rows, args.insert_rows))
+        self._write_import_file()
+
+    def close(self):
+        self.engine.close()
+        connection_pool.driver = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run(self, name):
+        func = getattr(self, name)
+        seconds = []
+        for _ in range(self.args.repeat):
+            fake_odbc.server.reset_counters()
+            started = time.perf_counter()
+            rows, operation = self._run_once(name, func)
+            seconds.append(time.perf_counter() - started)
+        round_trips = fake_odbc.server.round_trips
+
+        tracemalloc.start()
+        try:
+            self._run_once(name, func)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        median = statistics.median(seconds)
+        return {
+            "rows": rows,
+            "seconds": round(median, 4),
+            "best_seconds": round(min(seconds), 4),
+            "rows_per_sec": round(rows / median) if median > 0 else None,
+            "peak_memory_kib": round(peak / 1024),
+            "round_trips": round_trips,
+            "phases_ms": {phase: round(value * 1000, 1) for phase, value in operation.timings.items()},
+        }
+
+    def _run_once(self, name, func):
+        # The scenario's connect/execute/fetch/render times go to the operation
+        operation = self.instrumentation.begin(name, name)
+        set_current_operation(operation)
+        try:
+            rows = func()
+        finally:
+            set_current_operation(None)
+        operation.finish()
+        return rows, operation
+
+    # Scenarios; each returns the number of rows it handled
+
+    def view_table(self):
+        return self._load_grid(self.engine.open_table(TABLE_NAME))
+
+    def execute_query(self):
+        cursor = self.engine.open_query(f"SELECT * FROM [{TABLE_NAME}] WHERE 1 = 1")
+        return self._load_grid(cursor, cache_query="execute_query")
+
+    def view_paged(self):
+        pager = self.engine.open_pager(TABLE_NAME, page_size=self.args.page_size)
+        rows = 0
+        for page in range(self.args.pages):
+            description, page_rows = self.engine.fetch_page(pager, page)
+            pager.page_loaded(page, description, page_rows)
+            self._render(row_formatter(description), page_rows)
+            rows += len(page_rows)
+            if not pager.has_next:
+                break
+        return rows
+
+    def export_csv(self):
+        return self._export("csv")
+
+    def export_jsonl(self):
+        return self._export("jsonl")
+
+    def insert_row(self):
+        columns = self.engine.columns(TABLE_NAME)[1:]
+        count = min(self.args.rows, self.args.single_inserts)
+        for row in self.table.generate(0, count):
+            self.engine.insert_row(TABLE_NAME, {column.name: value for column, value in zip(columns, row[1:])})
+        return count
+
+    def insert_rows(self):
+        inserted, errors = self.engine.insert_rows(TABLE_NAME, self.engine.columns(TABLE_NAME), self.text_rows)
+        if errors:
+            raise RuntimeError(f"insert_rows rejected {len(errors)} rows: {next(iter(errors.values()))}")
+        return inserted
+
+    def import_file(self):
+        result = self.engine.import_file(TABLE_NAME, self.import_path, batch_size=self.args.batch_size)
+        if result.rows_rejected:
+            raise RuntimeError(f"import_file rejected {result.rows_rejected} rows")
+        return result.rows_inserted
+
+    def copy_table(self):
+        result = self.engine.copy_table(
+            Target("benchmark", "benchmark_copy"), COPY_TABLE_NAME, TABLE_NAME, batch_size=self.args.batch_size
+        )
+        return result.rows_copied
+
+    # Helpers
+
+    def _load_grid(self, cursor, cache_query=None):
+        # VirtualResultGrid.fetch_more() and render() without the Treeview
+        try:
+            format_rows = row_formatter(cursor.description)
+            spool = RowSpool()
+            size = self.args.fetch_size
+            while True:
+                rows = cursor.fetchmany(size)
+                self._render(format_rows, rows, spool)
+                if len(rows) < size:
+                    break
+        finally:
+            cursor.close()
+        count = len(spool)
+        if cache_query is not None and count <= self.engine.result_cache.max_rows:
+            self.engine.result_cache.put(self.engine.target, cache_query, cursor.description,
+                                         spool.get_rows(0, count))
+        spool.close()
+        return count
+
+    def _render(self, format_rows, rows, spool=None):
+        # Formatting plus reading back the visible window counts as render time
+        started = time.perf_counter()
+        rows = format_rows(rows)
+        if spool is not None:
+            spool.append(rows)
+            spool.get_rows(max(len(spool) - self.args.visible_rows, 0), len(spool))
+        current_operation().add_time("render", time.perf_counter() - started)
+
+    def _export(self, fmt):
+        path = os.path.join(self.directory, f"export.{fmt}")
+        result = self.engine.export(f"SELECT * FROM [{TABLE_NAME}]", path, fmt)
+        os.remove(path)
+        return result.rows
+
+    def _text_rows(self, count):
+        format_rows = row_formatter(self.table.description)
+        return [list(row) for row in format_rows(list(self.table.generate(0, count)))]
+
+    def _write_import_file(self):
+        format_rows = row_formatter(self.table.description)
+        with open(self.import_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([column[0] for column in self.table.description])
+            for start in range(0, self.args.rows, 10000):
+                writer.writerows(format_rows(list(self.table.generate(start, min(start + 10000, self.args.rows)))))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, report):
+    # Positive throughput change is faster, positive memory change is larger
+    def workload(parameters):
+        return {name: value for name, value in (parameters or {}).items() if name != "repeat"}
+
+    if workload(baseline.get("parameters")) != workload(report.get("parameters")):
+        print("Warning: the reports were made with different parameters", file=sys.stderr)
+    print(f"{'scenario':<16}{'rows/sec before':>18}{'after':>14}{'change':>9}{'peak KiB before':>18}{'after':>10}")
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            print(f"{name:<16}{'-':>18}{result['rows_per_sec'] or 0:>14,}")
+            continue
+        change = ""
+        if old["rows_per_sec"] and result["rows_per_sec"]:
+            change = f"{(result['rows_per_sec'] / old['rows_per_sec'] - 1) * 100:+.1f}%"
+        print(
+            f"{name:<16}{old['rows_per_sec'] or 0:>18,}{result['rows_per_sec'] or 0:>14,}{change:>9}"
+            f"{old['peak_memory_kib']:>18,}{result['peak_memory_kib']:>10,}"
+        )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the engine against a synthetic in-process driver")
+    parser.add_argument("--rows", type=int, default=50000, help="rows in the synthetic table")
+    parser.add_argument("--columns", type=int, default=10, help="columns in the synthetic table")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated milliseconds per round trip")
+    parser.add_argument("--fetch-size", type=int, default=500, help="rows per fetch, as in the result grid")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=50, help="pages walked by view_paged")
+    parser.add_argument("--visible-rows", type=int, default=40, help="rows read back per render")
+    parser.add_argument("--batch-size", type=int, default=5000, help="import and copy batch size")
+    parser.add_argument("--single-inserts", type=int, default=1000, help="rows inserted one by one by insert_row")
+    parser.add_argument("--insert-rows", type=int, default=1000, help="rows sent at once by insert_rows")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="run only these scenarios")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with an earlier JSON report")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    benchmark = Benchmark(args)
+    results = {}
+    try:
+        for name in args.only or SCENARIOS:
+            results[name] = result = benchmark.run(name)
+            print(
+                f"{name:<16}{result['rows']:>10,} rows {result['seconds'] * 1000:>10,.1f} ms "
+                f"{result['rows_per_sec'] or 0:>12,} rows/sec {result['peak_memory_kib']:>10,} KiB peak",
+                file=sys.stderr
+            )
+    finally:
+        benchmark.close()
+
+    parameters = {
+        name: getattr(args, name)
+        for name in ("rows", "columns", "repeat", "latency", "fetch_size", "page_size", "pages",
+                     "visible_rows", "batch_size", "single_inserts", "insert_rows")
+    }
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import csv
+import itertools
+import os
+import time
+from collections import namedtuple
+
+from converters import convert_columns, converter_for
+from table_pager import quote_name
+
+
+ImportResult = namedtuple(
+    "ImportResult",
+    ["rows_read", "rows_inserted", "rows_rejected", "elapsed", "reject_path", "cancelled"]
+)
+
+# Opens a transaction if the last commit closed it, then marks a savepoint so
+# a failing batch can be undone without losing earlier uncommitted batches
+SAVEPOINT_SQL = "IF @@TRANCOUNT = 0 BEGIN TRANSACTION; SAVE TRANSACTION insert_batch"
+ROLLBACK_SAVEPOINT_SQL = "ROLLBACK TRANSACTION insert_batch"
+
+
+def build_insert_query(table_name, names):
+    return (
+        f"INSERT INTO {quote_name(table_name)} "
+        f"({', '.join(quote_name(name) for name in names)}) "
+        f"VALUES ({', '.join('?' * len(names))})"
+    )
+
+
+def insert_rows(cursor, query, converted):
+    """Insert ``(index, row)`` pairs with one executemany() call.
+
+    If the server refuses the batch it is rolled back to a savepoint and the
+    rows are retried one at a time, so a bad row never costs the others.
+    Returns the inserted count and ``[(index, error), ...]`` for failed rows.
+    The caller commits.
+    """
+    if not converted:
+        return 0, []
+
+    params = [row for _, row in converted]
+    cursor.execute(SAVEPOINT_SQL)
+    try:
+        cursor.executemany(query, params)
+        return len(params), []
+    except Exception:
+        cursor.execute(ROLLBACK_SAVEPOINT_SQL)
+
+    # Retry row by row to isolate the rows the server refuses
+    inserted = 0
+    failed = []
+    for index, row in converted:
+        cursor.execute(SAVEPOINT_SQL)
+        try:
+            cursor.execute(query, row)
+            inserted += 1
+        except Exception as e:
+            cursor.execute(ROLLBACK_SAVEPOINT_SQL)
+            failed.append((index, e))
+    return inserted, failed
+
+
+def insert_text_rows(connection, table_name, columns, rows):
+    """Insert rows of text values (one per ColumnInfo) in one transaction.
+
+    Each column is converted once for the whole set; columns that are blank
+    in every row are left out so their defaults apply. Returns the inserted
+    count and a dict mapping row index to the error for rows that failed.
+    """
+    keep = [index for index, _ in enumerate(columns) if any(row[index].strip() for row in rows)]
+    if not keep:
+        raise ValueError("Please enter at least one value!")
+    names = [columns[index].name for index in keep]
+    converters = [converter_for(columns[index].data_type) for index in keep]
+    converted, errors = convert_columns([[row[index] for index in keep] for row in rows], names, converters)
+
+    cursor = connection.cursor()
+    cursor.fast_executemany = True
+    inserted, failed = insert_rows(cursor, build_insert_query(table_name, names), converted)
+    connection.commit()
+    errors.update(failed)
+    return inserted, errors
+
+
+def detect_delimiter(path):
+    extension = os.path.splitext(path)[1].lower()
+    return '\t' if extension in ('.tsv', '.tab') else ','
+
+
+class BulkImporter:
+    """Streams a delimited text file into a table in fixed-size batches.
+
+    The file is read with csv.reader and consumed ``batch_size`` rows at a
+    time, so memory use does not depend on the file size. The first line must
+    be a header naming table columns; values are converted with the converter
+    of each column's SQL type and loaded with fast_executemany. Records whose
+    field count differs from the header's, rows that fail conversion and rows
+    rejected by the server are written, with the reason, to a reject file
+    next to the source.
+    """
+
+    def __init__(self, pool, table_name, columns, batch_size=5000, commit_interval=50000,
+                 delimiter=None, encoding='utf-8-sig', progress=None, cancel_event=None):
+        self.pool = pool
+        self.table_name = table_name
+        self.columns = {column.name.lower(): column for column in columns}
+        self.batch_size = batch_size
+        self.commit_interval = max(commit_interval, batch_size)
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+        self.reject_path = None
+        self.reject_file = None
+        self.reject_writer = None
+
+    def run(self, path):
+        delimiter = self.delimiter or detect_delimiter(path)
+        self.reject_path = os.path.splitext(path)[0] + ".rejects.csv"
+        self.file_size = os.path.getsize(path) or 1
+        self.chars_read = 0
+        started = time.perf_counter()
+        rows_read = rows_inserted = rows_rejected = 0
+        cancelled = False
+
+        with open(path, newline='', encoding=self.encoding) as source:
+            reader = csv.reader(self._count_chars(source), delimiter=delimiter)
+            header = next(reader, None)
+            if not header:
+                raise ValueError("The file is empty or has no header row")
+            names, positions = self._map_header(header)
+            converters = [converter_for(self.columns[name.lower()].data_type) for name in names]
+            query = build_insert_query(self.table_name, names)
+
+            try:
+                with self.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.fast_executemany = True
+                    uncommitted = 0
+
+                    while True:
+                        if self.cancel_event is not None and self.cancel_event.is_set():
+                            cancelled = True
+                            break
+
+                        raw = list(itertools.islice(reader, self.batch_size))
+                        if not raw:
+                            break
+                        first_record = rows_read + 2
+                        rows_read += len(raw)
+
+                        converted, rejects = self._convert(raw, len(header), positions, names, converters)
+                        for index, error in rejects.items():
+                            self._reject(header, raw[index], first_record + index, error)
+
+                        inserted, failed = insert_rows(cursor, query, converted)
+                        for index, error in failed:
+                            self._reject(header, raw[index], first_record + index, error)
+                        rows_inserted += inserted
+                        rows_rejected += len(rejects) + len(failed)
+
+                        uncommitted += inserted
+                        if uncommitted >= self.commit_interval:
+                            conn.commit()
+                            uncommitted = 0
+
+                        self._report(rows_read, rows_inserted, rows_rejected, started)
+
+                    conn.commit()
+            finally:
+                if self.reject_file is not None:
+                    self.reject_file.close()
+
+        return ImportResult(
+            rows_read,
+            rows_inserted,
+            rows_rejected,
+            time.perf_counter() - started,
+            self.reject_path if rows_rejected else None,
+            cancelled
+        )
+
+    def _map_header(self, header):
+        names = []
+        positions = []
+        unknown = []
+        for position, title in enumerate(header):
+            column = self.columns.get(title.strip().lower())
+            if column is None:
+                unknown.append(title)
+            elif not column.is_identity:
+                names.append(column.name)
+                positions.append(position)
+        if unknown:
+            raise ValueError(f"Columns not found in {self.table_name}: {', '.join(unknown)}")
+        if not names:
+            raise ValueError("The file has no insertable columns")
+        return names, positions
+
+    def _convert(self, raw, width, positions, names, converters):
+        # Records with more or fewer fields than the header are rejected
+        # whole rather than padded; indexes in the result refer to raw
+        rejects = {
+            index: ValueError(f"expected {width} fields, found {len(row)}")
+            for index, row in enumerate(raw) if len(row) != width
+        }
+        indexes = [index for index in range(len(raw)) if index not in rejects]
+        rows = [[raw[index][pos] for pos in positions] for index in indexes]
+        converted, failed = convert_columns(rows, names, converters)
+        rejects.update((indexes[index], error) for index, error in failed.items())
+        return [(indexes[index], row) for index, row in converted], rejects
+
+    def _count_chars(self, lines):
+        # Characters approximate bytes closely enough for a progress bar
+        for line in lines:
+            self.chars_read += len(line)
+            yield line
+
+    def _reject(self, header, row, record_number, error):
+        if self.reject_writer is None:
+            self.reject_file = open(self.reject_path, 'w', newline='', encoding='utf-8')
+            self.reject_writer = csv.writer(self.reject_file)
+            self.reject_writer.writerow(["record"] + header + ["error"])
+        self.reject_writer.writerow([record_number] + list(row) + [str(error)])
+
+    def _report(self, rows_read, rows_inserted, rows_rejected, started):
+        if self.progress is not None:
+            elapsed = time.perf_counter() - started
+            fraction = min(self.chars_read / self.file_size, 1.0)
+            self.progress(rows_read, rows_inserted, rows_rejected, elapsed, fraction)
@@ -0,0 +1,182 @@
+import re
+
+from converters import converter_for
+from grid_filter import typed_parameter
+from lob_preview import is_lob
+from table_pager import quote_name
+
+
+# Columns whose values cannot be compared or are not reliably read back
+UNCOMPARABLE_TYPES = ("text", "ntext", "image", "xml", "geography", "geometry",
+                      "hierarchyid", "sql_variant", "datetimeoffset")
+READ_ONLY_TYPES = ("timestamp", "rowversion")
+# SQL Server accepts at most 2100 parameters per batch
+MAX_PARAMS_PER_BATCH = 2000
+CONFLICT_PATTERN = re.compile(r"change-set conflict (\d+)")
+
+
+class ConcurrencyError(Exception):
+    def __init__(self, key, action):
+        super().__init__(
+            f"Row {key!r} was changed or deleted by someone else since it was loaded; "
+            f"its {action} was not saved and nothing else was either"
+        )
+        self.key = key
+
+
+def is_editable(column):
+    return not (column.is_identity or is_lob(column) or column.data_type.lower() in READ_ONLY_TYPES)
+
+
+def is_comparable(column):
+    data_type = column.data_type.lower()
+    # Python datetimes stop at microseconds, so 100ns values never compare equal
+    if data_type in ("datetime2", "time") and (column.scale is None or column.scale > 6):
+        return False
+    return not is_lob(column) and data_type not in UNCOMPARABLE_TYPES
+
+
+class ChangeSet:
+    """Pending edits and deletes of one table's rows, keyed by primary key.
+
+    Every change remembers the values the row had when it was loaded.
+    apply() writes all of them in one transaction; each statement only
+    matches the row if those values are still there (the rowversion column
+    if the table has one, else the changed columns for an update and every
+    comparable column for a delete), so a row changed by someone else in the
+    meantime rolls the whole set back instead of being overwritten.
+    """
+
+    def __init__(self, table_name, columns, key_columns):
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.by_name = {column.name: column for column in self.columns}
+        self.positions = {column.name: index for index, column in enumerate(self.columns)}
+        self.version_column = next(
+            (column for column in self.columns if column.data_type.lower() in READ_ONLY_TYPES), None
+        )
+        # key -> {column name: new value}, key -> original row values, keys to delete
+        self.updates = {}
+        self.originals = {}
+        self.deletes = set()
+
+    def __len__(self):
+        return len(self.updates) + len(self.deletes)
+
+    def key_of(self, raw):
+        return tuple(raw[self.positions[name]] for name in self.key_columns)
+
+    def edit(self, raw, column_name, text):
+        # Convert the text for the column and record it; raises ValueError
+        column = self.by_name[column_name]
+        if column_name in self.key_columns:
+            raise ValueError(f"{column_name} is part of the primary key and cannot be edited")
+        if not is_editable(column):
+            raise ValueError(f"{column_name} ({column.data_type}) cannot be edited here")
+        key = self.key_of(raw)
+        if key in self.deletes:
+            raise ValueError("The row is marked for deletion")
+        value = converter_for(column.data_type)(text)
+        if value is None and not column.is_nullable:
+            raise ValueError(f"{column_name} does not allow NULL")
+        self.originals.setdefault(key, tuple(raw))
+        self.updates.setdefault(key, {})[column_name] = value
+        return key, value
+
+    def delete(self, raw):
+        key = self.key_of(raw)
+        self.originals.setdefault(key, tuple(raw))
+        self.updates.pop(key, None)
+        self.deletes.add(key)
+        return key
+
+    def revert(self, key):
+        self.updates.pop(key, None)
+        self.deletes.discard(key)
+        self.originals.pop(key, None)
+
+    def clear(self):
+        self.updates.clear()
+        self.originals.clear()
+        self.deletes.clear()
+
+    def statements(self):
+        """Yield (sql, params, key, action) for every pending change; each
+        statement fails the batch with a numbered error unless it touches
+        exactly one row."""
+        table = quote_name(self.table_name)
+        for key, values in self.updates.items():
+            assignments = ", ".join(f"{quote_name(name)} = ?" for name in values)
+            where, params = self._match(key, values)
+            yield f"UPDATE {table} SET {assignments} WHERE {where}", list(values.values()) + params, key, "update"
+        for key in self.deletes:
+            where, params = self._match(key, None)
+            yield f"DELETE FROM {table} WHERE {where}", params, key, "delete"
+
+    def batches(self, max_params=MAX_PARAMS_PER_BATCH):
+        # Statements grouped into batches of up to max_params parameters
+        sql, params, keys = [], [], []
+        for statement, values, key, action in self.statements():
+            if sql and len(params) + len(values) > max_params:
+                yield self._batch(sql), params, keys
+                sql, params, keys = [], [], []
+            sql.append(
+                f"{statement};\nIF @@ROWCOUNT <> 1 THROW 50001, 'change-set conflict {len(keys)}', 1;"
+            )
+            params.extend(values)
+            keys.append((key, action))
+        if sql:
+            yield self._batch(sql), params, keys
+
+    def apply(self, connection):
+        """Run every batch on the connection and commit; on any failure the
+        transaction is rolled back and the change set is left as it was."""
+        cursor = connection.cursor()
+        try:
+            for sql, params, keys in self.batches():
+                try:
+                    cursor.execute(sql, params)
+                    while cursor.nextset():
+                        pass
+                except Exception as e:
+                    conflict = CONFLICT_PATTERN.search(str(e))
+                    if conflict is not None:
+                        key, action = keys[int(conflict.group(1))]
+                        raise ConcurrencyError(key, action) from e
+                    raise
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        updated, deleted = len(self.updates), len(self.deletes)
+        self.clear()
+        return updated, deleted
+
+    def _batch(self, statements):
+        return "SET NOCOUNT ON;\n" + "\n".join(statements)
+
+    def _match(self, key, values):
+        original = self.originals[key]
+        terms, params = [], []
+        for name, value in zip(self.key_columns, key):
+            terms.append(f"{quote_name(name)} = {typed_parameter(self.by_name[name])}")
+            params.append(value)
+        if self.version_column is not None:
+            checked = [self.version_column]
+        elif values is not None:
+            checked = [self.by_name[name] for name in values]
+        else:
+            checked = [column for column in self.columns if column.name not in self.key_columns]
+        for column in checked:
+            if not is_comparable(column):
+                continue
+            value = original[self.positions[column.name]]
+            if value is None:
+                terms.append(f"{quote_name(column.name)} IS NULL")
+            else:
+                terms.append(f"{quote_name(column.name)} = {typed_parameter(column)}")
+                params.append(value)
+        return " AND ".join(terms), params
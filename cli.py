@@ -0,0 +1,174 @@
+"""Command-line batch mode: run queries and scripts, export and import without Tk.
+
+    python database_gui.py --cli query -S server -d db -q "SELECT ..." -o out.csv
+    python database_gui.py --cli query -S server -d db -f deploy.sql
+    python database_gui.py --cli import -S server -d db -t Orders orders.csv
+
+Results go to stdout (CSV or JSON Lines) or to a CSV/JSONL/Parquet file;
+timings go to stderr. The exit code is 0 on success and 1 if any batch,
+import row or connection failed.
+"""
+import argparse
+import os
+import sys
+import time
+
+from db_engine import DatabaseEngine
+from result_export import WRITERS, format_for_path
+from script_runner import split_batches
+
+
+def _log(args, message):
+    if not args.quiet:
+        print(message, file=sys.stderr)
+
+
+def _output_path(output, index):
+    # Result sets after the first go to numbered files next to the first one
+    if output == "-" or index == 1:
+        return output
+    root, extension = os.path.splitext(output)
+    return f"{root}_{index}{extension}"
+
+
+def run_query(engine, args):
+    if args.file:
+        with open(args.file, encoding=args.encoding) as f:
+            script = f.read()
+    else:
+        script = args.query
+    batches = split_batches(script)
+    if not batches:
+        _log(args, "Nothing to run")
+        return 1
+
+    fmt = args.format or (format_for_path(args.output) if args.output != "-" else "csv")
+    # Rows per result set; writers stay open only while their result set streams
+    counts = {}
+    writers = {}
+
+    def on_result_set(key, description):
+        counts[key] = 0
+        writers[key] = WRITERS[fmt](_output_path(args.output, len(counts)), description)
+
+    def on_rows(key, rows, done):
+        # The last fetch of a result set can come back empty
+        if rows:
+            writers[key].write(rows)
+            counts[key] += len(rows)
+        if done:
+            writers.pop(key).close()
+
+    def on_batch_finished(result):
+        returned = sum(count for key, count in counts.items() if key[0] == result.number)
+        _log(args, (
+            f"Batch {result.number} (line {result.line}): {result.elapsed * 1000:,.0f} ms, "
+            f"{result.result_sets} result sets, {returned:,} rows returned, "
+            f"{result.rows_affected:,} rows affected"
+        ))
+        for message in result.messages:
+            _log(args, f"    {message}")
+        if result.error is not None:
+            print(f"Batch {result.number} (line {result.line}) failed: {result.error}", file=sys.stderr)
+
+    runner = engine.script_runner(
+        batches,
+        stop_on_error=not args.continue_on_error,
+        fetch_size=args.batch_size,
+        on_result_set=on_result_set,
+        on_rows=on_rows,
+        on_batch_finished=on_batch_finished
+    )
+    try:
+        result = runner.run()
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    rows = sum(counts.values())
+    rate = rows / result.elapsed if result.elapsed > 0 else 0
+    _log(args, (
+        f"{result.batches_run} batches, {result.batches_failed} failed, {rows:,} rows "
+        f"in {result.elapsed:.2f}s ({rate:,.0f} rows/sec)"
+    ))
+    return 1 if result.batches_failed else 0
+
+
+def run_import(engine, args):
+    def progress(rows_read, inserted, rejected, elapsed, fraction):
+        _log(args, f"{fraction * 100:5.1f}%  {inserted:,} rows inserted, {rejected:,} rejected")
+
+    result = engine.import_file(
+        args.table, args.path,
+        batch_size=args.batch_size,
+        commit_interval=args.commit_interval,
+        progress=progress if args.progress else None
+    )
+    rate = result.rows_inserted / result.elapsed if result.elapsed > 0 else 0
+    _log(args, (
+        f"{result.rows_read:,} rows read, {result.rows_inserted:,} inserted, "
+        f"{result.rows_rejected:,} rejected in {result.elapsed:.2f}s ({rate:,.0f} rows/sec)"
+    ))
+    if result.reject_path:
+        _log(args, f"Rejected rows were written to {result.reject_path}")
+    return 1 if result.rows_rejected else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="database_gui.py --cli", description="MS SQL Server batch mode")
+
+    connection = argparse.ArgumentParser(add_help=False)
+    connection.add_argument("-S", "--server", required=True)
+    connection.add_argument("-d", "--database", required=True)
+    connection.add_argument("-U", "--username", help="SQL login; Windows authentication is used without one")
+    connection.add_argument(
+        "-P", "--password",
+        help="password for --username (defaults to the MSSQL_PASSWORD environment variable)"
+    )
+    connection.add_argument("--quiet", action="store_true", help="do not print timings to stderr")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", parents=[connection], help="run a query or a GO-separated script")
+    source = query.add_mutually_exclusive_group(required=True)
+    source.add_argument("-q", "--query", help="SQL text")
+    source.add_argument("-f", "--file", help="script file")
+    query.add_argument("-o", "--output", default="-", help="output file (.csv, .jsonl, .parquet) or - for stdout")
+    query.add_argument("--format", choices=sorted(WRITERS), help="output format (default: from the file extension)")
+    query.add_argument("--batch-size", type=int, default=5000, help="rows fetched per round trip")
+    query.add_argument("--continue-on-error", action="store_true", help="run the remaining batches after a failure")
+    query.add_argument("--encoding", default="utf-8-sig", help="script file encoding")
+
+    load = commands.add_parser("import", parents=[connection], help="bulk-import a CSV/TSV file into a table")
+    load.add_argument("path")
+    load.add_argument("-t", "--table", required=True)
+    load.add_argument("--batch-size", type=int, default=5000)
+    load.add_argument("--commit-interval", type=int, default=50000)
+    load.add_argument("--progress", action="store_true", help="print progress after every batch")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engine = DatabaseEngine(pool_size=1)
+    started = time.perf_counter()
+    try:
+        if args.username:
+            password = args.password if args.password is not None else os.environ.get("MSSQL_PASSWORD", "")
+            engine.connect(args.server, args.database, "sql", args.username, password)
+        else:
+            engine.connect(args.server, args.database)
+        _log(args, f"Connected to {args.database} on {args.server} in {time.perf_counter() - started:.2f}s")
+
+        if args.command == "query":
+            return run_query(engine, args)
+        return run_import(engine, args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from instrumentation import current_operation
+
+
+# Module providing connect(); None means pyodbc. The benchmarks set it to fake_odbc.
+driver = None
+
+
+def connect(conn_str):
+    # pyodbc (and with it the ODBC driver manager) is only loaded on the first
+    # connect, keeping it off the application's startup path
+    module = driver
+    if module is None:
+        import pyodbc as module
+    return module.connect(conn_str)
+
+
+def build_connection_string(server, database, auth="windows", username=None, password=None):
+    conn_str = (
+        f'DRIVER={{ODBC Driver 17 for SQL Server}};'
+        f'SERVER={server};'
+        f'DATABASE={database};'
+    )
+    if auth == "windows":
+        return conn_str + 'Trusted_Connection=yes'
+    return conn_str + f'UID={username};PWD={password}'
+
+
+class PoolClosedError(Exception):
+    pass
+
+
+class InstrumentedCursor:
+    """Wraps a pyodbc cursor and reports its timings to an Operation.
+
+    The operation is the one current when the cursor was created, so a
+    streamed result keeps reporting to it even when later fetches run as
+    separate executor tasks. Calls are serialized with a lock so a fetch on
+    one worker thread never overlaps a close() issued from another.
+    """
+
+    OWN_ATTRIBUTES = ("cursor", "operation", "lock", "closed")
+
+    def __init__(self, cursor, operation=None):
+        self.cursor = cursor
+        self.operation = operation
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __setattr__(self, name, value):
+        # Driver options such as fast_executemany go to the real cursor
+        if name in type(self).OWN_ATTRIBUTES:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.cursor, name, value)
+
+    def execute(self, *args):
+        with self.lock:
+            started = time.perf_counter()
+            self.cursor.execute(*args)
+            self._statement_done(started)
+        return self
+
+    def executemany(self, *args):
+        with self.lock:
+            started = time.perf_counter()
+            self.cursor.executemany(*args)
+            self._statement_done(started)
+
+    def nextset(self):
+        with self.lock:
+            result = self.cursor.nextset()
+            if self.operation is not None:
+                self.operation.add_messages(getattr(self.cursor, "messages", None))
+            return result
+
+    def fetchone(self):
+        with self.lock:
+            started = time.perf_counter()
+            row = self.cursor.fetchone()
+            self._rows_done([row] if row is not None else [], started)
+            return row
+
+    def fetchmany(self, size):
+        with self.lock:
+            started = time.perf_counter()
+            rows = self.cursor.fetchmany(size)
+            self._rows_done(rows, started)
+            return rows
+
+    def fetchall(self):
+        with self.lock:
+            started = time.perf_counter()
+            rows = self.cursor.fetchall()
+            self._rows_done(rows, started)
+            return rows
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.cursor.close()
+
+    def _statement_done(self, started):
+        if self.operation is not None:
+            self.operation.add_statement(time.perf_counter() - started)
+            self.operation.add_messages(getattr(self.cursor, "messages", None))
+
+    def _rows_done(self, rows, started):
+        if self.operation is not None:
+            self.operation.add_rows(rows, time.perf_counter() - started)
+
+
+class PooledCursor(InstrumentedCursor):
+    """Cursor that owns a pooled connection and returns it on close().
+
+    With ``discard`` the connection is closed instead, for cursors that run
+    SQL typed by the user: a USE or SET in it must not change the session
+    of whatever call gets the connection next.
+    """
+
+    OWN_ATTRIBUTES = InstrumentedCursor.OWN_ATTRIBUTES + ("pool", "connection", "reset_statements", "discard")
+
+    def __init__(self, pool, connection, operation=None, discard=False):
+        super().__init__(connection.cursor(), operation)
+        self.pool = pool
+        self.connection = connection
+        self.reset_statements = []
+        self.discard = discard
+
+    def set_session_option(self, option):
+        # SET <option> ON for this cursor's session; switched off again before
+        # the connection goes back to the pool
+        self.execute(f"SET {option} ON")
+        self.reset_statements.append(f"SET {option} OFF")
+
+    def enable_statistics(self):
+        self.set_session_option("STATISTICS IO, TIME")
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            discard = self.discard
+            try:
+                if self.reset_statements:
+                    # Trailing result sets carry the statistics messages
+                    try:
+                        while self.cursor.nextset():
+                            pass
+                    except Exception:
+                        pass
+                    if self.operation is not None:
+                        self.operation.add_messages(getattr(self.cursor, "messages", None))
+                    if not discard:
+                        for statement in self.reset_statements:
+                            self.cursor.execute(statement)
+                self.cursor.close()
+            except Exception:
+                discard = True
+            finally:
+                self.pool.release(self.connection, discard=discard)
+
+
+class PooledConnection:
+    """Connection handed out by ConnectionPool.connection().
+
+    Behaves like the pyodbc connection, except that its cursors report to
+    the current instrumentation operation.
+    """
+
+    def __init__(self, connection, operation=None):
+        object.__setattr__(self, "connection", connection)
+        object.__setattr__(self, "operation", operation)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.connection, name, value)
+
+    def cursor(self):
+        return InstrumentedCursor(self.connection.cursor(), self.operation)
+
+
+class ConnectionPool:
+    """Bounded pool of connections to one (server, database, auth) target.
+
+    Connections idle longer than ``idle_timeout`` seconds are closed, and a
+    connection that sat idle for more than ``check_after`` seconds is pinged
+    before it is handed out so dropped sessions never reach the caller.
+    """
+
+    def __init__(self, connect, max_size=4, idle_timeout=300, check_after=30):
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.idle = []
+        self.in_use = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    @property
+    def size(self):
+        with self.condition:
+            return len(self.idle) + self.in_use
+
+    def acquire(self, timeout=None):
+        started = time.perf_counter()
+        try:
+            return self._acquire(timeout)
+        finally:
+            # Waiting for a free slot and opening a session both count as connect time
+            operation = current_operation()
+            if operation is not None:
+                operation.add_time("connect", time.perf_counter() - started)
+
+    def _acquire(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise PoolClosedError("Connection pool is closed")
+                self._evict_idle()
+                if self.idle:
+                    connection, idle_since = self.idle.pop()
+                    self.in_use += 1
+                    break
+                if self.in_use < self.max_size:
+                    connection, idle_since = None, None
+                    self.in_use += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled connection")
+                self.condition.wait(remaining)
+
+        # Connect and health-check outside the lock; both can be slow
+        try:
+            if connection is not None and time.monotonic() - idle_since > self.check_after:
+                if not self._is_alive(connection):
+                    self._close_quietly(connection)
+                    connection = None
+            if connection is None:
+                connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        return connection
+
+    def release(self, connection, discard=False):
+        if not discard:
+            try:
+                # Never hand the next caller an open transaction
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        with self.condition:
+            self.in_use -= 1
+            if discard or self.closed:
+                self._close_quietly(connection)
+            else:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self, discard=False):
+        # discard=True closes the connection afterwards instead of pooling it,
+        # for work that leaves session state (USE, SET, temp tables) behind
+        connection = self.acquire()
+        try:
+            yield PooledConnection(connection, current_operation())
+        except Exception:
+            # Drop the connection if the error broke the session
+            self.release(connection, discard=discard or not self._is_alive(connection))
+            raise
+        except BaseException:
+            self.release(connection, discard=discard)
+            raise
+        else:
+            self.release(connection, discard=discard)
+
+    def cursor(self, discard=False):
+        # Cursor that keeps its connection checked out until it is closed
+        connection = self.acquire()
+        try:
+            return PooledCursor(self, connection, current_operation(), discard)
+        except BaseException:
+            self.release(connection, discard=True)
+            raise
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.condition.notify_all()
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        keep = []
+        for connection, idle_since in self.idle:
+            if now - idle_since > self.idle_timeout:
+                self._close_quietly(connection)
+            else:
+                keep.append((connection, idle_since))
+        self.idle = keep
+
+    def _is_alive(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1").fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class ConnectionManager:
+    """Hands out one ConnectionPool per (server, database, auth, credentials) key.
+
+    pool() returns a pool that stays open until it is closed explicitly.
+    borrow() is for one-off operations on another database and is paired
+    with release(): a pool that borrow() had to open is closed when its last
+    borrower releases it, while a pool that already existed, or that pool()
+    has handed out since, stays open.
+    """
+
+    def __init__(self, max_size=4, idle_timeout=300):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.pools = {}
+        # Pools opened by borrow() -> number of borrowers
+        self.borrowers = {}
+        self.lock = threading.Lock()
+
+    def pool(self, server, database, auth="windows", username=None, password=None):
+        with self.lock:
+            pool = self._pool(server, database, auth, username, password)
+            self.borrowers.pop(pool, None)
+            return pool
+
+    def borrow(self, server, database, auth="windows", username=None, password=None):
+        with self.lock:
+            existing = self.pools.get(self._key(server, database, auth, username, password))
+            pool = self._pool(server, database, auth, username, password)
+            if pool is not existing:
+                self.borrowers[pool] = 0
+            if pool in self.borrowers:
+                self.borrowers[pool] += 1
+            return pool
+
+    def release(self, pool):
+        with self.lock:
+            if pool not in self.borrowers:
+                return
+            self.borrowers[pool] -= 1
+            if self.borrowers[pool]:
+                return
+            self._forget(pool)
+        pool.close()
+
+    def close_pool(self, pool):
+        with self.lock:
+            self._forget(pool)
+        pool.close()
+
+    def close_all(self):
+        with self.lock:
+            pools, self.pools = list(self.pools.values()), {}
+            self.borrowers.clear()
+        for pool in pools:
+            pool.close()
+
+    def _key(self, server, database, auth, username, password):
+        # The password is part of the key, so a login that fails never
+        # matches the pool of one that worked, or the other way round
+        return server.lower(), database.lower(), auth, username, password
+
+    def _pool(self, server, database, auth, username, password):
+        # Called with the lock held
+        key = self._key(server, database, auth, username, password)
+        pool = self.pools.get(key)
+        if pool is None or pool.closed:
+            conn_str = build_connection_string(server, database, auth, username, password)
+            pool = ConnectionPool(
+                lambda: connect(conn_str),
+                max_size=self.max_size,
+                idle_timeout=self.idle_timeout
+            )
+            self.pools[key] = pool
+        return pool
+
+    def _forget(self, pool):
+        # Called with the lock held
+        for key, value in list(self.pools.items()):
+            if value is pool:
+                del self.pools[key]
+        self.borrowers.pop(pool, None)
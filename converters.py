@@ -0,0 +1,128 @@
+import datetime
+from decimal import Decimal, InvalidOperation
+
+
+INTEGER_TYPES = ('int', 'bigint', 'smallint', 'tinyint')
+DECIMAL_TYPES = ('decimal', 'numeric', 'money', 'smallmoney')
+FLOAT_TYPES = ('float', 'real')
+DATETIME_TYPES = ('datetime', 'datetime2', 'smalldatetime')
+BINARY_TYPES = ('binary', 'varbinary', 'image')
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'f', 'off')
+
+
+class ConversionError(ValueError):
+    def __init__(self, column, value, reason):
+        super().__init__(f"{column}: cannot convert {value!r} ({reason})")
+        self.column = column
+        self.value = value
+
+
+def _nullable(convert):
+    # Empty text means NULL (or the column default), as in the insert form
+    def wrapper(value):
+        if value is None:
+            return None
+        value = value.strip()
+        if not value:
+            return None
+        return convert(value)
+    return wrapper
+
+
+def _to_bit(value):
+    lowered = value.lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    raise ValueError("not a boolean")
+
+
+def _to_decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError("not a decimal number")
+
+
+def _to_binary(value):
+    if value[:2].lower() == '0x':
+        value = value[2:]
+    return bytes.fromhex(value)
+
+
+def _to_text(value):
+    if value is None or value == '':
+        return None
+    return value
+
+
+def converter_for(data_type):
+    # Picks the text -> Python conversion for a SQL Server type name once,
+    # so callers can apply it to a whole column without re-dispatching
+    data_type = (data_type or '').lower()
+    if data_type in INTEGER_TYPES:
+        return _nullable(int)
+    if data_type in DECIMAL_TYPES:
+        return _nullable(_to_decimal)
+    if data_type in FLOAT_TYPES:
+        return _nullable(float)
+    if data_type == 'bit':
+        return _nullable(_to_bit)
+    if data_type in DATETIME_TYPES:
+        return _nullable(datetime.datetime.fromisoformat)
+    if data_type == 'date':
+        return _nullable(datetime.date.fromisoformat)
+    if data_type == 'time':
+        return _nullable(datetime.time.fromisoformat)
+    if data_type in BINARY_TYPES:
+        return _nullable(_to_binary)
+    return _to_text
+
+
+def convert_columns(rows, names, converters):
+    """Convert a chunk of text rows column by column.
+
+    Returns ``(converted, rejects)`` where ``converted`` is a list of
+    ``(index, row)`` pairs in input order and ``rejects`` maps the index of
+    every row that failed to the first ConversionError it raised. Each column
+    is first converted in one map() call; only a column that fails is walked
+    cell by cell to find the offending rows.
+    """
+    if not rows:
+        return [], {}
+
+    width = len(names)
+    rejects = {}
+    for index, row in enumerate(rows):
+        if len(row) != width:
+            rejects[index] = ValueError(f"expected {width} values, got {len(row)}")
+    good = [row for index, row in enumerate(rows) if index not in rejects] if rejects else rows
+    indexes = [index for index in range(len(rows)) if index not in rejects]
+
+    columns = list(zip(*good)) if good else [() for _ in names]
+    converted_columns = []
+    for name, convert, values in zip(names, converters, columns):
+        try:
+            converted_columns.append(list(map(convert, values)))
+            continue
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+        column = []
+        for position, value in enumerate(values):
+            try:
+                column.append(convert(value))
+            except (ValueError, TypeError, OverflowError) as e:
+                rejects.setdefault(indexes[position], ConversionError(name, value, e))
+                column.append(None)
+        converted_columns.append(column)
+
+    converted = [
+        (index, row)
+        for index, row in zip(indexes, zip(*converted_columns))
+        if index not in rejects
+    ]
+    return converted, rejects
@@ -1,11 +1,45 @@
-import pyodbc 
+import time
+STARTUP_STARTED = time.perf_counter()
+
+import sys
+if __name__ == "__main__" and "--cli" in sys.argv[1:]:
+    # Batch mode never loads Tk
+    from cli import main
+    sys.exit(main([arg for arg in sys.argv[1:] if arg != "--cli"]))
+
 import customtkinter as ctk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
 import json
 import os
+import datetime
+import threading
+import re
+from bisect import bisect_left, bisect_right
+from db_executor import DBExecutor
+from instrumentation import Instrumentation
+from query_history import QueryHistory
+from db_engine import DatabaseEngine, ColumnDefinition
+from schema_snapshot import SchemaSnapshotStore
+from query_plan import hotspots, index_suggestion
+from result_cache import ResultCache, is_cacheable
+from entry_grid import EntryGrid
+from result_grid import VirtualResultGrid
+from script_runner import split_batches
+from fan_out import Target, parse_targets
+from formatters import NULL_MARKER, row_formatter
+from table_stats import format_size
+from table_pager import quote_name
+from lob_preview import format_chunk
+from change_set import ChangeSet, ConcurrencyError, is_editable
+from contextlib import closing
+
+IMPORTS_FINISHED = time.perf_counter()
 
 class DatabaseGUI:
     def __init__(self):
+        build_started = time.perf_counter()
+        self.startup_timings = {"import": IMPORTS_FINISHED - STARTUP_STARTED}
+        
         # Load settings
         self.load_settings()
         
@@ -17,6 +51,46 @@ class DatabaseGUI:
         self.app.geometry("800x600")
         self.app.title("MS SQL Server Database Manager")
         
+        # All SQL goes through the engine; its blocking calls run on the
+        # background executor. One worker per pooled connection lets queries,
+        # metadata refreshes and inserts run side by side.
+        pool_size = self.settings.get("pool_size", 4)
+        # Table and column lists of every database are kept next to
+        # settings.json, so a reconnect shows them before the server answers
+        snapshots = None
+        if self.settings.get("schema_snapshots", True):
+            folder = os.path.dirname(os.path.abspath(self.settings_file))
+            snapshots = SchemaSnapshotStore(os.path.join(folder, "schema_snapshots.db"))
+        self.engine = DatabaseEngine(
+            pool_size=pool_size,
+            result_cache=ResultCache(
+                ttl=self.settings.get("result_cache_ttl", 300),
+                max_bytes=self.settings.get("result_cache_mb", 64) * 1024 * 1024
+            ),
+            snapshots=snapshots
+        )
+        self.executor = DBExecutor(self.app, workers=pool_size)
+        self.executor.add_busy_listener(self.on_busy_changed)
+        
+        # Timings of every database operation, shown on the Query Stats tab
+        self.instrumentation = Instrumentation(capacity=self.settings.get("stats_history", 500))
+        self.instrumentation.capture_statistics = self.settings.get("capture_statistics", False)
+        self.instrumentation.add_listener(
+            lambda operation: self.executor.post(self.on_operation_recorded, operation)
+        )
+        self.executor.instrumentation = self.instrumentation
+        
+        # Query history is opened on first use
+        self.history = None
+        self.history_window = None
+        
+        # Busy indicator (packed before the tabview so it keeps its space)
+        self.busy_frame = ctk.CTkFrame(self.app, height=28, fg_color="transparent")
+        self.busy_frame.pack(side="bottom", fill="x", padx=20, pady=(0,10))
+        self.busy_label = ctk.CTkLabel(self.busy_frame, text="", text_color="gray")
+        self.busy_label.pack(side="left", padx=5)
+        self.busy_bar = ctk.CTkProgressBar(self.busy_frame, mode="indeterminate", width=200)
+        
         # Create Tabview
         self.tabview = ctk.CTkTabview(self.app)
         self.tabview.pack(pady=20, padx=20, fill="both", expand=True)
@@ -26,30 +100,56 @@ class DatabaseGUI:
         self.tab_tables = self.tabview.add("Table Management")
         self.tab_insert = self.tabview.add("Insert Data")
         self.tab_view = self.tabview.add("View Data")
+        self.tab_stats = self.tabview.add("Query Stats")
         self.tab_settings = self.tabview.add("Settings")
         
-        # Connection Tab
-        self.setup_connection_tab()
-        
-        # Table Management Tab
-        self.setup_table_tab()
-        
-        # Insert Data Tab
-        self.setup_insert_tab()
-        
-        # View Data Tab
-        self.setup_view_tab()
-        
-        # Settings Tab
-        self.setup_settings_tab()
+        # Tab contents are built the first time a tab is selected; only the
+        # Connection tab is needed for the first paint
+        self.tab_builders = {
+            "Connection": self.setup_connection_tab,
+            "Table Management": self.setup_table_tab,
+            "Insert Data": self.setup_insert_tab,
+            "View Data": self.setup_view_tab,
+            "Query Stats": self.setup_stats_tab,
+            "Settings": self.setup_settings_tab
+        }
+        self.built_tabs = set()
+        self.tab_build_timings = {}
+        self.tabview.configure(command=self.on_tab_changed)
+        self.build_tab("Connection")
         
-        self.connection = None
+        self.startup_timings["widgets"] = time.perf_counter() - build_started
+        self.app.bind("<Map>", self.on_first_paint, add="+")
+    
+    def build_tab(self, name):
+        if name in self.built_tabs:
+            return
+        started = time.perf_counter()
+        self.built_tabs.add(name)
+        self.tab_builders[name]()
+        self.tab_build_timings[name] = time.perf_counter() - started
+        if self.is_tab_built("Settings"):
+            self.update_startup_report()
+    
+    def is_tab_built(self, name):
+        return name in self.built_tabs
+    
+    def on_tab_changed(self):
+        self.build_tab(self.tabview.get())
+    
+    def on_first_paint(self, event):
+        if event.widget is not self.app or "first_paint" in self.startup_timings:
+            return
+        self.startup_timings["first_paint"] = time.perf_counter() - STARTUP_STARTED
+        if self.is_tab_built("Settings"):
+            self.update_startup_report()
     
     def load_settings(self):
         self.settings_file = "settings.json"
         default_settings = {
             "theme": "system",
-            "language": "en"
+            "language": "en",
+            "pool_size": 4
         }
         
         if os.path.exists(self.settings_file):
@@ -66,6 +166,16 @@ class DatabaseGUI:
         with open(self.settings_file, 'w') as f:
             json.dump(self.settings, f, indent=4)
 
+    def query_history(self):
+        # Kept next to settings.json
+        if self.history is None:
+            folder = os.path.dirname(os.path.abspath(self.settings_file))
+            self.history = QueryHistory(
+                os.path.join(folder, "query_history.db"),
+                max_entries=self.settings.get("history_size", 5000)
+            )
+        return self.history
+
     def setup_connection_tab(self):
         # Main Frame
         self.main_frame = ctk.CTkFrame(self.tab_connection)
@@ -179,11 +289,32 @@ class DatabaseGUI:
         )
         self.delete_table_btn.pack(side="left", padx=10)
         
+        # Streams a table or query result into a table on another database
+        self.copy_table_btn = ctk.CTkButton(
+            self.table_buttons_frame,
+            text="Copy Table...",
+            command=self.open_copy_dialog,
+            width=120,
+            fg_color="#1976D2"
+        )
+        self.copy_table_btn.pack(side="left", padx=10)
+        self.copy_cancel_event = None
+        
+        # Compares the saved schema snapshots of two databases
+        self.schema_diff_btn = ctk.CTkButton(
+            self.table_buttons_frame,
+            text="Schema Diff...",
+            command=self.open_schema_diff,
+            width=120
+        )
+        self.schema_diff_btn.pack(side="left", padx=10)
+        
         # Existing Tables List
         self.tables_label = ctk.CTkLabel(self.table_frame, text="Existing Tables:")
         self.tables_label.pack(pady=(20,5))
         
-        self.tables_listbox = ctk.CTkTextbox(self.table_frame, height=100)
+        # One line per table with its row count, size, index count and dates
+        self.tables_listbox = ctk.CTkTextbox(self.table_frame, height=100, font=("Consolas", 12), wrap="none")
         self.tables_listbox.pack(pady=10, fill="x")
         
         # Refresh Tables Button
@@ -195,6 +326,10 @@ class DatabaseGUI:
             fg_color="#1976D2"
         )
         self.refresh_tables_btn.pack(pady=10)
+        
+        # Built lazily: catch up with a connection made before the first visit
+        if self.engine.connected:
+            self.refresh_tables_list()
 
     def add_column_fields(self):
         column_frame = ctk.CTkFrame(self.columns_frame)
@@ -245,7 +380,7 @@ class DatabaseGUI:
                 break
 
     def create_table(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
             
@@ -259,40 +394,36 @@ class DatabaseGUI:
             return
             
         try:
-            # Build CREATE TABLE query
             columns = []
             for column in self.column_list:
                 name = column["name"].get().strip()
-                data_type = column["type"].get()
-                is_primary = column["primary"].get()
-                not_null = column["not_null"].get()
-                
                 if not name:
                     messagebox.showerror("Error", "All columns must have names!")
                     return
-                    
-                column_def = f"[{name}] {data_type}"
-                if is_primary:
-                    column_def += " PRIMARY KEY"
-                if not_null:
-                    column_def += " NOT NULL"
-                    
-                columns.append(column_def)
-            
-            query = f"CREATE TABLE [{table_name}] (\n    " + ",\n    ".join(columns) + "\n)"
-            
-            cursor = self.connection.cursor()
-            cursor.execute(query)
-            self.connection.commit()
-            
-            messagebox.showinfo("Success", f"Table {table_name} created successfully!")
-            self.refresh_tables_list()
+                columns.append(ColumnDefinition(
+                    name,
+                    column["type"].get(),
+                    bool(column["primary"].get()),
+                    bool(column["not_null"].get())
+                ))
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to create table: {str(e)}")
-
+            return
+        
+        def on_created(_):
+            messagebox.showinfo("Success", f"Table {table_name} created successfully!")
+            self.refresh_tables_list()
+        
+        self.executor.submit(
+            self.engine.create_table, table_name, columns,
+            operation=self.instrumentation.begin("ddl", f"CREATE TABLE {table_name}"),
+            on_success=on_created,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to create table: {str(e)}")
+        )
+    
     def delete_table(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
             
@@ -302,38 +433,289 @@ class DatabaseGUI:
             return
             
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete table {table_name}?"):
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute(f"DROP TABLE [{table_name}]")
-                self.connection.commit()
-                
+            def on_deleted(_):
                 messagebox.showinfo("Success", f"Table {table_name} deleted successfully!")
                 self.refresh_tables_list()
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete table: {str(e)}")
+            
+            self.executor.submit(
+                self.engine.drop_table, table_name,
+                operation=self.instrumentation.begin("ddl", f"DROP TABLE {table_name}"),
+                on_success=on_deleted,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to delete table: {str(e)}")
+            )
+
+    def open_copy_dialog(self):
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        if self.copy_cancel_event is not None:
+            messagebox.showerror("Error", "A copy is already running!")
+            return
+        
+        window = ctk.CTkToplevel(self.app)
+        window.title("Copy Table")
+        window.geometry("520x560")
+        window.transient(self.app)
+        
+        form = ctk.CTkFrame(window, fg_color="transparent")
+        form.pack(fill="x", padx=10, pady=(10,5))
+        form.grid_columnconfigure(1, weight=1)
+        
+        def field(row, label, widget):
+            ctk.CTkLabel(form, text=label).grid(row=row, column=0, padx=5, pady=3, sticky="w")
+            widget.grid(row=row, column=1, padx=5, pady=3, sticky="ew")
+            return widget
+        
+        source_combo = field(0, "Source table:", ctk.CTkComboBox(form, values=[], width=300))
+        source_combo.set(self.table_name_entry.get().strip())
+        ctk.CTkLabel(form, text="or a SELECT query (copies its rows instead):", text_color="gray").grid(
+            row=1, column=0, columnspan=2, padx=5, pady=(6,0), sticky="w"
+        )
+        query_text = ctk.CTkTextbox(form, height=70)
+        query_text.grid(row=2, column=0, columnspan=2, padx=5, pady=3, sticky="ew")
+        server_entry = field(3, "Target server:", ctk.CTkEntry(form))
+        server_entry.insert(0, self.settings.get("copy_target_server") or self.server_entry.get().strip())
+        database_entry = field(4, "Target database:", ctk.CTkEntry(form))
+        database_entry.insert(0, self.settings.get("copy_target_database", ""))
+        table_entry = field(5, "Target table:", ctk.CTkEntry(form, placeholder_text="same as the source"))
+        batch_entry = field(6, "Batch size:", ctk.CTkEntry(form, width=100))
+        batch_entry.insert(0, str(self.settings.get("copy_batch_size", 5000)))
+        commit_entry = field(7, "Commit every:", ctk.CTkEntry(form, width=100))
+        commit_entry.insert(0, str(self.settings.get("copy_commit_interval", 50000)))
+        
+        create_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(window, text="Create the target table if it does not exist", variable=create_var).pack(
+            padx=15, pady=3, anchor="w"
+        )
+        resume_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            window, text="Resume after the highest key already in the target", variable=resume_var
+        ).pack(padx=15, pady=3, anchor="w")
+        
+        status = ctk.CTkLabel(window, text="", text_color="gray", wraplength=480, justify="left")
+        status.pack(padx=10, pady=5, anchor="w")
+        
+        self.executor.submit(
+            self.engine.table_names,
+            operation=self.instrumentation.begin("metadata", "Table list"),
+            on_success=lambda tables: source_combo.configure(values=tables) if window.winfo_exists() else None,
+            on_error=lambda e: None
+        )
+        
+        def start():
+            query = query_text.get("1.0", "end-1c").strip() or None
+            source_table = None if query else source_combo.get().strip()
+            target_table = table_entry.get().strip() or source_table
+            server = server_entry.get().strip()
+            database = database_entry.get().strip()
+            if not query and not source_table:
+                messagebox.showerror("Error", "Please select a table or enter a query!", parent=window)
+                return
+            if not server or not database or not target_table:
+                messagebox.showerror("Error", "Please enter the target server, database and table!", parent=window)
+                return
+            try:
+                batch_size = int(batch_entry.get())
+                commit_interval = int(commit_entry.get())
+                if batch_size <= 0 or commit_interval <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Batch size and commit interval must be positive numbers!", parent=window)
+                return
+            self.settings.update(
+                copy_target_server=server,
+                copy_target_database=database,
+                copy_batch_size=batch_size,
+                copy_commit_interval=commit_interval
+            )
+            self.save_settings()
+            start_btn.configure(state="disabled")
+            cancel_btn.configure(state="normal")
+            self.start_copy(
+                Target(server, database), target_table, source_table, query, status,
+                batch_size=batch_size,
+                commit_interval=commit_interval,
+                create_target=bool(create_var.get()) and query is None,
+                resume=bool(resume_var.get()) and query is None,
+                on_done=copy_done
+            )
+        
+        def copy_done():
+            if window.winfo_exists():
+                start_btn.configure(state="normal")
+                cancel_btn.configure(state="disabled")
+        
+        def cancel():
+            if self.copy_cancel_event is not None:
+                self.copy_cancel_event.set()
+                status.configure(text="Cancelling after the current batch...", text_color="gray")
+        
+        buttons_frame = ctk.CTkFrame(window, fg_color="transparent")
+        buttons_frame.pack(pady=(5,10))
+        start_btn = ctk.CTkButton(buttons_frame, text="Copy", command=start, width=120, fg_color="#2E7D32")
+        start_btn.pack(side="left", padx=5)
+        cancel_btn = ctk.CTkButton(
+            buttons_frame, text="Cancel", command=cancel, width=120, fg_color="#D32F2F", state="disabled"
+        )
+        cancel_btn.pack(side="left", padx=5)
+
+    def start_copy(self, target, target_table, source_table, query, status, on_done=None, **options):
+        source = source_table or "query"
+        destination = f"{target.server}/{target.database}.{target_table}"
+        cancel_event = threading.Event()
+        self.copy_cancel_event = cancel_event
+        status.configure(text=f"Copying {source} to {destination}...", text_color="gray")
+        
+        def show(text, color="gray"):
+            if status.winfo_exists():
+                status.configure(text=text, text_color=color)
+        
+        def show_progress(rows, elapsed):
+            rate = rows / elapsed if elapsed > 0 else 0
+            show(f"{rows:,} rows copied to {destination} ({rate:,.0f} rows/sec)")
+        
+        def finish():
+            self.copy_cancel_event = None
+            if on_done is not None:
+                on_done()
+            if self.is_tab_built("Table Management"):
+                self.refresh_tables_list()
+        
+        def on_finished(result):
+            finish()
+            rate = result.rows_copied / result.elapsed if result.elapsed > 0 else 0
+            state = "cancelled" if result.cancelled else "finished"
+            details = []
+            if result.created:
+                details.append(f"created {target_table}")
+            if result.resumed_after is not None:
+                details.append(f"resumed after key {result.resumed_after!r}")
+            message = (
+                f"Copy {state}: {result.rows_copied:,} rows copied in {result.elapsed:.1f}s "
+                f"({rate:,.0f} rows/sec)" + (f"; {', '.join(details)}" if details else "")
+            )
+            show(message, "#2E7D32")
+            messagebox.showinfo("Copy Table", message)
+        
+        def on_failed(e):
+            finish()
+            show(f"Error: {str(e)}", "#D32F2F")
+            messagebox.showerror("Error", f"Failed to copy {source}: {str(e)}")
+        
+        self.executor.submit(
+            self.engine.copy_table, target, target_table, source_table, query,
+            progress=lambda *args: self.executor.post(show_progress, *args),
+            cancel_event=cancel_event,
+            operation=self.instrumentation.begin("copy", f"{source} -> {destination}"),
+            on_success=on_finished,
+            on_error=on_failed,
+            **options
+        )
+
+    def open_schema_diff(self):
+        if self.engine.snapshots is None:
+            messagebox.showerror("Error", "Schema snapshots are turned off in settings.json!")
+            return
+        
+        window = ctk.CTkToplevel(self.app)
+        window.title("Schema Diff")
+        window.geometry("700x500")
+        window.transient(self.app)
+        
+        controls = ctk.CTkFrame(window, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(10,5))
+        ctk.CTkLabel(controls, text="From:").pack(side="left", padx=5)
+        old_combo = ctk.CTkComboBox(controls, values=[], width=220)
+        old_combo.pack(side="left", padx=5)
+        ctk.CTkLabel(controls, text="To:").pack(side="left", padx=5)
+        new_combo = ctk.CTkComboBox(controls, values=[], width=220)
+        new_combo.pack(side="left", padx=5)
+        
+        textbox = ctk.CTkTextbox(window, font=("Consolas", 12), wrap="none")
+        textbox.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        def show_text(text):
+            if window.winfo_exists():
+                textbox.delete("1.0", "end")
+                textbox.insert("end", text)
+        
+        def show_snapshots(snapshots):
+            if not window.winfo_exists():
+                return
+            targets = [snapshot.target for snapshot in snapshots]
+            old_combo.configure(values=targets)
+            new_combo.configure(values=targets)
+            if targets:
+                old_combo.set(targets[0])
+                new_combo.set(self.engine.target if self.engine.target in targets else targets[-1])
+            show_text("\n".join(
+                f"{snapshot.target}: {snapshot.tables:,} tables, saved {snapshot.saved_at}" for snapshot in snapshots
+            ) or "No snapshots yet; connect to a database first.")
+        
+        def show_changes(changes, old_target, new_target):
+            if not changes:
+                show_text(f"No differences between {old_target} and {new_target}.")
+                return
+            width = min(max(len(change.table) for change in changes), 50)
+            lines = [f"{len(changes)} differences from {old_target} to {new_target}", ""]
+            lines += [f"{change.kind:<8} {change.table:<{width}}  {change.detail}" for change in changes]
+            show_text("\n".join(lines) + "\n")
+        
+        def compare():
+            old_target, new_target = old_combo.get(), new_combo.get()
+            if not old_target or not new_target:
+                return
+            self.executor.submit(
+                self.engine.diff_snapshots, old_target, new_target,
+                operation=self.instrumentation.begin("metadata", f"Schema diff {old_target} -> {new_target}"),
+                on_success=lambda changes: show_changes(changes, old_target, new_target),
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to compare schemas: {str(e)}", parent=window)
+            )
+        
+        ctk.CTkButton(controls, text="Compare", command=compare, width=90, fg_color="#1976D2").pack(side="left", padx=5)
+        
+        self.executor.submit(
+            self.engine.schema_snapshots,
+            operation=self.instrumentation.begin("metadata", "Schema snapshots"),
+            on_success=show_snapshots,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to read schema snapshots: {str(e)}", parent=window)
+        )
 
     def refresh_tables_list(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
-            
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT TABLE_NAME 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_TYPE = 'BASE TABLE'
-                ORDER BY TABLE_NAME
-            """)
-            
-            tables = cursor.fetchall()
+        
+        target = self.engine.target
+        
+        def date(value):
+            return value.strftime("%Y-%m-%d %H:%M") if value is not None else ""
+        
+        def show_tables(stats):
+            # Statistics of a database disconnected from in the meantime
+            if self.engine.target != target:
+                return
+            names = [table.name if table.schema == "dbo" else f"{table.schema}.{table.name}" for table in stats]
+            width = min(max([len(name) for name in names] + [5]), 40)
+            lines = [
+                f"{'Table':<{width}}  {'Rows':>15}  {'Reserved':>10}  {'Used':>10}  {'Indexes':>7}  "
+                f"{'Schema changed':<16}  Last update"
+            ]
+            for name, table in zip(names, stats):
+                lines.append(
+                    f"{name:<{width}}  {table.rows or 0:>15,}  {format_size(table.reserved_kb):>10}  "
+                    f"{format_size(table.used_kb):>10}  {table.indexes:>7}  "
+                    f"{date(table.modify_date):<16}  {date(table.last_update)}"
+                )
             self.tables_listbox.delete("1.0", "end")
-            for table in tables:
-                self.tables_listbox.insert("end", f"{table[0]}\n")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to refresh tables list: {str(e)}")
+            self.tables_listbox.insert("end", "\n".join(lines) + "\n")
+        
+        self.executor.submit(
+            self.engine.table_stats,
+            operation=self.instrumentation.begin("metadata", "Table statistics"),
+            on_success=show_tables,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to refresh tables list: {str(e)}")
+        )
 
     def connect_db(self):
         server = self.server_entry.get().strip()
@@ -343,27 +725,71 @@ class DatabaseGUI:
             messagebox.showerror("Error", "Please enter both server and database names!")
             return
             
-        try:
-            conn_str = (
-                f'DRIVER={{ODBC Driver 17 for SQL Server}};'
-                f'SERVER={server};'
-                f'DATABASE={database};'
-                'Trusted_Connection=yes'
-            )
-            self.connection = pyodbc.connect(conn_str)
+        previous_target = self.engine.target
+        
+        def on_connected(target):
+            # Results of the previous database must not be browsed further
+            if previous_target and previous_target != target and self.is_tab_built("View Data"):
+                self.results_grid.clear()
+                self.discard_changes()
             self.status_label.configure(
                 text="Status: Connected Successfully",
                 text_color="#2E7D32"
             )
             messagebox.showinfo("Success", f"Successfully connected to {database} on {server}!")
-            self.refresh_tables_list()
-        except Exception as e:
+            # An unbuilt Table Management tab loads its list when first opened
+            if self.is_tab_built("Table Management"):
+                self.refresh_tables_list()
+            # Table lists come from the saved snapshot at once; the check
+            # against the server runs in the background
+            self.show_table_names(self.engine.cached_table_names())
+            self.check_schema()
+        
+        def on_failed(e):
             self.status_label.configure(
                 text="Status: Connection Failed",
                 text_color="#D32F2F"
             )
             messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
+        
+        self.status_label.configure(text="Status: Connecting...", text_color="gray")
+        self.executor.submit(
+            self.engine.connect, server, database,
+            operation=self.instrumentation.begin("connect", f"{server}/{database}"),
+            on_success=on_connected,
+            on_error=on_failed
+        )
     
+    def show_table_names(self, tables):
+        # Fill the table pickers of the built tabs, keeping their selection
+        if tables is None:
+            return
+        if self.is_tab_built("View Data"):
+            self.view_table_combo.configure(values=tables)
+            if self.view_table_combo.get() not in tables:
+                self.view_table_combo.set(tables[0] if tables else "")
+        if self.is_tab_built("Insert Data"):
+            self.table_combo.configure(values=tables)
+            if tables and self.table_combo.get() not in tables:
+                self.table_combo.set(tables[0])
+                self.on_table_selected(tables[0])
+
+    def check_schema(self):
+        target = self.engine.target
+        
+        def on_checked(tables):
+            if self.engine.target != target:
+                return
+            if self.engine.schema.changed:
+                self.show_table_names(tables)
+        
+        self.executor.submit(
+            self.engine.table_names, True,
+            operation=self.instrumentation.begin("metadata", "Schema check"),
+            on_success=on_checked,
+            on_error=lambda e: None
+        )
+
     def create_db(self):
         server = self.server_entry.get().strip()
         database = self.db_entry.get().strip()
@@ -372,28 +798,26 @@ class DatabaseGUI:
             messagebox.showerror("Error", "Please enter both server and database names!")
             return
             
-        try:
-            conn_str = (
-                f'DRIVER={{ODBC Driver 17 for SQL Server}};'
-                f'SERVER={server};'
-                f'DATABASE=master;'
-                'Trusted_Connection=yes'
-            )
-            conn = pyodbc.connect(conn_str)
-            conn.autocommit = True
-            cursor = conn.cursor()
-            cursor.execute(f'CREATE DATABASE [{database}]')
+        def on_created(_):
             self.status_label.configure(
                 text=f"Status: Database {database} Created",
                 text_color="#2E7D32"
             )
             messagebox.showinfo("Success", f"Database {database} created successfully!")
-        except Exception as e:
+        
+        def on_failed(e):
             self.status_label.configure(
                 text="Status: Creation Failed",
                 text_color="#D32F2F"
             )
             messagebox.showerror("Creation Error", f"Failed to create database: {str(e)}")
+        
+        self.executor.submit(
+            self.engine.create_database, server, database,
+            operation=self.instrumentation.begin("ddl", f"CREATE DATABASE {database}"),
+            on_success=on_created,
+            on_error=on_failed
+        )
     
     def setup_insert_tab(self):
         # Main Frame for Insert Data
@@ -418,6 +842,15 @@ class DatabaseGUI:
         )
         self.refresh_tables_combo_btn.pack(side="left", padx=5)
         
+        # Single-row form or multi-row grid entry
+        self.insert_mode = ctk.CTkSegmentedButton(
+            self.table_select_frame,
+            values=["Form", "Grid"],
+            command=self.on_insert_mode_changed
+        )
+        self.insert_mode.pack(side="right", padx=5)
+        self.insert_mode.set("Form")
+        
         # Create a frame for the scrollable area
         self.scrollable_frame = ctk.CTkScrollableFrame(self.insert_frame, height=300)
         self.scrollable_frame.pack(fill="both", expand=True, pady=10)
@@ -439,31 +872,122 @@ class DatabaseGUI:
         )
         self.insert_btn.pack(pady=10)
         
+        # Multi-row entry grid (shown in Grid mode)
+        self.grid_entry_frame = ctk.CTkFrame(self.insert_frame)
+        self.entry_grid = EntryGrid(self.grid_entry_frame)
+        self.entry_grid.pack(fill="both", expand=True, padx=5, pady=5)
+        self.grid_columns = []
+        
+        self.grid_buttons_frame = ctk.CTkFrame(self.grid_entry_frame, fg_color="transparent")
+        self.grid_buttons_frame.pack(fill="x", pady=5)
+        
+        self.add_row_btn = ctk.CTkButton(
+            self.grid_buttons_frame,
+            text="Add Row",
+            command=self.entry_grid.add_row,
+            width=100
+        )
+        self.add_row_btn.pack(side="left", padx=5)
+        
+        self.paste_rows_btn = ctk.CTkButton(
+            self.grid_buttons_frame,
+            text="Paste",
+            command=lambda: self.entry_grid.on_paste(None),
+            width=100
+        )
+        self.paste_rows_btn.pack(side="left", padx=5)
+        
+        self.delete_rows_btn = ctk.CTkButton(
+            self.grid_buttons_frame,
+            text="Delete Rows",
+            command=self.entry_grid.delete_selected,
+            width=100,
+            fg_color="#D32F2F"
+        )
+        self.delete_rows_btn.pack(side="left", padx=5)
+        
+        self.clear_rows_btn = ctk.CTkButton(
+            self.grid_buttons_frame,
+            text="Clear",
+            command=self.entry_grid.clear,
+            width=100,
+            fg_color="#D32F2F"
+        )
+        self.clear_rows_btn.pack(side="left", padx=5)
+        
+        self.insert_rows_btn = ctk.CTkButton(
+            self.grid_buttons_frame,
+            text="Insert All Rows",
+            command=self.insert_grid_rows,
+            width=120,
+            fg_color="#2E7D32"
+        )
+        self.insert_rows_btn.pack(side="right", padx=5)
+        
+        # Bulk import from CSV/TSV
+        self.import_frame = ctk.CTkFrame(self.insert_frame)
+        self.import_frame.pack(fill="x", pady=(0,10))
+        
+        self.import_btn = ctk.CTkButton(
+            self.import_frame,
+            text="Import CSV/TSV...",
+            command=self.import_file,
+            width=140,
+            fg_color="#1976D2"
+        )
+        self.import_btn.pack(side="left", padx=5)
+        
+        self.import_batch_label = ctk.CTkLabel(self.import_frame, text="Batch:")
+        self.import_batch_label.pack(side="left", padx=(10,2))
+        self.import_batch_entry = ctk.CTkEntry(self.import_frame, width=70)
+        self.import_batch_entry.pack(side="left", padx=2)
+        self.import_batch_entry.insert(0, "5000")
+        
+        self.import_commit_label = ctk.CTkLabel(self.import_frame, text="Commit every:")
+        self.import_commit_label.pack(side="left", padx=(10,2))
+        self.import_commit_entry = ctk.CTkEntry(self.import_frame, width=80)
+        self.import_commit_entry.pack(side="left", padx=2)
+        self.import_commit_entry.insert(0, "50000")
+        
+        self.cancel_import_btn = ctk.CTkButton(
+            self.import_frame,
+            text="Cancel",
+            command=self.cancel_import,
+            width=80,
+            fg_color="#D32F2F",
+            state="disabled"
+        )
+        self.cancel_import_btn.pack(side="right", padx=5)
+        
+        self.import_progress = ctk.CTkProgressBar(self.insert_frame)
+        self.import_progress.pack(fill="x", padx=5)
+        self.import_progress.set(0)
+        
+        self.import_status_label = ctk.CTkLabel(self.insert_frame, text="", text_color="gray")
+        self.import_status_label.pack(pady=5)
+        
+        self.import_cancel_event = None
+        
         # Bind table selection change
         self.table_combo.configure(command=self.on_table_selected)
 
     def refresh_tables_combo(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
             
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT TABLE_NAME 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_TYPE = 'BASE TABLE'
-                ORDER BY TABLE_NAME
-            """)
-            
-            tables = [table[0] for table in cursor.fetchall()]
+        def show_tables(tables):
             self.table_combo.configure(values=tables)
             if tables:
                 self.table_combo.set(tables[0])
                 self.on_table_selected(tables[0])
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to refresh tables list: {str(e)}")
+        
+        self.executor.submit(
+            self.engine.table_names, True,
+            operation=self.instrumentation.begin("metadata", "Table list"),
+            on_success=show_tables,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to refresh tables list: {str(e)}")
+        )
 
     def on_table_selected(self, table_name):
         if not table_name:
@@ -474,19 +998,26 @@ class DatabaseGUI:
             widget.destroy()
         self.column_entries.clear()
         
+        self.executor.submit(
+            self.engine.columns, table_name,
+            operation=self.instrumentation.begin("metadata", f"Columns of {table_name}"),
+            on_success=lambda columns: self.build_column_entries(table_name, columns),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load table structure: {str(e)}")
+        )
+
+    def build_column_entries(self, table_name, columns):
+        # Ignore results for a table that is no longer selected
+        if self.table_combo.get() != table_name:
+            return
+        
+        # Identity values are generated by the server
+        self.grid_columns = [column for column in columns if not column.is_identity]
+        self.entry_grid.set_columns([(column.name, column.data_type) for column in self.grid_columns])
+        self.entry_grid.add_row()
+        
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(f"""
-                SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_NAME = '{table_name}'
-                ORDER BY ORDINAL_POSITION
-            """)
-            
-            columns = cursor.fetchall()
-            
             for column in columns:
-                col_name, data_type, is_nullable = column
+                col_name, data_type = column.name, column.data_type
                 
                 # Create frame for each column
                 col_frame = ctk.CTkFrame(self.data_entry_frame)
@@ -520,7 +1051,7 @@ class DatabaseGUI:
             messagebox.showerror("Error", f"Failed to load table structure: {str(e)}")
 
     def insert_data(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
             
@@ -530,10 +1061,8 @@ class DatabaseGUI:
             return
             
         try:
-            # Build column names and values
-            columns = []
-            values = []
-            params = []
+            # Column name -> parameter value
+            values = {}
             
             for col_name, col_info in self.column_entries.items():
                 widget = col_info['widget']
@@ -542,35 +1071,24 @@ class DatabaseGUI:
                 if isinstance(widget, ctk.CTkEntry):
                     value = widget.get().strip()
                     if value:  # Only include non-empty values
-                        columns.append(f"[{col_name}]")
                         if data_type in ('int', 'bigint', 'smallint', 'tinyint'):
-                            values.append("?")
-                            params.append(int(value))
+                            values[col_name] = int(value)
                         elif data_type in ('decimal', 'numeric', 'float', 'real'):
-                            values.append("?")
-                            params.append(float(value))
-                        elif data_type == 'datetime':
-                            values.append("?")
-                            params.append(value)
+                            values[col_name] = float(value)
                         else:
-                            values.append("?")
-                            params.append(value)
+                            values[col_name] = value
                 elif isinstance(widget, ctk.CTkCheckBox):
-                    columns.append(f"[{col_name}]")
-                    values.append("?")
-                    params.append(1 if widget.get() else 0)
+                    values[col_name] = 1 if widget.get() else 0
             
-            if not columns:
+            if not values:
                 messagebox.showerror("Error", "Please enter at least one value!")
                 return
             
-            # Build and execute INSERT query
-            query = f"INSERT INTO [{table_name}] ({', '.join(columns)}) VALUES ({', '.join(values)})"
-            
-            cursor = self.connection.cursor()
-            cursor.execute(query, params)
-            self.connection.commit()
-            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to insert data: {str(e)}")
+            return
+        
+        def on_inserted(_):
             messagebox.showinfo("Success", "Data inserted successfully!")
             
             # Clear all entries
@@ -580,35 +1098,316 @@ class DatabaseGUI:
                     widget.delete(0, "end")
                 elif isinstance(widget, ctk.CTkCheckBox):
                     widget.deselect()
-                    
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to insert data: {str(e)}")
+        
+        self.executor.submit(
+            self.engine.insert_row, table_name, values,
+            operation=self.instrumentation.begin("insert", f"INSERT INTO {table_name}"),
+            on_success=on_inserted,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to insert data: {str(e)}")
+        )
+
+    def on_insert_mode_changed(self, mode):
+        if mode == "Grid":
+            self.scrollable_frame.pack_forget()
+            self.insert_btn.pack_forget()
+            self.grid_entry_frame.pack(fill="both", expand=True, pady=10, before=self.import_frame)
+        else:
+            self.grid_entry_frame.pack_forget()
+            self.scrollable_frame.pack(fill="both", expand=True, pady=10, before=self.import_frame)
+            self.insert_btn.pack(pady=10, before=self.import_frame)
+
+    def insert_grid_rows(self):
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        
+        table_name = self.table_combo.get()
+        if not table_name:
+            messagebox.showerror("Error", "Please select a table!")
+            return
+        
+        rows = self.entry_grid.rows()
+        if not rows:
+            messagebox.showerror("Error", "Please enter at least one row!")
+            return
+        
+        items = [item for item, _ in rows]
+        values = [row for _, row in rows]
+        columns = self.grid_columns
+        
+        def on_inserted(result):
+            inserted, errors = result
+            self.entry_grid.show_results(items, errors)
+            if errors:
+                messagebox.showwarning(
+                    "Insert",
+                    f"{inserted} rows inserted, {len(errors)} failed. "
+                    "Failed rows are highlighted with their error."
+                )
+            else:
+                messagebox.showinfo("Success", f"{inserted} rows inserted successfully!")
+                self.entry_grid.add_row()
+        
+        self.executor.submit(
+            self.engine.insert_rows, table_name, columns, values,
+            operation=self.instrumentation.begin("insert", f"INSERT INTO {table_name} ({len(values)} rows)"),
+            on_success=on_inserted,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to insert data: {str(e)}")
+        )
+
+    def import_file(self):
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        
+        table_name = self.table_combo.get()
+        if not table_name:
+            messagebox.showerror("Error", "Please select a table!")
+            return
+        
+        if self.import_cancel_event is not None:
+            messagebox.showerror("Error", "An import is already running!")
+            return
+        
+        try:
+            batch_size = int(self.import_batch_entry.get())
+            commit_interval = int(self.import_commit_entry.get())
+            if batch_size <= 0 or commit_interval <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Batch size and commit interval must be positive numbers!")
+            return
+        
+        path = filedialog.askopenfilename(
+            title="Import into " + table_name,
+            filetypes=[("Delimited text", "*.csv *.tsv *.tab *.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        cancel_event = threading.Event()
+        self.import_cancel_event = cancel_event
+        self.cancel_import_btn.configure(state="normal")
+        self.import_progress.set(0)
+        self.import_status_label.configure(text=f"Importing {os.path.basename(path)}...", text_color="gray")
+        
+        def show_progress(rows_read, inserted, rejected, elapsed, fraction):
+            rate = inserted / elapsed if elapsed > 0 else 0
+            self.import_progress.set(fraction)
+            self.import_status_label.configure(
+                text=f"{inserted:,} rows inserted, {rejected:,} rejected ({rate:,.0f} rows/sec)",
+                text_color="gray"
+            )
+        
+        def on_finished(result):
+            self.finish_import()
+            rate = result.rows_inserted / result.elapsed if result.elapsed > 0 else 0
+            state = "cancelled" if result.cancelled else "finished"
+            self.import_progress.set(1 if not result.cancelled else self.import_progress.get())
+            message = (
+                f"Import {state}: {result.rows_inserted:,} rows inserted, "
+                f"{result.rows_rejected:,} rejected in {result.elapsed:.1f}s ({rate:,.0f} rows/sec)"
+            )
+            self.import_status_label.configure(text=message, text_color="#2E7D32")
+            if result.reject_path:
+                message += f"\n\nRejected rows were written to {result.reject_path}"
+            messagebox.showinfo("Import", message)
+        
+        def on_failed(e):
+            self.finish_import()
+            self.import_status_label.configure(text=f"Error: {str(e)}", text_color="#D32F2F")
+            messagebox.showerror("Error", f"Failed to import data: {str(e)}")
+        
+        self.executor.submit(
+            self.engine.import_file, table_name, path,
+            batch_size=batch_size,
+            commit_interval=commit_interval,
+            progress=lambda *args: self.executor.post(show_progress, *args),
+            cancel_event=cancel_event,
+            operation=self.instrumentation.begin("import", f"{os.path.basename(path)} -> {table_name}"),
+            on_success=on_finished,
+            on_error=on_failed
+        )
+
+    def cancel_import(self):
+        if self.import_cancel_event is not None:
+            self.import_cancel_event.set()
+            self.import_status_label.configure(text="Cancelling import...", text_color="gray")
+
+    def finish_import(self):
+        self.import_cancel_event = None
+        self.cancel_import_btn.configure(state="disabled")
 
     def disconnect_db(self):
-        if self.connection:
-            try:
-                self.connection.close()
-                self.connection = None
+        if self.engine.connected:
+            pool = self.engine.detach()
+            
+            def on_disconnected(_):
                 self.status_label.configure(
                     text="Status: Disconnected",
                     text_color="#D32F2F"
                 )
                 messagebox.showinfo("Success", "Successfully disconnected from database!")
                 
-                # Clear table combo box
-                self.table_combo.configure(values=[])
-                self.table_combo.set("")
-                
-                # Clear data entry frame
-                for widget in self.data_entry_frame.winfo_children():
-                    widget.destroy()
-                self.column_entries.clear()
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Error while disconnecting: {str(e)}")
+                if self.is_tab_built("Insert Data"):
+                    # Clear table combo box
+                    self.table_combo.configure(values=[])
+                    self.table_combo.set("")
+                    
+                    # Clear data entry frame
+                    for widget in self.data_entry_frame.winfo_children():
+                        widget.destroy()
+                    self.column_entries.clear()
+                    self.entry_grid.set_columns([])
+                    self.grid_columns = []
+            
+            if self.is_tab_built("View Data"):
+                self.results_grid.clear()
+                self.discard_changes()
+            if self.is_tab_built("Table Management"):
+                self.tables_listbox.delete("1.0", "end")
+            self.executor.submit(
+                self.engine.close_pool, pool,
+                on_success=on_disconnected,
+                on_error=lambda e: messagebox.showerror("Error", f"Error while disconnecting: {str(e)}")
+            )
         else:
             messagebox.showinfo("Info", "Not connected to any database.")
 
+    def setup_stats_tab(self):
+        self.stats_frame = ctk.CTkFrame(self.tab_stats)
+        self.stats_frame.pack(pady=20, padx=20, fill="both", expand=True)
+        
+        # Toolbar
+        stats_toolbar = ctk.CTkFrame(self.stats_frame, fg_color="transparent")
+        stats_toolbar.pack(fill="x", padx=10, pady=(10,5))
+        
+        self.capture_stats_var = ctk.BooleanVar(value=self.instrumentation.capture_statistics)
+        self.capture_stats_check = ctk.CTkCheckBox(
+            stats_toolbar,
+            text="Capture SET STATISTICS IO, TIME messages",
+            variable=self.capture_stats_var,
+            command=self.on_capture_statistics_changed
+        )
+        self.capture_stats_check.pack(side="left", padx=5)
+        
+        self.export_stats_btn = ctk.CTkButton(
+            stats_toolbar,
+            text="Export...",
+            command=self.export_stats,
+            width=100
+        )
+        self.export_stats_btn.pack(side="right", padx=5)
+        
+        self.clear_stats_btn = ctk.CTkButton(
+            stats_toolbar,
+            text="Clear",
+            command=self.clear_stats,
+            width=100,
+            fg_color="#D32F2F"
+        )
+        self.clear_stats_btn.pack(side="right", padx=5)
+        
+        # One row per recorded operation, newest first
+        stats_tree_frame = ctk.CTkFrame(self.stats_frame)
+        stats_tree_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        columns = ("time", "kind", "label", "connect", "execute", "fetch", "render", "total", "rows", "kb", "error")
+        headings = ("Time", "Kind", "Operation", "Connect ms", "Execute ms", "Fetch ms", "Render ms",
+                    "Total ms", "Rows", "KB", "Error")
+        self.stats_tree = ttk.Treeview(stats_tree_frame, columns=columns, show="headings", height=12)
+        for column, heading in zip(columns, headings):
+            self.stats_tree.heading(column, text=heading)
+            self.stats_tree.column(column, width=80, minwidth=50, anchor="e")
+        self.stats_tree.column("time", width=90, anchor="w")
+        self.stats_tree.column("kind", width=70, anchor="w")
+        self.stats_tree.column("label", width=220, anchor="w")
+        self.stats_tree.column("error", width=200, anchor="w")
+        
+        stats_vsb = ttk.Scrollbar(stats_tree_frame, orient="vertical", command=self.stats_tree.yview)
+        self.stats_tree.configure(yscrollcommand=stats_vsb.set)
+        stats_vsb.pack(side="right", fill="y")
+        self.stats_tree.pack(fill="both", expand=True)
+        self.stats_tree.tag_configure("error", foreground="#D32F2F")
+        self.stats_tree.bind("<<TreeviewSelect>>", self.on_stats_selected)
+        
+        # Server messages (STATISTICS IO/TIME output) of the selected operation
+        self.stats_messages = ctk.CTkTextbox(self.stats_frame, height=100)
+        self.stats_messages.pack(fill="x", padx=10, pady=(5,10))
+        
+        self.stats_operations = {}
+        for operation in self.instrumentation.snapshot():
+            self.show_operation(operation)
+    
+    def show_operation(self, operation):
+        record = operation.as_dict()
+        values = (
+            record["started_at"].split(" ")[1],
+            record["kind"],
+            record["label"],
+            record["connect_ms"],
+            record["execute_ms"],
+            record["fetch_ms"],
+            record["render_ms"],
+            record["total_ms"],
+            record["rows"],
+            f"{record['bytes'] / 1024:,.1f}",
+            record["error"]
+        )
+        item = self.stats_tree.insert("", 0, values=values, tags=("error",) if record["error"] else ())
+        self.stats_operations[item] = operation
+        
+        # Keep the tree no larger than the ring buffer
+        items = self.stats_tree.get_children()
+        if len(items) > self.instrumentation.records.maxlen:
+            for old in items[self.instrumentation.records.maxlen:]:
+                self.stats_operations.pop(old, None)
+                self.stats_tree.delete(old)
+    
+    def on_operation_recorded(self, operation):
+        if self.is_tab_built("Query Stats"):
+            self.show_operation(operation)
+    
+    def on_stats_selected(self, event):
+        selection = self.stats_tree.selection()
+        self.stats_messages.delete("1.0", "end")
+        if selection:
+            operation = self.stats_operations.get(selection[0])
+            if operation is not None:
+                record = operation.as_dict()
+                text = record["label"]
+                if record["error"]:
+                    text += f"\n\nError: {record['error']}"
+                if record["messages"]:
+                    text += "\n\n" + record["messages"]
+                self.stats_messages.insert("1.0", text)
+    
+    def on_capture_statistics_changed(self):
+        enabled = bool(self.capture_stats_var.get())
+        self.instrumentation.capture_statistics = enabled
+        self.settings["capture_statistics"] = enabled
+        self.save_settings()
+    
+    def clear_stats(self):
+        self.instrumentation.clear()
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        self.stats_operations.clear()
+        self.stats_messages.delete("1.0", "end")
+    
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(
+            title="Export query stats",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            count = self.instrumentation.export(path)
+            messagebox.showinfo("Export", f"{count} operations exported to {os.path.basename(path)}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export stats: {str(e)}")
+
     def setup_settings_tab(self):
         # Main Frame for Settings
         self.settings_frame = ctk.CTkFrame(self.tab_settings)
@@ -657,6 +1456,23 @@ class DatabaseGUI:
             text_color="gray"
         )
         self.restart_label.pack(pady=10)
+        
+        # Startup timing report
+        self.startup_label = ctk.CTkLabel(self.settings_frame, text="", text_color="gray", justify="left")
+        self.startup_label.pack(pady=10)
+        self.update_startup_report()
+
+    def update_startup_report(self):
+        def ms(seconds):
+            return f"{seconds * 1000:.0f} ms"
+        
+        timings = self.startup_timings
+        lines = [f"Startup: imports {ms(timings['import'])}, widgets {ms(timings['widgets'])}"]
+        if "first_paint" in timings:
+            lines[0] += f", first paint {ms(timings['first_paint'])}"
+        tabs = ", ".join(f"{name} {ms(seconds)}" for name, seconds in self.tab_build_timings.items())
+        lines.append(f"Tab build: {tabs}")
+        self.startup_label.configure(text="\n".join(lines))
 
     def change_theme(self, choice):
         theme = choice.lower()
@@ -778,9 +1594,10 @@ class DatabaseGUI:
         self.restart_label.configure(text=translations[lang]["restart_note"])
         
         # Update data management buttons
-        self.edit_btn.configure(text=translations[lang]["edit_selected"])
-        self.delete_btn.configure(text=translations[lang]["delete_selected"])
-        self.save_changes_btn.configure(text=translations[lang]["save_changes"])
+        if self.is_tab_built("View Data"):
+            self.edit_btn.configure(text=translations[lang]["edit_selected"])
+            self.delete_btn.configure(text=translations[lang]["delete_selected"])
+            self.save_changes_btn.configure(text=translations[lang]["save_changes"])
 
     def setup_view_tab(self):
         # Main Frame for View Data
@@ -815,41 +1632,290 @@ class DatabaseGUI:
         )
         self.view_table_btn.pack(side="left", padx=5)
         
-        # SQL Query Frame
-        self.query_frame = ctk.CTkFrame(self.view_frame)
-        self.query_frame.pack(fill="x", pady=10)
-        
-        self.query_label = ctk.CTkLabel(self.query_frame, text="SQL Query:")
+        # Browse mode: stream the whole table or page through it server-side
+        self.view_mode_combo = ctk.CTkComboBox(
+            self.view_controls_frame,
+            values=["Stream", "Paged"],
+            width=100,
+            command=self.on_view_mode_changed
+        )
+        self.view_mode_combo.pack(side="left", padx=5)
+        self.view_mode_combo.set("Stream")
+        
+        # Column filters and heading-click sorting run on the server in paged mode
+        self.view_filters_btn = ctk.CTkButton(
+            self.view_controls_frame,
+            text="Filters...",
+            command=self.open_filter_dialog,
+            width=90
+        )
+        self.view_filters_btn.pack(side="left", padx=5)
+        self.view_table = None
+        self.view_sort = None
+        self.view_filters = {}
+        
+        # SQL Query Frame
+        self.query_frame = ctk.CTkFrame(self.view_frame)
+        self.query_frame.pack(fill="x", pady=10)
+        
+        self.query_label = ctk.CTkLabel(self.query_frame, text="SQL Query:")
         self.query_label.pack(anchor="w", padx=5)
         
         self.query_text = ctk.CTkTextbox(self.query_frame, height=100)
         self.query_text.pack(fill="x", padx=5, pady=5)
         
+        self.query_buttons_frame = ctk.CTkFrame(self.query_frame, fg_color="transparent")
+        self.query_buttons_frame.pack(pady=5)
+        
         self.execute_query_btn = ctk.CTkButton(
-            self.query_frame,
+            self.query_buttons_frame,
             text="Execute Query",
             command=self.execute_query,
             width=120,
             fg_color="#2E7D32"
         )
-        self.execute_query_btn.pack(pady=5)
+        self.execute_query_btn.pack(side="left", padx=5)
+        
+        # Explain shows the execution plan instead of the results; the actual
+        # plan runs the query (changes are rolled back), the estimated one does not
+        self.explain_btn = ctk.CTkButton(
+            self.query_buttons_frame,
+            text="Explain",
+            command=self.explain_query,
+            width=90,
+            fg_color="#6A1B9A"
+        )
+        self.explain_btn.pack(side="left", padx=5)
+        
+        self.plan_mode_combo = ctk.CTkComboBox(
+            self.query_buttons_frame,
+            values=["Estimated", "Actual"],
+            width=110
+        )
+        self.plan_mode_combo.pack(side="left", padx=5)
+        self.plan_mode_combo.set("Estimated")
+        
+        # Export re-runs the last table view or query straight to a file
+        self.export_btn = ctk.CTkButton(
+            self.query_buttons_frame,
+            text="Export...",
+            command=self.export_results,
+            width=120,
+            fg_color="#1976D2"
+        )
+        self.export_btn.pack(side="left", padx=5)
+        
+        self.history_btn = ctk.CTkButton(
+            self.query_buttons_frame,
+            text="History...",
+            command=self.open_history,
+            width=100
+        )
+        self.history_btn.pack(side="left", padx=5)
+        
+        # Re-running a recent SELECT shows the cached rows instead of querying
+        self.cache_results_var = ctk.BooleanVar(value=self.settings.get("result_cache", False))
+        self.cache_results_check = ctk.CTkCheckBox(
+            self.query_buttons_frame,
+            text="Cache results",
+            variable=self.cache_results_var,
+            command=self.on_cache_results_changed
+        )
+        self.cache_results_check.pack(side="left", padx=5)
+        self.export_query = None
+        self.export_cancel_event = None
+        
+        # Scripts are split on GO and run batch by batch; each result set
+        # gets its own tab next to the main results
+        self.script_buttons_frame = ctk.CTkFrame(self.query_frame, fg_color="transparent")
+        self.script_buttons_frame.pack(pady=(0,5))
+        
+        self.run_script_btn = ctk.CTkButton(
+            self.script_buttons_frame,
+            text="Run Script",
+            command=self.run_script,
+            width=120,
+            fg_color="#2E7D32"
+        )
+        self.run_script_btn.pack(side="left", padx=5)
+        
+        self.stop_on_error_var = ctk.BooleanVar(value=True)
+        self.stop_on_error_check = ctk.CTkCheckBox(
+            self.script_buttons_frame,
+            text="Stop on error",
+            variable=self.stop_on_error_var
+        )
+        self.stop_on_error_check.pack(side="left", padx=5)
+        
+        # Runs the query on a list of databases at once
+        self.fan_out_btn = ctk.CTkButton(
+            self.script_buttons_frame,
+            text="Run on Databases...",
+            command=self.open_fan_out_dialog,
+            width=150,
+            fg_color="#1976D2"
+        )
+        self.fan_out_btn.pack(side="left", padx=5)
+        self.fan_out_runner = None
+        self.script_runner = None
+        self.script_tabs = []
+        self.messages_frame = None
+        
+        # Find bar over the loaded results; searches run in slices between
+        # frames so typing stays responsive
+        self.find_frame = ctk.CTkFrame(self.view_frame, fg_color="transparent")
+        self.find_frame.pack(fill="x")
+        
+        self.find_entry = ctk.CTkEntry(self.find_frame, width=220, placeholder_text="Find in results...")
+        self.find_entry.pack(side="left", padx=5)
+        self.find_entry.bind("<KeyRelease>", self.on_find_changed)
+        self.find_entry.bind("<Return>", lambda event: self.find_next(1))
+        self.find_entry.bind("<Shift-Return>", lambda event: self.find_next(-1))
+        
+        self.find_column_combo = ctk.CTkComboBox(
+            self.find_frame,
+            values=["All columns"],
+            width=150,
+            command=lambda choice: self.start_find()
+        )
+        self.find_column_combo.pack(side="left", padx=5)
+        self.find_column_combo.set("All columns")
+        
+        self.find_regex_var = ctk.BooleanVar(value=False)
+        self.find_regex_check = ctk.CTkCheckBox(
+            self.find_frame,
+            text="Regex",
+            variable=self.find_regex_var,
+            command=self.start_find
+        )
+        self.find_regex_check.pack(side="left", padx=5)
+        
+        self.find_prev_btn = ctk.CTkButton(self.find_frame, text="<", command=lambda: self.find_next(-1), width=30)
+        self.find_prev_btn.pack(side="left", padx=2)
+        self.find_next_btn = ctk.CTkButton(self.find_frame, text=">", command=lambda: self.find_next(1), width=30)
+        self.find_next_btn.pack(side="left", padx=2)
+        
+        self.find_label = ctk.CTkLabel(self.find_frame, text="", text_color="gray")
+        self.find_label.pack(side="left", padx=10)
+        self.app.bind("<Control-f>", lambda event: self.find_entry.focus_set())
+        self.find_job = None
+        self.find_search = None
+        self.find_generation = None
+        self.find_matches = []
         
         # Results Frame
-        self.results_frame = ctk.CTkFrame(self.view_frame)
-        self.results_frame.pack(fill="both", expand=True, pady=10)
+        self.results_notebook = ttk.Notebook(self.view_frame)
+        self.results_notebook.pack(fill="both", expand=True, pady=10)
+        self.results_frame = ctk.CTkFrame(self.results_notebook)
+        self.results_notebook.add(self.results_frame, text="Results")
+        
+        # Paging controls (only shown in paged mode)
+        self.page_frame = ctk.CTkFrame(self.view_frame)
+        
+        self.prev_page_btn = ctk.CTkButton(
+            self.page_frame,
+            text="< Prev",
+            command=lambda: self.show_page(self.pager.page - 1),
+            width=80
+        )
+        self.prev_page_btn.pack(side="left", padx=5)
+        
+        self.next_page_btn = ctk.CTkButton(
+            self.page_frame,
+            text="Next >",
+            command=lambda: self.show_page(self.pager.page + 1),
+            width=80
+        )
+        self.next_page_btn.pack(side="left", padx=5)
+        
+        self.page_entry = ctk.CTkEntry(self.page_frame, width=70, placeholder_text="Page")
+        self.page_entry.pack(side="left", padx=5)
+        self.page_entry.bind("<Return>", lambda event: self.jump_to_page())
+        
+        self.go_page_btn = ctk.CTkButton(
+            self.page_frame,
+            text="Go",
+            command=self.jump_to_page,
+            width=50
+        )
+        self.go_page_btn.pack(side="left", padx=5)
+        
+        self.page_label = ctk.CTkLabel(self.page_frame, text="")
+        self.page_label.pack(side="left", padx=10)
+        
+        self.pager = None
+        self.pager_preview = None
+        # (grid generation, table name, LobPreview) of the table being browsed
+        self.view_preview = None
         
         # Create Treeview for results
         self.results_tree = ttk.Treeview(self.results_frame)
         self.results_tree.pack(fill="both", expand=True)
         
         # Add scrollbars
-        self.vsb = ttk.Scrollbar(self.results_frame, orient="vertical", command=self.results_tree.yview)
+        self.vsb = ttk.Scrollbar(self.results_frame, orient="vertical")
         self.hsb = ttk.Scrollbar(self.results_frame, orient="horizontal", command=self.results_tree.xview)
-        self.results_tree.configure(yscrollcommand=self.vsb.set, xscrollcommand=self.hsb.set)
+        self.results_tree.configure(xscrollcommand=self.hsb.set)
         
         self.vsb.pack(side="right", fill="y")
         self.hsb.pack(side="bottom", fill="x")
         
+        # Only the visible rows live in the tree; the grid streams the rest
+        self.results_grid = VirtualResultGrid(self.results_tree, self.vsb, self.executor, searchable=True)
+        
+        # Double-click opens a cell in the value viewer; truncated LOB cells
+        # are read in full from the server. Cells of a browsed table with a
+        # primary key are edited in place instead
+        self.results_tree.bind("<Double-1>", self.on_result_double_click)
+        self.results_grid.on_rows_appended = self.on_result_rows_appended
+        
+        # Edits and deletes are kept in a change set until saved together
+        self.edit_frame = ctk.CTkFrame(self.view_frame, fg_color="transparent")
+        self.edit_frame.pack(fill="x")
+        
+        self.edit_btn = ctk.CTkButton(
+            self.edit_frame,
+            text="Edit Selected",
+            command=self.edit_selected_row,
+            width=120
+        )
+        self.edit_btn.pack(side="left", padx=5)
+        
+        self.delete_btn = ctk.CTkButton(
+            self.edit_frame,
+            text="Delete Selected",
+            command=self.delete_selected_rows,
+            width=120,
+            fg_color="#D32F2F"
+        )
+        self.delete_btn.pack(side="left", padx=5)
+        
+        self.save_changes_btn = ctk.CTkButton(
+            self.edit_frame,
+            text="Save Changes",
+            command=self.save_changes,
+            width=120,
+            fg_color="#2E7D32"
+        )
+        self.save_changes_btn.pack(side="left", padx=5)
+        
+        self.discard_changes_btn = ctk.CTkButton(
+            self.edit_frame,
+            text="Discard Changes",
+            command=self.discard_changes,
+            width=120
+        )
+        self.discard_changes_btn.pack(side="left", padx=5)
+        
+        self.changes_label = ctk.CTkLabel(self.edit_frame, text="", text_color="gray")
+        self.changes_label.pack(side="left", padx=10)
+        self.change_set = None
+        # Primary key -> (display values, tag) of every changed row, so the
+        # changes stay visible when the rows are loaded again
+        self.changed_rows = {}
+        self.cell_editor = None
+        self.saving_changes = False
+        
         # Status Label
         self.view_status_label = ctk.CTkLabel(
             self.view_frame,
@@ -859,29 +1925,24 @@ class DatabaseGUI:
         self.view_status_label.pack(pady=5)
 
     def refresh_view_tables(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
             
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT TABLE_NAME 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_TYPE = 'BASE TABLE'
-                ORDER BY TABLE_NAME
-            """)
-            
-            tables = [table[0] for table in cursor.fetchall()]
+        def show_tables(tables):
             self.view_table_combo.configure(values=tables)
             if tables:
                 self.view_table_combo.set(tables[0])
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to refresh tables list: {str(e)}")
+        
+        self.executor.submit(
+            self.engine.table_names, True,
+            operation=self.instrumentation.begin("metadata", "Table list"),
+            on_success=show_tables,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to refresh tables list: {str(e)}")
+        )
 
     def view_table_data(self):
-        if not self.connection:
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
             
@@ -889,112 +1950,1388 @@ class DatabaseGUI:
         if not table_name:
             messagebox.showerror("Error", "Please select a table!")
             return
-            
+        
+        if not self.confirm_discard_changes(table_name):
+            return
+        
+        if table_name != self.view_table:
+            self.view_table = table_name
+            self.view_sort = None
+            self.view_filters = {}
+        
+        if self.view_sort or self.view_filters:
+            # Sorted or filtered rows are only browsed page by page
+            self.view_mode_combo.set("Paged")
+            self.on_view_mode_changed("Paged")
+        if self.view_mode_combo.get() == "Paged":
+            self.view_table_paged(table_name)
+            return
+        
+        # Streaming a huge table would fill the grid's spool and keep a scan
+        # open on the server; above the threshold it is paged instead
+        threshold = self.settings.get("large_table_rows", 1000000)
+        
+        def on_counted(rows):
+            if rows is not None and rows > threshold:
+                self.view_mode_combo.set("Paged")
+                self.on_view_mode_changed("Paged")
+                self.view_table_paged(table_name)
+            else:
+                self.view_table_streamed(table_name)
+        
+        self.view_status_label.configure(text=f"Loading {table_name}...", text_color="gray")
+        self.executor.submit(
+            self.engine.row_count, table_name,
+            operation=self.instrumentation.begin("metadata", f"Row count of {table_name}"),
+            on_success=on_counted,
+            on_error=self.on_view_error
+        )
+
+    def view_table_streamed(self, table_name):
+        self.export_query = (f"SELECT * FROM {quote_name(table_name)}", [])
+        state = {}
+        
+        def open_cursor():
+            # LOB columns come back as previews; the cursor keeps its pooled
+            # connection until the grid closes it
+            preview = state["preview"] = self.engine.lob_preview(table_name, self.settings.get("lob_preview_chars"))
+            return self.engine.open_table(table_name, preview)
+        
+        def on_ready(description, rowcount):
+            preview = state["preview"]
+            self.results_grid.raw_positions = list(range(len(preview.columns)))
+            self.view_preview = (self.results_grid.generation, table_name, preview)
+            self.configure_result_columns(preview.display_description(description), sortable=True)
+        
+        def on_rows_loaded(count, exhausted):
+            more = "" if exhausted else " (scroll for more)"
+            self.view_status_label.configure(
+                text=f"Displaying {count} rows from {table_name}{more}",
+                text_color="#2E7D32"
+            )
+        
+        self.view_status_label.configure(text=f"Loading {table_name}...", text_color="gray")
+        self.results_grid.load(
+            open_cursor,
+            on_ready=on_ready,
+            on_error=self.on_view_error,
+            on_rows_loaded=on_rows_loaded,
+            operation=self.instrumentation.begin("view", table_name),
+            formatter=lambda description: state["preview"].row_formatter(description)
+        )
+
+    def on_view_mode_changed(self, choice):
+        if choice == "Paged":
+            self.page_frame.pack(fill="x", pady=(0,5), before=self.results_notebook)
+        else:
+            self.page_frame.pack_forget()
+            self.pager = None
+            self.pager_preview = None
+            self.view_sort = None
+            self.view_filters = {}
+
+    def view_table_paged(self, table_name):
+        filters = dict(self.view_filters)
+        sort = self.view_sort
+        
+        def open_pager():
+            preview = self.engine.lob_preview(table_name, self.settings.get("lob_preview_chars"))
+            return preview, self.engine.open_pager(table_name, preview=preview, filters=filters, sort=sort)
+        
+        def on_opened(result):
+            self.pager_preview, self.pager = result
+            self.export_query = self.pager.full_query()
+            self.show_page(0)
+        
+        self.view_status_label.configure(text=f"Loading {table_name}...", text_color="gray")
+        self.executor.submit(
+            open_pager,
+            operation=self.instrumentation.begin("metadata", f"Paging keys of {table_name}"),
+            on_success=on_opened,
+            on_error=self.on_view_error
+        )
+
+    def show_page(self, page):
+        pager = self.pager
+        preview = self.pager_preview
+        if pager is None or page < 0:
+            return
+        if pager.page_count is not None and page >= pager.page_count:
+            return
+        
+        def fetch():
+            description, rows = self.engine.fetch_page(pager, page)
+            raw = [tuple(row[:len(preview.columns)]) for row in rows]
+            return description, rows, preview.row_formatter(description)(rows), raw
+        
+        def show(result):
+            description, rows, formatted, raw = result
+            if pager is not self.pager:
+                return
+            # A page past the end (row count was stale) keeps the current page
+            if not rows and page > 0:
+                pager.row_count = 0
+                self.update_page_controls()
+                return
+            pager.page_loaded(page, description, rows)
+            self.configure_result_columns(preview.display_description(description), sortable=True)
+            self.results_grid.show_rows(formatted, raw)
+            self.view_preview = (self.results_grid.generation, pager.table_name, preview)
+            if self.changed_rows:
+                self.show_changed_rows(0, len(rows))
+                self.results_grid.render()
+            self.update_page_controls()
+            mode = "keyset" if pager.keyed and pager.order is None else "offset"
+            details = [f"{mode} paging"]
+            if pager.where is not None:
+                details.append("filtered")
+            if pager.order is not None:
+                details.append(f"sorted by {pager.order}")
+            if pager.total_rows is not None:
+                details.append(f"{pager.total_rows:,} rows in table")
+            self.view_status_label.configure(
+                text=f"Displaying {len(rows)} rows from {pager.table_name} ({', '.join(details)})",
+                text_color="#2E7D32"
+            )
+        
+        self.executor.submit(
+            fetch,
+            operation=self.instrumentation.begin("view", f"{pager.table_name} page {page + 1}"),
+            on_success=show,
+            on_error=self.on_view_error
+        )
+
+    def jump_to_page(self):
+        try:
+            page = int(self.page_entry.get().strip()) - 1
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a page number!")
+            return
+        self.show_page(page)
+
+    def update_page_controls(self):
+        pager = self.pager
+        total = pager.page_count
+        of_total = f" of {total}" if total is not None else ""
+        self.page_label.configure(text=f"Page {pager.page + 1}{of_total}")
+        self.prev_page_btn.configure(state="normal" if pager.has_prev else "disabled")
+        has_next = pager.has_next and (total is None or pager.page + 1 < total)
+        self.next_page_btn.configure(state="normal" if has_next else "disabled")
+
+    def configure_result_columns(self, description, tree=None, sortable=False):
+        # Configure treeview columns from the cursor description; headings of
+        # a browsed table sort it on the server when clicked
+        columns = [col[0] for col in description]
+        if tree is None:
+            tree = self.results_tree
+            self.results_notebook.select(self.results_frame)
+            self.find_column_combo.configure(values=["All columns"] + columns)
+            if self.find_column_combo.get() not in columns:
+                self.find_column_combo.set("All columns")
+        tree["columns"] = columns
+        tree["show"] = "headings"
+        
+        # Set column headings and widths
+        for col_name, type_code in ((col[0], col[1]) for col in description):
+            if sortable:
+                text = col_name
+                if self.view_sort and self.view_sort[0] == col_name:
+                    text += " \u25bc" if self.view_sort[1] else " \u25b2"
+                if self.view_filters.get(col_name):
+                    text += " (filtered)"
+                tree.heading(col_name, text=text, command=lambda name=col_name: self.on_heading_click(name))
+            else:
+                tree.heading(col_name, text=col_name, command="")
+            # Adjust column width based on data type
+            if type_code is str:
+                tree.column(col_name, width=150, minwidth=100)
+            elif type_code in (datetime.datetime, datetime.date, datetime.time):
+                tree.column(col_name, width=150, minwidth=120)
+            else:
+                tree.column(col_name, width=100, minwidth=80)
+
+    def on_heading_click(self, column):
+        # Ascending, then descending, then back to the table's key order
+        if self.view_table is None or not self.engine.connected:
+            return
+        if self.view_sort is None or self.view_sort[0] != column:
+            self.view_sort = (column, False)
+        elif not self.view_sort[1]:
+            self.view_sort = (column, True)
+        else:
+            self.view_sort = None
+        self.view_table_combo.set(self.view_table)
+        self.view_table_data()
+
+    def open_filter_dialog(self):
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        table_name = self.view_table_combo.get()
+        if not table_name:
+            messagebox.showerror("Error", "Please select a table!")
+            return
+        
+        self.executor.submit(
+            self.engine.columns, table_name,
+            operation=self.instrumentation.begin("metadata", f"Columns of {table_name}"),
+            on_success=lambda columns: self.show_filter_dialog(table_name, columns),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load columns: {str(e)}")
+        )
+
+    def show_filter_dialog(self, table_name, columns):
+        window = ctk.CTkToplevel(self.app)
+        window.title(f"Filter {table_name}")
+        window.geometry("520x480")
+        window.transient(self.app)
+        
+        ctk.CTkLabel(
+            window,
+            text="text: prefix or *part*   numbers/dates: = > >= < <= <> value, low..high   NULL, NOT NULL",
+            text_color="gray",
+            wraplength=480,
+            justify="left"
+        ).pack(padx=10, pady=(10,5), anchor="w")
+        
+        rows_frame = ctk.CTkScrollableFrame(window)
+        rows_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        current = self.view_filters if table_name == self.view_table else {}
+        entries = {}
+        for row, column in enumerate(columns):
+            ctk.CTkLabel(rows_frame, text=column.name, anchor="w").grid(row=row, column=0, padx=5, pady=2, sticky="w")
+            ctk.CTkLabel(rows_frame, text=column.data_type, text_color="gray").grid(row=row, column=1, padx=5, pady=2, sticky="w")
+            entry = ctk.CTkEntry(rows_frame, width=220)
+            entry.grid(row=row, column=2, padx=5, pady=2, sticky="ew")
+            entry.insert(0, current.get(column.name, ""))
+            entry.bind("<Return>", lambda event: apply())
+            entries[column.name] = entry
+        
+        def apply(filters=None):
+            if filters is None:
+                filters = {name: entry.get().strip() for name, entry in entries.items() if entry.get().strip()}
+            if table_name != self.view_table:
+                self.view_table = table_name
+                self.view_sort = None
+            self.view_filters = filters
+            window.destroy()
+            self.view_table_combo.set(table_name)
+            self.view_table_data()
+        
+        buttons_frame = ctk.CTkFrame(window, fg_color="transparent")
+        buttons_frame.pack(pady=(5,10))
+        ctk.CTkButton(buttons_frame, text="Apply", command=apply, width=120, fg_color="#2E7D32").pack(side="left", padx=5)
+        ctk.CTkButton(
+            buttons_frame, text="Clear Filters", command=lambda: apply({}), width=120, fg_color="#D32F2F"
+        ).pack(side="left", padx=5)
+
+    def on_result_double_click(self, event):
+        tree = self.results_tree
+        item = tree.identify_row(event.y)
+        column = tree.identify_column(event.x)
+        if not item or not column:
+            return
+        position = int(column[1:]) - 1
+        index = self.results_grid.row_index(item)
+        values = self.results_grid.row_values(index)
+        if values is None or position >= len(values):
+            return
+        
+        source = self.view_preview
+        if source is not None and source[0] == self.results_grid.generation:
+            _, table_name, preview = source
+            raw = self.results_grid.row_raw(index)
+            key = preview.key_of(raw) if raw is not None and preview.key_columns else None
+            if key is not None and self.is_editable_position(preview, position):
+                self.begin_cell_edit(item, index, position)
+                return
+            if preview.is_lob_position(position) and key is not None and values[position] != NULL_MARKER:
+                column_info = preview.columns[position]
+                self.open_value_viewer(
+                    f"{table_name}.{column_info.name}",
+                    source=(table_name, column_info.name, key, preview.is_binary(column_info))
+                )
+                return
+        self.open_value_viewer(tree["columns"][position], text=values[position])
+
+    def on_result_rows_appended(self, start, count):
+        self.show_changed_rows(start, count)
+        self.on_find_rows_appended(start, count)
+
+    def editable_source(self):
+        # (table name, LobPreview) of the browsed table if its rows can be
+        # edited, i.e. the grid shows it and it has a primary key
+        source = self.view_preview
+        if source is None or source[0] != self.results_grid.generation or not source[2].key_columns:
+            return None
+        return source[1], source[2]
+
+    def is_editable_position(self, preview, position):
+        column = preview.columns[position]
+        return column.name not in preview.key_columns and is_editable(column)
+
+    def ensure_change_set(self, table_name, preview):
+        change_set = self.change_set
+        if change_set is None or change_set.table_name != table_name:
+            change_set = self.change_set = ChangeSet(table_name, preview.columns, preview.key_columns)
+            self.changed_rows = {}
+        return change_set
+
+    def show_changed_rows(self, start, count):
+        # Overlay pending changes on rows that were just (re)loaded
+        source = self.editable_source()
+        if not self.changed_rows or source is None or source[0] != self.change_set.table_name:
+            return
+        grid = self.results_grid
+        for index in range(start, start + count):
+            raw = grid.row_raw(index)
+            if raw is None:
+                break
+            changed = self.changed_rows.get(self.change_set.key_of(raw))
+            if changed is not None:
+                grid.pending[index] = changed
+
+    def update_changes_label(self):
+        count = len(self.change_set) if self.change_set is not None else 0
+        self.changes_label.configure(
+            text=f"{count} unsaved change{'s' if count != 1 else ''} to {self.change_set.table_name}" if count else ""
+        )
+
+    def is_null_cell(self, index, position):
+        # Decided by the value, pending edit first: the text of a string
+        # cell can read NULL as well
+        raw = self.results_grid.row_raw(index)
+        if raw is None:
+            return False
+        change_set = self.change_set
+        source = self.editable_source()
+        if change_set is not None and source is not None and source[0] == change_set.table_name:
+            updates = change_set.updates.get(change_set.key_of(raw), {})
+            name = change_set.columns[position].name
+            if name in updates:
+                return updates[name] is None
+        return raw[position] is None
+
+    def begin_cell_edit(self, item, index, position):
+        # An entry placed over the cell; Return, leaving it or scrolling keeps
+        # the new text, Escape drops it
+        self.end_cell_edit(True)
+        if self.saving_changes:
+            return
+        tree = self.results_tree
+        bbox = tree.bbox(item, f"#{position + 1}")
+        if not bbox:
+            return
+        x, y, width, height = bbox
+        pending = self.results_grid.pending.get(index)
+        values = pending[0] if pending is not None else self.results_grid.row_values(index)
+        text = "" if self.is_null_cell(index, position) else values[position]
+
+        entry = ttk.Entry(tree)
+        entry.insert(0, text)
+        entry.select_range(0, "end")
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.focus_set()
+        self.cell_editor = (entry, self.results_grid.generation, index, position, text)
+        entry.bind("<Return>", lambda event: self.end_cell_edit(True))
+        entry.bind("<Escape>", lambda event: self.end_cell_edit(False))
+        entry.bind("<FocusOut>", lambda event: self.end_cell_edit(True))
+        self.results_grid.on_scroll = lambda: self.end_cell_edit(True)
+
+    def end_cell_edit(self, keep):
+        if self.cell_editor is None:
+            return
+        entry, generation, index, position, old_text = self.cell_editor
+        self.cell_editor = None
+        self.results_grid.on_scroll = None
+        text = entry.get()
+        entry.destroy()
+        source = self.editable_source()
+        if not keep or generation != self.results_grid.generation or source is None:
+            return
+        if text == old_text:
+            return
+
+        table_name, preview = source
+        change_set = self.ensure_change_set(table_name, preview)
+        raw = self.results_grid.row_raw(index)
+        column = preview.columns[position]
         try:
-            # Clear existing items
-            self.results_tree.delete(*self.results_tree.get_children())
+            key, value = change_set.edit(raw, column.name, text)
+        except (ValueError, TypeError, OverflowError) as e:
+            messagebox.showerror("Error", f"Invalid value for {column.name}: {str(e)}")
+            return
+        pending = self.results_grid.pending.get(index)
+        values = list(pending[0] if pending is not None else self.results_grid.row_values(index))
+        values[position] = NULL_MARKER if value is None else text.strip()
+        self.changed_rows[key] = self.results_grid.pending[index] = (tuple(values), "edited")
+        self.results_grid.render()
+        self.update_changes_label()
+        self.view_status_label.configure(
+            text="Changes saved. Click 'Save Changes' to update database.",
+            text_color="#1565C0"
+        )
+
+    def edit_selected_row(self):
+        source = self.editable_source()
+        if source is None:
+            messagebox.showerror("Error", "Browse a table with a primary key to edit its rows!")
+            return
+        selection = self.results_tree.selection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a row!")
+            return
+        _, preview = source
+        position = next(
+            (p for p in range(len(preview.columns)) if self.is_editable_position(preview, p)), None
+        )
+        if position is None:
+            messagebox.showerror("Error", "This table has no editable columns!")
+            return
+        item = selection[0]
+        self.results_tree.see(item)
+        self.begin_cell_edit(item, self.results_grid.row_index(item), position)
+
+    def delete_selected_rows(self):
+        self.end_cell_edit(True)
+        source = self.editable_source()
+        if source is None:
+            messagebox.showerror("Error", "Browse a table with a primary key to delete its rows!")
+            return
+        selection = self.results_tree.selection()
+        if not selection:
+            messagebox.showerror("Error", "Please select at least one row!")
+            return
+        if self.saving_changes:
+            return
+        table_name, preview = source
+        change_set = self.ensure_change_set(table_name, preview)
+        grid = self.results_grid
+        for item in selection:
+            index = grid.row_index(item)
+            raw = grid.row_raw(index)
+            if raw is None:
+                continue
+            values = grid.pending[index][0] if index in grid.pending else grid.row_values(index)
+            key = change_set.delete(raw)
+            self.changed_rows[key] = grid.pending[index] = (values, "deleted")
+        grid.tree.selection_remove(selection)
+        grid.render()
+        self.update_changes_label()
+        self.view_status_label.configure(
+            text="Row marked for deletion. Click 'Save Changes' to update database.",
+            text_color="#1565C0"
+        )
+
+    def save_changes(self):
+        self.end_cell_edit(True)
+        change_set = self.change_set
+        if change_set is None or not len(change_set):
+            messagebox.showinfo("Info", "No changes to save!")
+            return
+        if self.saving_changes:
+            return
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        
+        def on_saved(result):
+            self.saving_changes = False
+            updated, deleted = result
+            self.discard_changes()
+            messagebox.showinfo(
+                "Success",
+                f"All changes saved successfully! {updated} rows updated, {deleted} rows deleted."
+            )
+            if self.view_table == change_set.table_name:
+                self.view_table_combo.set(change_set.table_name)
+                self.view_table_data()
+        
+        def on_failed(e):
+            # Nothing was written; the changes stay pending
+            self.saving_changes = False
+            if isinstance(e, ConcurrencyError):
+                messagebox.showerror("Conflict", f"{str(e)}. Reload the table, or discard the changes.")
+            else:
+                messagebox.showerror("Error", f"Failed to save changes: {str(e)}")
+        
+        self.saving_changes = True
+        self.view_status_label.configure(text=f"Saving {len(change_set)} changes...", text_color="gray")
+        self.executor.submit(
+            self.engine.apply_changes, change_set,
+            operation=self.instrumentation.begin("edit", f"{len(change_set)} changes to {change_set.table_name}"),
+            on_success=on_saved,
+            on_error=on_failed
+        )
+
+    def discard_changes(self):
+        if self.saving_changes:
+            return
+        if self.cell_editor is not None:
+            self.end_cell_edit(False)
+        if self.change_set is not None:
+            self.change_set.clear()
+        self.changed_rows = {}
+        self.results_grid.pending = {}
+        self.results_grid.render()
+        self.update_changes_label()
+
+    def confirm_discard_changes(self, table_name=None):
+        # True if there are no unsaved changes (to other tables than
+        # table_name) or the user agrees to drop them
+        change_set = self.change_set
+        if change_set is None or not len(change_set) or change_set.table_name == table_name:
+            return True
+        if not messagebox.askyesno(
+            "Unsaved Changes",
+            f"Discard {len(change_set)} unsaved changes to {change_set.table_name}?"
+        ):
+            return False
+        self.discard_changes()
+        return True
+
+    def open_value_viewer(self, title, text=None, source=None):
+        # Shows either a cell's text or, for source=(table, column, key,
+        # binary), the full value streamed from the server in chunks
+        window = ctk.CTkToplevel(self.app)
+        window.title(title)
+        window.geometry("700x500")
+        
+        textbox = ctk.CTkTextbox(window, wrap="char")
+        textbox.pack(fill="both", expand=True, padx=10, pady=(10,5))
+        status = ctk.CTkLabel(window, text="", text_color="gray")
+        status.pack(padx=10, anchor="w")
+        buttons_frame = ctk.CTkFrame(window, fg_color="transparent")
+        buttons_frame.pack(pady=(5,10))
+        
+        cancel_event = threading.Event()
+        window.bind("<Destroy>", lambda event: cancel_event.set() if event.widget is window else None)
+        
+        if source is None:
+            textbox.insert("1.0", text)
+        else:
+            table_name, column_name, key, binary = source
+            max_chars = self.settings.get("lob_viewer_max_mb", 16) * 1024 * 1024
+            shown = [0]
             
-            # Get column information
-            cursor = self.connection.cursor()
-            cursor.execute(f"""
-                SELECT COLUMN_NAME, DATA_TYPE
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_NAME = '{table_name}'
-                ORDER BY ORDINAL_POSITION
-            """)
+            def show_chunk(chunk):
+                if cancel_event.is_set() or not window.winfo_exists():
+                    return
+                piece = format_chunk(chunk)
+                if binary and shown[0] == 0:
+                    piece = "0x" + piece
+                # The text widget slows down on huge values; past the limit
+                # the rest is only available through Save
+                if shown[0] + len(piece) > max_chars:
+                    piece = piece[:max_chars - shown[0]]
+                    cancel_event.set()
+                    status.configure(text=f"First {max_chars:,} characters shown; use Save for the full value")
+                else:
+                    status.configure(text=f"Loading... {shown[0] + len(piece):,} characters")
+                textbox.insert("end", piece)
+                shown[0] += len(piece)
             
-            columns = cursor.fetchall()
+            def stream():
+                with closing(self.engine.read_lob(table_name, column_name, key)) as chunks:
+                    for chunk in chunks:
+                        if cancel_event.is_set():
+                            return
+                        self.executor.post(show_chunk, chunk)
             
-            # Configure treeview columns
-            self.results_tree["columns"] = [col[0] for col in columns]
-            self.results_tree["show"] = "headings"
+            def on_streamed(_):
+                if window.winfo_exists() and not cancel_event.is_set():
+                    status.configure(text=f"{shown[0]:,} characters")
             
-            # Set column headings and widths
-            for col in columns:
-                col_name = col[0]
-                self.results_tree.heading(col_name, text=col_name)
-                # Adjust column width based on data type
-                if col[1] in ('varchar', 'nvarchar', 'char', 'nchar', 'text', 'ntext'):
-                    self.results_tree.column(col_name, width=150, minwidth=100)
-                elif col[1] in ('datetime', 'date', 'time'):
-                    self.results_tree.column(col_name, width=150, minwidth=120)
-                elif col[1] in ('decimal', 'numeric', 'float', 'real'):
-                    self.results_tree.column(col_name, width=100, minwidth=80)
-                else:
-                    self.results_tree.column(col_name, width=100, minwidth=80)
+            def on_failed(e):
+                if window.winfo_exists():
+                    status.configure(text=f"Error: {str(e)}", text_color="#D32F2F")
+            
+            status.configure(text="Loading...")
+            self.executor.submit(
+                stream,
+                operation=self.instrumentation.begin("view", f"{table_name}.{column_name} value"),
+                on_success=on_streamed,
+                on_error=on_failed
+            )
+        
+        def save():
+            path = filedialog.asksaveasfilename(parent=window, title="Save value")
+            if not path:
+                return
             
-            # Fetch and display data
-            cursor.execute(f"SELECT * FROM [{table_name}]")
-            rows = cursor.fetchall()
+            def write():
+                if source is None:
+                    with open(path, "w", encoding="utf-8", newline="") as f:
+                        f.write(text)
+                    return
+                table_name, column_name, key, binary = source
+                f = open(path, "wb") if binary else open(path, "w", encoding="utf-8", newline="")
+                with f:
+                    with closing(self.engine.read_lob(table_name, column_name, key)) as chunks:
+                        for chunk in chunks:
+                            f.write(chunk)
             
-            # Insert data into treeview
-            for row in rows:
-                # Convert all values to strings to ensure proper display
-                row_values = [str(value) if value is not None else "" for value in row]
-                self.results_tree.insert("", "end", values=row_values)
+            self.executor.submit(
+                write,
+                operation=self.instrumentation.begin("export", os.path.basename(path)),
+                on_success=lambda _: messagebox.showinfo("Save", f"Value saved to {os.path.basename(path)}", parent=window)
+                if window.winfo_exists() else None,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to save value: {str(e)}")
+            )
+        
+        ctk.CTkButton(buttons_frame, text="Save...", command=save, width=100).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="Close", command=window.destroy, width=100).pack(side="left", padx=5)
+
+    def on_find_changed(self, event):
+        if event.keysym in ("Return", "Shift_L", "Shift_R", "Left", "Right", "Up", "Down"):
+            return
+        self.start_find()
+
+    def start_find(self, start=0):
+        # Restart the search, or with start > 0 extend it over newly added rows
+        if self.find_job is not None:
+            self.app.after_cancel(self.find_job)
+            self.find_job = None
+        grid = self.results_grid
+        text = self.find_entry.get()
+        if start == 0:
+            self.find_matches = []
+            grid.matches = set()
+            grid.current_match = None
+        if not text:
+            self.find_search = None
+            self.find_label.configure(text="")
+            grid.render()
+            return
+        
+        column = self.find_column_combo.get()
+        columns = list(self.results_tree["columns"])
+        position = columns.index(column) if column in columns else None
+        self.find_generation = grid.generation
+        self.find_search = grid.search_index.matches(text, position, self.find_regex_var.get(), start)
+        self.continue_find()
+
+    def continue_find(self):
+        self.find_job = None
+        grid = self.results_grid
+        search = self.find_search
+        if search is None:
+            return
+        if grid.generation != self.find_generation:
+            # The results were replaced; the next batch restarts the search
+            self.find_search = None
+            return
+        
+        # Search chunk by chunk for at most one frame, then yield to Tk
+        deadline = time.perf_counter() + self.settings.get("find_slice_ms", 15) / 1000
+        try:
+            for rows in search:
+                self.find_matches.extend(rows)
+                grid.matches.update(rows)
+                if time.perf_counter() > deadline:
+                    self.find_job = self.app.after(1, self.continue_find)
+                    break
+            else:
+                self.find_search = None
+        except re.error as e:
+            self.find_search = None
+            self.find_label.configure(text=f"Invalid pattern: {e}", text_color="#D32F2F")
+            return
+        
+        if grid.current_match is None and self.find_matches:
+            # Jump to the first match at or below the top of the view
+            position = bisect_left(self.find_matches, grid.offset)
+            grid.show_match(self.find_matches[position % len(self.find_matches)])
+        else:
+            grid.render()
+        self.update_find_label()
+
+    def on_find_rows_appended(self, start, count):
+        if not self.find_entry.get():
+            return
+        if start == 0:
+            self.start_find()
+        elif self.find_search is None:
+            self.start_find(start)
+
+    def find_next(self, step):
+        matches = self.find_matches
+        grid = self.results_grid
+        if not matches:
+            return "break"
+        current = grid.current_match
+        if current is None:
+            position = bisect_left(matches, grid.offset)
+        elif step > 0:
+            position = bisect_right(matches, current)
+        else:
+            position = bisect_left(matches, current) - 1
+        grid.show_match(matches[position % len(matches)])
+        self.update_find_label()
+        return "break"
+
+    def update_find_label(self):
+        matches = self.find_matches
+        more = "+" if self.find_search is not None else ""
+        if not matches:
+            text = "Searching..." if more else "No matches"
+        else:
+            current = self.results_grid.current_match
+            number = bisect_left(matches, current) + 1 if current is not None else 0
+            text = f"{number:,} of {len(matches):,}{more}"
+        self.find_label.configure(text=text, text_color="gray")
+
+    def on_view_error(self, e, title="Failed to view table data"):
+        self.view_status_label.configure(
+            text=f"Error: {str(e)}",
+            text_color="#D32F2F"
+        )
+        messagebox.showerror("Error", f"{title}: {str(e)}")
+
+    def execute_query(self):
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
             
-            # Update status label
+        query = self.query_text.get("1.0", "end-1c").strip()
+        if not query:
+            messagebox.showerror("Error", "Please enter a SQL query!")
+            return
+        
+        target = self.engine.target
+        history = self.query_history()
+        cacheable = is_cacheable(query)
+        use_cache = cacheable and self.cache_results_var.get()
+        
+        if use_cache:
+            cached = self.engine.result_cache.get(target, query)
+            if cached is not None:
+                self.show_cached_result(query, cached)
+                history.add(target, query, rows=len(cached.rows))
+                return
+        
+        operation = self.instrumentation.begin("query", " ".join(query.split()))
+        started = time.perf_counter()
+        entry = {}
+        
+        def open_cursor():
+            return self.engine.open_query(query, operation.capture_statistics)
+        
+        def on_ready(description, rowcount):
+            entry["id"] = history.add(
+                target, query,
+                elapsed=time.perf_counter() - started,
+                rows=rowcount if description is None else None
+            )
+            entry["description"] = description
+            if description is None:
+                self.results_tree["columns"] = []
+                self.view_status_label.configure(
+                    text=f"Query executed successfully. {rowcount} rows affected.",
+                    text_color="#2E7D32"
+                )
+            else:
+                self.export_query = (query, [])
+                self.configure_result_columns(description)
+        
+        def on_rows_loaded(count, exhausted):
+            more = "" if exhausted else " (scroll for more)"
             self.view_status_label.configure(
-                text=f"Displaying {len(rows)} rows from {table_name}",
+                text=f"Query executed successfully. {count} rows returned{more}.",
                 text_color="#2E7D32"
             )
+            if exhausted:
+                history.update(entry["id"], rows=count)
+                if use_cache and count <= self.engine.result_cache.max_rows:
+                    rows = self.results_grid.spool.get_rows(0, count)
+                    self.engine.result_cache.put(target, query, entry["description"], rows)
+        
+        def on_error(e):
+            if "id" in entry:
+                history.update(entry["id"], error=e)
+            else:
+                history.add(target, query, elapsed=time.perf_counter() - started, error=e)
+            self.on_view_error(e, "Failed to execute query")
+        
+        self.view_status_label.configure(text="Executing query...", text_color="gray")
+        self.results_grid.load(
+            open_cursor,
+            on_ready=on_ready,
+            on_error=on_error,
+            on_rows_loaded=on_rows_loaded,
+            operation=operation
+        )
+
+    def run_script(self):
+        # A second click while a script runs stops it
+        if self.script_runner is not None:
+            self.script_runner.cancel()
+            self.view_status_label.configure(text="Stopping script...", text_color="gray")
+            return
+        
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        
+        script = self.query_text.get("1.0", "end-1c")
+        batches = split_batches(script)
+        if not batches:
+            messagebox.showerror("Error", "Please enter a SQL script!")
+            return
+        
+        self.clear_script_tabs()
+        messages = self.show_messages_tab()
+        total = sum(batch.count for batch in batches)
+        max_tabs = self.settings.get("max_result_tabs", 50)
+        target = self.engine.target
+        grids = {}
+        formatters = {}
+        
+        # Worker side: format rows there and hand them to the Tk thread
+        def on_result_set(key, description):
+            if len(formatters) >= max_tabs:
+                formatters[key] = None
+                return
+            formatters[key] = row_formatter(description)
+            self.executor.post(open_result_set, key, description)
+        
+        def on_rows(key, rows, done):
+            format_rows = formatters.get(key)
+            if format_rows is not None:
+                self.executor.post(add_rows, key, format_rows(rows), done)
+        
+        def on_batch_finished(result):
+            self.executor.post(log_batch, result)
+        
+        # Tk side
+        def open_result_set(key, description):
+            grids[key] = self.add_result_tab(f"Batch {key[0]}.{key[1]}", description)
+            if len(grids) == 1:
+                self.results_notebook.select(self.script_tabs[-1][0])
+        
+        def add_rows(key, rows, done):
+            grids[key].append_rows(rows, done)
+        
+        def log_batch(result):
+            line = (
+                f"Batch {result.number} (line {result.line}): {result.elapsed * 1000:,.0f} ms, "
+                f"{result.result_sets} result sets, {result.rows_affected} rows affected"
+            )
+            lines = [line] + [f"    {message}" for message in result.messages]
+            if result.error is not None:
+                lines.append(f"    Error: {result.error}")
+            messages.insert("end", "\n".join(lines) + "\n")
+            messages.see("end")
+            self.view_status_label.configure(
+                text=f"Running script... batch {result.number} of {total} done",
+                text_color="gray"
+            )
+        
+        runner = self.script_runner = self.engine.script_runner(
+            batches,
+            stop_on_error=self.stop_on_error_var.get(),
+            on_result_set=on_result_set,
+            on_rows=on_rows,
+            on_batch_finished=on_batch_finished
+        )
+        started = time.perf_counter()
+        
+        def finish():
+            self.script_runner = None
+            self.run_script_btn.configure(text="Run Script")
+            # The script may have changed tables and data
+            self.engine.data_changed(schema_changed=True)
+        
+        def on_finished(result):
+            finish()
+            state = "stopped" if result.cancelled else "finished"
+            failed = f", {result.batches_failed} failed" if result.batches_failed else ""
+            self.view_status_label.configure(
+                text=f"Script {state}: {result.batches_run} of {total} batches run{failed} in {result.elapsed:.1f}s",
+                text_color="#D32F2F" if result.batches_failed else "#2E7D32"
+            )
+            self.query_history().add(
+                target, script,
+                elapsed=result.elapsed,
+                error=f"{result.batches_failed} batches failed" if result.batches_failed else None
+            )
+        
+        def on_failed(e):
+            finish()
+            self.query_history().add(target, script, elapsed=time.perf_counter() - started, error=e)
+            self.on_view_error(e, "Failed to run script")
+        
+        self.run_script_btn.configure(text="Stop Script")
+        self.view_status_label.configure(text=f"Running script ({total} batches)...", text_color="gray")
+        self.executor.submit(
+            runner.run,
+            operation=self.instrumentation.begin("script", f"{total} batches"),
+            on_success=on_finished,
+            on_error=on_failed
+        )
+
+    def open_fan_out_dialog(self):
+        # A second click while a fan-out runs skips the targets not started yet
+        if self.fan_out_runner is not None:
+            self.fan_out_runner.cancel()
+            self.view_status_label.configure(text="Stopping after the running databases...", text_color="gray")
+            return
+        
+        if not self.query_text.get("1.0", "end-1c").strip():
+            messagebox.showerror("Error", "Please enter a SQL query!")
+            return
+        
+        window = ctk.CTkToplevel(self.app)
+        window.title("Run on Databases")
+        window.geometry("420x480")
+        window.transient(self.app)
+        
+        ctk.CTkLabel(
+            window,
+            text="One target per line: database, or server/database",
+            text_color="gray"
+        ).pack(padx=10, pady=(10,5), anchor="w")
+        
+        targets_text = ctk.CTkTextbox(window, height=280)
+        targets_text.pack(fill="both", expand=True, padx=10, pady=5)
+        targets_text.insert("1.0", "\n".join(self.settings.get("fan_out_targets", [])))
+        
+        options_frame = ctk.CTkFrame(window, fg_color="transparent")
+        options_frame.pack(fill="x", padx=10, pady=5)
+        ctk.CTkLabel(options_frame, text="Concurrency:").pack(side="left", padx=5)
+        concurrency_entry = ctk.CTkEntry(options_frame, width=60)
+        concurrency_entry.pack(side="left", padx=5)
+        concurrency_entry.insert(0, str(self.settings.get("fan_out_concurrency", 8)))
+        
+        def load_databases():
+            server = self.server_entry.get().strip()
+            if not server:
+                messagebox.showerror("Error", "Please enter a server name!", parent=window)
+                return
+            def show(names):
+                if window.winfo_exists():
+                    targets_text.delete("1.0", "end")
+                    targets_text.insert("1.0", "\n".join(names))
             
-        except Exception as e:
+            self.executor.submit(
+                self.engine.list_databases, server,
+                operation=self.instrumentation.begin("metadata", f"Databases on {server}"),
+                on_success=show,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to list databases: {str(e)}")
+            )
+        
+        def run():
+            try:
+                concurrency = int(concurrency_entry.get())
+                if concurrency <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Concurrency must be a positive number!", parent=window)
+                return
+            text = targets_text.get("1.0", "end-1c")
+            targets = parse_targets(text, self.server_entry.get().strip())
+            if not targets:
+                messagebox.showerror("Error", "Please enter at least one database!", parent=window)
+                return
+            self.settings["fan_out_targets"] = [line.strip() for line in text.splitlines() if line.strip()]
+            self.settings["fan_out_concurrency"] = concurrency
+            self.save_settings()
+            window.destroy()
+            self.run_fan_out(targets, concurrency)
+        
+        buttons_frame = ctk.CTkFrame(window, fg_color="transparent")
+        buttons_frame.pack(pady=(5,10))
+        ctk.CTkButton(buttons_frame, text="List Databases", command=load_databases, width=120).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="Run", command=run, width=120, fg_color="#2E7D32").pack(side="left", padx=5)
+
+    def run_fan_out(self, targets, concurrency):
+        query = self.query_text.get("1.0", "end-1c").strip()
+        if not query:
+            messagebox.showerror("Error", "Please enter a SQL query!")
+            return
+        
+        self.clear_script_tabs()
+        messages = self.show_messages_tab()
+        self.results_grid.clear()
+        self.results_tree["columns"] = []
+        self.export_query = None
+        state = {"names": None, "rows": 0}
+        
+        # Pool threads: prefix every row with its source and format it there
+        def on_target_finished(result):
+            formatted = []
+            if result.description is not None:
+                source = f"{result.target.server}/{result.target.database}"
+                formatted = [(source,) + tuple(row) for row in row_formatter(result.description)(result.rows)]
+            self.executor.post(show_target, result, formatted)
+        
+        def show_target(result, formatted):
+            target = f"{result.target.server}/{result.target.database}"
+            if result.error is not None:
+                line = f"{target}: failed after {result.elapsed * 1000:,.0f} ms: {result.error}"
+            elif result.description is None:
+                line = f"{target}: {result.elapsed * 1000:,.0f} ms, {result.rows_affected} rows affected"
+            else:
+                names = [col[0] for col in result.description]
+                if state["names"] is None:
+                    # The first result set decides the columns of the merged grid
+                    state["names"] = names
+                    self.configure_result_columns((("Source", str, None, None, None, None, True),) + tuple(result.description))
+                    self.results_grid.begin_stream()
+                if names != state["names"]:
+                    line = f"{target}: {result.elapsed * 1000:,.0f} ms, skipped: columns differ from the first result"
+                else:
+                    self.results_grid.append_rows(formatted)
+                    state["rows"] += len(formatted)
+                    more = f" (first {len(formatted)} shown)" if result.truncated else ""
+                    line = f"{target}: {result.elapsed * 1000:,.0f} ms, {len(formatted)} rows{more}"
+            messages.insert("end", line + "\n")
+            messages.see("end")
+        
+        def finish():
+            self.fan_out_runner = None
+            self.fan_out_btn.configure(text="Run on Databases...")
+            self.results_grid.append_rows([], done=True)
+        
+        def on_finished(result):
+            finish()
+            state_text = "stopped" if result.cancelled else "finished"
+            failed = f", {result.targets_failed} failed" if result.targets_failed else ""
             self.view_status_label.configure(
-                text=f"Error: {str(e)}",
-                text_color="#D32F2F"
+                text=f"Fan-out {state_text}: {result.targets_run} of {len(targets)} databases{failed}, "
+                     f"{state['rows']} rows in {result.elapsed:.1f}s",
+                text_color="#D32F2F" if result.targets_failed else "#2E7D32"
             )
-            messagebox.showerror("Error", f"Failed to view table data: {str(e)}")
+        
+        def on_failed(e):
+            finish()
+            self.on_view_error(e, "Failed to run the query on the selected databases")
+        
+        runner = self.fan_out_runner = self.engine.fan_out_runner(
+            targets, query,
+            max_workers=concurrency,
+            max_rows=self.settings.get("fan_out_max_rows", 10000),
+            on_target_finished=on_target_finished
+        )
+        self.fan_out_btn.configure(text="Stop Fan-out")
+        self.view_status_label.configure(text=f"Running on {len(targets)} databases...", text_color="gray")
+        self.executor.submit(
+            runner.run,
+            operation=self.instrumentation.begin("fan-out", f"{len(targets)} databases: {' '.join(query.split())}"),
+            on_success=on_finished,
+            on_error=on_failed
+        )
 
-    def execute_query(self):
-        if not self.connection:
+    def add_result_tab(self, title, description):
+        frame = ctk.CTkFrame(self.results_notebook)
+        tree = ttk.Treeview(frame)
+        vsb = ttk.Scrollbar(frame, orient="vertical")
+        hsb = ttk.Scrollbar(frame, orient="horizontal", command=tree.xview)
+        tree.configure(xscrollcommand=hsb.set)
+        vsb.pack(side="right", fill="y")
+        hsb.pack(side="bottom", fill="x")
+        tree.pack(fill="both", expand=True)
+        self.configure_result_columns(description, tree)
+        
+        grid = VirtualResultGrid(tree, vsb, self.executor)
+        grid.begin_stream()
+        # Result tabs go before the Messages tab
+        self.results_notebook.insert(self.messages_frame, frame, text=title)
+        self.script_tabs.append((frame, grid))
+        return grid
+
+    def show_messages_tab(self):
+        self.messages_frame = ctk.CTkFrame(self.results_notebook)
+        messages = ctk.CTkTextbox(self.messages_frame)
+        messages.pack(fill="both", expand=True)
+        self.results_notebook.add(self.messages_frame, text="Messages")
+        self.results_notebook.select(self.messages_frame)
+        return messages
+
+    def clear_script_tabs(self):
+        for frame, grid in self.script_tabs:
+            grid.clear()
+            frame.destroy()
+        self.script_tabs = []
+        if self.messages_frame is not None:
+            self.messages_frame.destroy()
+            self.messages_frame = None
+
+    def explain_query(self):
+        if not self.engine.connected:
             messagebox.showerror("Error", "Please connect to database first!")
             return
-            
+        
         query = self.query_text.get("1.0", "end-1c").strip()
         if not query:
             messagebox.showerror("Error", "Please enter a SQL query!")
             return
-            
-        try:
-            # Clear existing items
-            self.results_tree.delete(*self.results_tree.get_children())
-            
-            # Execute query
-            cursor = self.connection.cursor()
-            cursor.execute(query)
-            
-            # Get column names from cursor description
-            columns = [column[0] for column in cursor.description]
-            
-            # Configure treeview columns
-            self.results_tree["columns"] = columns
-            self.results_tree["show"] = "headings"
-            
-            for col in columns:
-                self.results_tree.heading(col, text=col)
-                self.results_tree.column(col, width=100)
-            
-            # Fetch and display results
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                self.results_tree.insert("", "end", values=row)
-            
+        
+        actual = self.plan_mode_combo.get() == "Actual"
+        
+        def on_explained(statements):
+            if not statements:
+                self.view_status_label.configure(text="The query produced no execution plan.", text_color="gray")
+                return
+            self.view_status_label.configure(text="", text_color="gray")
+            self.show_plan(statements, actual)
+        
+        self.view_status_label.configure(text="Capturing execution plan...", text_color="gray")
+        self.executor.submit(
+            self.engine.explain, query, actual,
+            operation=self.instrumentation.begin("explain", " ".join(query.split())),
+            on_success=on_explained,
+            on_error=lambda e: self.on_view_error(e, "Failed to capture execution plan")
+        )
+
+    def show_plan(self, statements, actual):
+        window = ctk.CTkToplevel(self.app)
+        window.title("Execution Plan (" + ("actual" if actual else "estimated") + ")")
+        window.geometry("950x600")
+        
+        # Operator tree; costs are the operator's own share of its statement
+        tree_frame = ctk.CTkFrame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(10,5))
+        columns = ("object", "cost", "est_rows", "actual_rows", "flags")
+        plan_tree = ttk.Treeview(tree_frame, columns=columns, show="tree headings")
+        plan_tree.heading("#0", text="Operator")
+        plan_tree.heading("object", text="Object")
+        plan_tree.heading("cost", text="Cost %")
+        plan_tree.heading("est_rows", text="Est. Rows")
+        plan_tree.heading("actual_rows", text="Actual Rows")
+        plan_tree.heading("flags", text="Warnings")
+        plan_tree.column("#0", width=280)
+        plan_tree.column("object", width=220)
+        plan_tree.column("cost", width=70, anchor="e")
+        plan_tree.column("est_rows", width=90, anchor="e")
+        plan_tree.column("actual_rows", width=90, anchor="e")
+        plan_tree.column("flags", width=200)
+        plan_tree.tag_configure("flagged", foreground="#D32F2F")
+        plan_vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=plan_tree.yview)
+        plan_tree.configure(yscrollcommand=plan_vsb.set)
+        plan_vsb.pack(side="right", fill="y")
+        plan_tree.pack(fill="both", expand=True)
+        
+        def add_operator(parent, operator):
+            item = plan_tree.insert(
+                parent, "end",
+                text=operator.physical_op if operator.physical_op == operator.logical_op
+                else f"{operator.physical_op} ({operator.logical_op})",
+                values=(
+                    operator.object_name,
+                    f"{operator.cost_share * 100:.1f}",
+                    f"{operator.estimated_rows:,.0f}",
+                    "" if operator.actual_rows is None else f"{operator.actual_rows:,}",
+                    ", ".join(operator.flags)
+                ),
+                tags=("flagged",) if operator.flags else (),
+                open=True
+            )
+            for child in operator.children:
+                add_operator(item, child)
+        
+        for statement in statements:
+            text = statement.text if len(statement.text) <= 120 else statement.text[:117] + "..."
+            item = plan_tree.insert("", "end", text=text, values=("", "100.0", "", "", ""), open=True)
+            for operator in statement.operators:
+                add_operator(item, operator)
+        
+        # Hotspots and missing index hints
+        summary = ctk.CTkTextbox(window, height=170)
+        summary.pack(fill="x", padx=10, pady=(5,10))
+        lines = ["Most expensive operators:"]
+        for operator in hotspots(statements):
+            flags = f"  [{', '.join(operator.flags)}]" if operator.flags else ""
+            target = f" on {operator.object_name}" if operator.object_name else ""
+            lines.append(f"  {operator.cost_share * 100:5.1f}%  {operator.physical_op}{target}{flags}")
+        missing = [index for statement in statements for index in statement.missing_indexes]
+        if missing:
+            lines.append("")
+            lines.append("Missing indexes:")
+            for index in sorted(missing, key=lambda index: index.impact, reverse=True):
+                lines.append(f"  impact {index.impact:.0f}%: {index_suggestion(index)}")
+        summary.insert("1.0", "\n".join(lines))
+        summary.configure(state="disabled")
+
+    def show_cached_result(self, query, cached):
+        self.export_query = (query, [])
+        self.configure_result_columns(cached.description)
+        self.results_grid.show_rows(cached.rows)
+        age = time.monotonic() - cached.stored_at
+        self.view_status_label.configure(
+            text=f"{len(cached.rows)} rows returned from cache ({age:.0f}s old).",
+            text_color="#2E7D32"
+        )
+
+    def open_history(self):
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.focus()
+            return
+        
+        window = self.history_window = ctk.CTkToplevel(self.app)
+        window.title("Query History")
+        window.geometry("800x450")
+        
+        search_frame = ctk.CTkFrame(window, fg_color="transparent")
+        search_frame.pack(fill="x", padx=10, pady=(10,5))
+        
+        search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search history...")
+        search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        
+        tree_frame = ctk.CTkFrame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        columns = ("last_run", "runs", "elapsed", "rows", "target", "query")
+        headings = ("Last Run", "Runs", "ms", "Rows", "Database", "Query")
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=70, minwidth=40)
+        tree.column("last_run", width=130)
+        tree.column("target", width=120)
+        tree.column("query", width=400)
+        tree.tag_configure("error", foreground="#D32F2F")
+        history_vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=history_vsb.set)
+        history_vsb.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True)
+        
+        queries = {}
+        pending = [None]
+        
+        def search():
+            pending[0] = None
+            tree.delete(*tree.get_children())
+            queries.clear()
+            for found in self.query_history().search(search_entry.get()):
+                item = tree.insert("", "end", values=(
+                    found.last_run,
+                    found.runs,
+                    "" if found.elapsed_ms is None else f"{found.elapsed_ms:,.0f}",
+                    "" if found.rows is None else found.rows,
+                    found.target,
+                    " ".join(found.query.split())
+                ), tags=("error",) if found.error else ())
+                queries[item] = found.query
+        
+        def on_search_changed(event):
+            # Search once typing pauses
+            if pending[0] is not None:
+                window.after_cancel(pending[0])
+            pending[0] = window.after(150, search)
+        
+        def use_query(event=None):
+            selection = tree.selection()
+            if selection:
+                self.query_text.delete("1.0", "end")
+                self.query_text.insert("1.0", queries[selection[0]])
+                window.destroy()
+        
+        def clear_history():
+            if messagebox.askyesno("Query History", "Delete the whole query history?", parent=window):
+                self.query_history().clear()
+                search()
+        
+        search_entry.bind("<KeyRelease>", on_search_changed)
+        tree.bind("<Double-1>", use_query)
+        tree.bind("<Return>", use_query)
+        
+        buttons_frame = ctk.CTkFrame(window, fg_color="transparent")
+        buttons_frame.pack(pady=(5,10))
+        ctk.CTkButton(buttons_frame, text="Use Query", command=use_query, width=120).pack(side="left", padx=5)
+        ctk.CTkButton(
+            buttons_frame, text="Clear History", command=clear_history, width=120, fg_color="#D32F2F"
+        ).pack(side="left", padx=5)
+        
+        search()
+        search_entry.focus_set()
+
+    def on_cache_results_changed(self):
+        enabled = bool(self.cache_results_var.get())
+        self.settings["result_cache"] = enabled
+        self.save_settings()
+        if not enabled:
+            self.engine.result_cache.invalidate()
+
+    def export_results(self):
+        # A second click while exporting cancels the running export
+        if self.export_cancel_event is not None:
+            self.export_cancel_event.set()
+            return
+        
+        if not self.engine.connected:
+            messagebox.showerror("Error", "Please connect to database first!")
+            return
+        
+        if not self.export_query:
+            messagebox.showerror("Error", "Please view a table or run a query first!")
+            return
+        sql, params = self.export_query
+        
+        path = filedialog.asksaveasfilename(
+            title="Export results",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet")]
+        )
+        if not path:
+            return
+        
+        cancel_event = threading.Event()
+        self.export_cancel_event = cancel_event
+        self.export_btn.configure(text="Cancel Export")
+        
+        def show_progress(rows, elapsed):
+            rate = rows / elapsed if elapsed > 0 else 0
             self.view_status_label.configure(
-                text=f"Query executed successfully. {len(rows)} rows returned.",
-                text_color="#2E7D32"
+                text=f"Exporting... {rows:,} rows written ({rate:,.0f} rows/sec)",
+                text_color="gray"
             )
-            
-        except Exception as e:
+        
+        def on_finished(result):
+            self.finish_export()
+            rate = result.rows / result.elapsed if result.elapsed > 0 else 0
+            state = "cancelled" if result.cancelled else "complete"
             self.view_status_label.configure(
-                text=f"Error: {str(e)}",
-                text_color="#D32F2F"
+                text=f"Export {state}: {result.rows:,} rows in {result.elapsed:.1f}s "
+                     f"({rate:,.0f} rows/sec) to {os.path.basename(result.path)}",
+                text_color="#2E7D32"
             )
-            messagebox.showerror("Error", f"Failed to execute query: {str(e)}")
+        
+        def on_failed(e):
+            self.finish_export()
+            self.on_view_error(e, "Failed to export results")
+        
+        self.view_status_label.configure(text="Exporting...", text_color="gray")
+        self.executor.submit(
+            self.engine.export, sql, path,
+            params=params,
+            progress=lambda *args: self.executor.post(show_progress, *args),
+            cancel_event=cancel_event,
+            operation=self.instrumentation.begin("export", os.path.basename(path)),
+            on_success=on_finished,
+            on_error=on_failed
+        )
+
+    def finish_export(self):
+        self.export_cancel_event = None
+        self.export_btn.configure(text="Export...")
+
+    def on_busy_changed(self, busy):
+        if busy:
+            self.busy_label.configure(text="Working...")
+            self.busy_bar.pack(side="left", padx=5)
+            self.busy_bar.start()
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+            self.busy_label.configure(text="")
 
     def run(self):
-        self.app.mainloop()
+        try:
+            self.app.mainloop()
+        finally:
+            self.executor.shutdown()
+            self.engine.close()
+            if self.history is not None:
+                self.history.close()
 
 # Create and run the application
 if __name__ == "__main__":
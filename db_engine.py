@@ -0,0 +1,534 @@
+"""Database logic behind the GUI, usable without a display.
+
+DatabaseEngine is a blocking API meant to be called from worker threads
+(the GUI calls it through DBExecutor); AsyncDatabaseEngine exposes the same
+operations as coroutines that run the engine on a thread pool.
+"""
+import asyncio
+import functools
+import sqlite3
+from collections import namedtuple
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from bulk_import import BulkImporter, ImportResult, build_insert_query, insert_text_rows
+from change_set import ChangeSet
+from connection_pool import ConnectionManager, ConnectionPool, PooledCursor
+from fan_out import FanOutRunner, Target, list_databases
+from grid_filter import build_order, build_where
+from lob_preview import CHUNK_SIZE, LobPreview, read_chunks
+from query_plan import Statement, capture_plan, parse_plan
+from result_cache import ResultCache, is_cacheable
+from result_export import ExportResult, export_cursor
+from schema_cache import ColumnInfo, SchemaCache, is_ddl
+from schema_snapshot import SchemaChange, SchemaSnapshotStore, SnapshotInfo, diff_schemas
+from script_runner import Batch, ScriptRunner
+from table_copy import CopyResult, TableCopier
+from table_stats import TableStats, read_table_stats
+from table_pager import ROW_COUNT_QUERY, TablePager, fetch_page, open_pager, quote_name, seek_key_columns
+
+
+ColumnDefinition = namedtuple("ColumnDefinition", ["name", "data_type", "primary_key", "not_null"])
+QueryResult = namedtuple("QueryResult", ["description", "rows", "rowcount"])
+
+
+class NotConnectedError(Exception):
+    pass
+
+
+class DatabaseEngine:
+    """Connection, metadata, query, insert and DDL operations for one database.
+
+    ``connect()`` selects the current database; every other call runs on a
+    connection borrowed from its pool, so calls from several threads run
+    side by side. Writes made through the engine invalidate the schema cache
+    and the cached SELECT results of the database they touch.
+    """
+
+    def __init__(self, pool_size: int = 4, idle_timeout: int = 300,
+                 result_cache: Optional[ResultCache] = None,
+                 snapshots: Optional[SchemaSnapshotStore] = None):
+        self.connections = ConnectionManager(max_size=pool_size, idle_timeout=idle_timeout)
+        self.pool: Optional[ConnectionPool] = None
+        self.target: Optional[str] = None
+        self.schema = SchemaCache()
+        # Schema caches saved per target, restored on connect
+        self.snapshots = snapshots
+        # Last table statistics read, by table name
+        self.stats: Dict[str, TableStats] = {}
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+
+    # Connections
+
+    @property
+    def connected(self) -> bool:
+        return self.pool is not None
+
+    def require_pool(self) -> ConnectionPool:
+        pool = self.pool
+        if pool is None:
+            raise NotConnectedError("Please connect to database first!")
+        return pool
+
+    def connect(self, server: str, database: str, auth: str = "windows",
+                username: Optional[str] = None, password: Optional[str] = None) -> str:
+        # Opens the first connection to verify the target before switching to it
+        pool = self.connections.pool(server, database, auth, username, password)
+        try:
+            with pool.connection():
+                pass
+        except Exception:
+            # Forget the pool so that a retry, e.g. with the right password,
+            # starts from a fresh connection string
+            if pool is not self.pool:
+                self.connections.close_pool(pool)
+            raise
+        self.save_schema()
+        old_pool = self.pool
+        self.pool = pool
+        self.target = f"{server}/{database}".lower()
+        self.schema = self.restore_schema(self.target)
+        self.stats = {}
+        if old_pool is not None and old_pool is not pool:
+            self.connections.close_pool(old_pool)
+        return self.target
+
+    def detach(self) -> Optional[ConnectionPool]:
+        # Forget the current database without any I/O; close the returned
+        # pool with close_pool(), e.g. on a worker thread
+        self.save_schema()
+        pool = self.pool
+        self.pool = None
+        self.target = None
+        self.schema = SchemaCache()
+        self.stats = {}
+        return pool
+
+    def close_pool(self, pool: Optional[ConnectionPool]) -> None:
+        if pool is not None:
+            self.connections.close_pool(pool)
+
+    def disconnect(self) -> None:
+        self.close_pool(self.detach())
+
+    def close(self) -> None:
+        self.save_schema()
+        self.pool = None
+        self.connections.close_all()
+        if self.snapshots is not None:
+            self.snapshots.close()
+
+    def create_database(self, server: str, database: str) -> None:
+        # The master pool is kept, so repeated calls reuse its connection
+        master_pool = self.connections.pool(server, "master")
+        with master_pool.connection() as conn:
+            # CREATE DATABASE cannot run inside a transaction
+            conn.autocommit = True
+            try:
+                conn.cursor().execute(f"CREATE DATABASE {quote_name(database)}")
+            finally:
+                conn.autocommit = False
+
+    def list_databases(self, server: str) -> List[str]:
+        with self.connections.pool(server, "master").connection() as conn:
+            return list_databases(conn)
+
+    # Metadata
+
+    def table_names(self, check: bool = False) -> List[str]:
+        # check=True compares modify dates with the server; otherwise the
+        # cached catalog is reused while it is fresh
+        schema = self.schema
+        if check or schema.stale:
+            with self.require_pool().connection() as conn:
+                schema.sync(conn)
+            self.save_schema()
+        return schema.table_names()
+
+    def cached_table_names(self) -> Optional[List[str]]:
+        # Table names without any I/O, e.g. from a restored snapshot; None if
+        # nothing is cached yet
+        schema = self.schema
+        return schema.table_names() if schema.loaded else None
+
+    def columns(self, table_name: str) -> List[ColumnInfo]:
+        # Only touches the server if the cache is stale or lacks the table
+        schema = self.schema
+        if schema.stale or schema.table(table_name) is None:
+            with self.require_pool().connection() as conn:
+                schema.sync(conn)
+            self.save_schema()
+        return schema.columns(table_name)
+
+    # Schema snapshots
+
+    def restore_schema(self, target: str) -> SchemaCache:
+        schema = SchemaCache()
+        if self.snapshots is not None:
+            try:
+                snapshot = self.snapshots.load(target)
+            except sqlite3.Error:
+                # The snapshot file is only a cache; start from the server
+                snapshot = None
+            if snapshot is not None:
+                tables, keys, _ = snapshot
+                schema.restore(tables, keys)
+        return schema
+
+    def save_schema(self) -> None:
+        # Save the current schema cache if it changed since it was restored or saved
+        schema, target = self.schema, self.target
+        if self.snapshots is None or target is None or not schema.loaded or not schema.dirty:
+            return
+        tables, keys = schema.snapshot()
+        try:
+            self.snapshots.save(target, tables, keys)
+        except sqlite3.Error:
+            pass
+
+    def schema_snapshots(self) -> List[SnapshotInfo]:
+        if self.snapshots is None:
+            return []
+        self.save_schema()
+        return self.snapshots.snapshots()
+
+    def diff_snapshots(self, old_target: str, new_target: str) -> List[SchemaChange]:
+        # Differences from the snapshot of old_target to that of new_target
+        if self.snapshots is None:
+            raise ValueError("Schema snapshots are turned off")
+        self.save_schema()
+        old, new = self.snapshots.load(old_target), self.snapshots.load(new_target)
+        for target, snapshot in ((old_target, old), (new_target, new)):
+            if snapshot is None:
+                raise KeyError(f"No schema snapshot of {target}")
+        return diff_schemas(old[0], new[0])
+
+    def table_stats(self) -> List[TableStats]:
+        # Row counts, sizes and index counts of every table, from metadata only
+        with self.require_pool().connection() as conn:
+            stats = read_table_stats(conn)
+        by_name = {}
+        for table in stats:
+            by_name.setdefault(table.name, table)
+        self.stats = by_name
+        return stats
+
+    def row_count(self, table_name: str) -> Optional[int]:
+        # From the last table_stats() if there was one, else partition stats;
+        # None if the server does not grant access to them
+        table = self.stats.get(table_name)
+        if table is not None:
+            return table.rows
+        with self.require_pool().connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(ROW_COUNT_QUERY, quote_name(table_name))
+                row = cursor.fetchone()
+            except Exception:
+                return None
+            finally:
+                cursor.close()
+        return row[0] if row is not None else None
+
+    def key_columns(self, table_name: str) -> List[str]:
+        # Primary key (or first all NOT NULL unique index); cached with the schema
+        schema = self.schema
+        key_columns = schema.key_columns(table_name)
+        if key_columns is None:
+            with self.require_pool().connection() as conn:
+                key_columns = seek_key_columns(conn, table_name)
+            schema.set_key_columns(table_name, key_columns)
+        return key_columns
+
+    def lob_preview(self, table_name: str, preview_chars: Optional[int] = None) -> LobPreview:
+        options = {} if preview_chars is None else {"preview_chars": preview_chars}
+        return LobPreview(self.columns(table_name), self.key_columns(table_name), **options)
+
+    def data_changed(self, schema_changed: bool = False) -> None:
+        # Cached results and table statistics of the current database may now be stale
+        self.result_cache.invalidate(self.target)
+        self.stats = {}
+        if schema_changed:
+            self.schema.invalidate()
+
+    # DDL
+
+    def run_ddl(self, query: str) -> None:
+        with self.require_pool().connection() as conn:
+            conn.cursor().execute(query)
+            conn.commit()
+        self.schema.invalidate()
+        self.result_cache.invalidate()
+        self.stats = {}
+
+    def create_table(self, table_name: str, columns: Sequence[ColumnDefinition]) -> str:
+        definitions = []
+        for column in columns:
+            definition = f"{quote_name(column.name)} {column.data_type}"
+            if column.primary_key:
+                definition += " PRIMARY KEY"
+            if column.not_null:
+                definition += " NOT NULL"
+            definitions.append(definition)
+        query = f"CREATE TABLE {quote_name(table_name)} (\n    " + ",\n    ".join(definitions) + "\n)"
+        self.run_ddl(query)
+        return query
+
+    def drop_table(self, table_name: str) -> None:
+        self.run_ddl(f"DROP TABLE {quote_name(table_name)}")
+
+    # Inserts
+
+    def insert_row(self, table_name: str, values: Dict[str, Any]) -> None:
+        if not values:
+            raise ValueError("Please enter at least one value!")
+        with self.require_pool().connection() as conn:
+            conn.cursor().execute(build_insert_query(table_name, list(values)), list(values.values()))
+            conn.commit()
+        self.data_changed()
+
+    def insert_rows(self, table_name: str, columns: Sequence[ColumnInfo],
+                    rows: Sequence[Sequence[str]]) -> Tuple[int, Dict[int, Exception]]:
+        # Text rows, converted per column; returns (inserted, {row index: error})
+        try:
+            with self.require_pool().connection() as conn:
+                return insert_text_rows(conn, table_name, columns, rows)
+        finally:
+            self.data_changed()
+
+    def import_file(self, table_name: str, path: str, batch_size: int = 5000,
+                    commit_interval: int = 50000, progress: Optional[Callable] = None,
+                    cancel_event=None) -> ImportResult:
+        importer = BulkImporter(
+            self.require_pool(), table_name, self.columns(table_name),
+            batch_size=batch_size,
+            commit_interval=commit_interval,
+            progress=progress,
+            cancel_event=cancel_event
+        )
+        try:
+            return importer.run(path)
+        finally:
+            self.data_changed()
+
+    # Edits
+
+    def apply_changes(self, change_set: ChangeSet) -> Tuple[int, int]:
+        # All edits and deletes in one transaction; returns (updated, deleted)
+        try:
+            with self.require_pool().connection() as conn:
+                return change_set.apply(conn)
+        finally:
+            self.data_changed()
+
+    # Copies
+
+    def copy_table(self, target: Target, target_table: str, source_table: Optional[str] = None,
+                   query: Optional[str] = None, **options) -> CopyResult:
+        """Copy source_table, or the rows of query, from the current database
+        into target_table on target (Windows authentication, as for fan-out
+        targets). Options are those of TableCopier."""
+        source_pool = self.require_pool()
+        target_pool = self.connections.borrow(target.server, target.database)
+        same_database = target_pool is source_pool
+        try:
+            if same_database:
+                if source_table is not None and source_table.lower() == target_table.lower():
+                    raise ValueError("The source and target tables are the same")
+                if source_pool.max_size < 2:
+                    raise ValueError("Copying within one database needs a connection pool of at least 2")
+            if source_table is not None:
+                options.update(columns=self.columns(source_table), key_columns=self.key_columns(source_table))
+            copier = TableCopier(source_pool, target_pool, target_table, source_table, query=query, **options)
+            try:
+                return copier.run()
+            finally:
+                if same_database:
+                    self.data_changed(schema_changed=True)
+        finally:
+            # Closes the target pool only if nothing else is using it
+            self.connections.release(target_pool)
+
+    # Queries
+
+    def open_query(self, query: str, capture_statistics: bool = False) -> PooledCursor:
+        """Execute query and return its cursor, which holds a pooled connection
+        until it is closed. Statements without a result set are committed.
+        The connection is closed afterwards rather than pooled, since a USE
+        or SET in the query would otherwise stick to it."""
+        cursor = self.require_pool().cursor(discard=True)
+        try:
+            if capture_statistics:
+                cursor.enable_statistics()
+            cursor.execute(query)
+            if cursor.description is None:
+                cursor.connection.commit()
+        except Exception:
+            cursor.close()
+            raise
+        if is_ddl(query):
+            self.schema.invalidate()
+        if not is_cacheable(query):
+            self.data_changed()
+        return cursor
+
+    def open_table(self, table_name: str, preview: Optional[LobPreview] = None) -> PooledCursor:
+        # With a preview, LOB columns are truncated and their lengths appended
+        select_list = preview.select_list if preview is not None else "*"
+        cursor = self.require_pool().cursor()
+        try:
+            return cursor.execute(f"SELECT {select_list} FROM {quote_name(table_name)}")
+        except Exception:
+            cursor.close()
+            raise
+
+    def fetch_all(self, query: str, max_rows: Optional[int] = None) -> QueryResult:
+        cursor = self.open_query(query)
+        try:
+            if cursor.description is None:
+                return QueryResult(None, [], cursor.rowcount)
+            rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            return QueryResult(cursor.description, rows, len(rows))
+        finally:
+            cursor.close()
+
+    def open_pager(self, table_name: str, page_size: int = 100, preview: Optional[LobPreview] = None,
+                   filters: Optional[Dict[str, str]] = None,
+                   sort: Optional[Tuple[str, bool]] = None) -> TablePager:
+        # filters maps column names to filter box text (see grid_filter);
+        # sort is (column name, descending). Both run on the server.
+        where, where_params, order = None, [], None
+        if filters or sort:
+            columns = self.columns(table_name)
+            where, where_params = build_where(columns, filters or {})
+            order = build_order(columns, sort)
+        select_list, key_columns = ("*", None) if preview is None else (preview.select_list, preview.key_columns)
+        with self.require_pool().connection() as conn:
+            return open_pager(conn, table_name, page_size, select_list, key_columns, where, where_params, order)
+
+    def fetch_page(self, pager: TablePager, page: int) -> Tuple[Any, List[Any]]:
+        with self.require_pool().connection() as conn:
+            return fetch_page(conn, pager, page)
+
+    def read_lob(self, table_name: str, column_name: str, key: Sequence[Any],
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+        """Yield the full value of one LOB cell in chunks; the pooled
+        connection is held until the generator is exhausted or closed."""
+        column = next((column for column in self.columns(table_name) if column.name == column_name), None)
+        if column is None:
+            raise KeyError(f"Column {column_name} not found in {table_name}")
+        key_columns = self.key_columns(table_name)
+        with self.require_pool().connection() as conn:
+            with closing(read_chunks(conn, table_name, column, key_columns, key, chunk_size)) as chunks:
+                yield from chunks
+
+    def explain(self, query: str, actual: bool = False) -> List[Statement]:
+        cursor = self.require_pool().cursor(discard=True)
+        try:
+            plans = capture_plan(cursor, query, actual)
+        finally:
+            cursor.close()
+        return [statement for plan in plans for statement in parse_plan(plan)]
+
+    def export(self, query: str, path: str, fmt: Optional[str] = None, progress: Optional[Callable] = None,
+               cancel_event=None, params: Sequence[Any] = ()) -> ExportResult:
+        # query may come from the query box, so its session is not reused
+        cursor = self.require_pool().cursor(discard=True)
+        try:
+            if params:
+                cursor.execute(query, list(params))
+            else:
+                cursor.execute(query)
+            return export_cursor(cursor, path, fmt, progress=progress, cancel_event=cancel_event)
+        finally:
+            cursor.close()
+
+    def script_runner(self, batches: Sequence[Batch], **options) -> ScriptRunner:
+        # The caller runs it; options are ScriptRunner's keyword arguments
+        return ScriptRunner(self.require_pool(), batches, **options)
+
+    def fan_out_runner(self, targets: Sequence[Target], query: str, **options) -> FanOutRunner:
+        return FanOutRunner(self.connections, targets, query, **options)
+
+
+class AsyncDatabaseEngine:
+    """asyncio front end for DatabaseEngine.
+
+    pyodbc calls block, so every call is handed to a thread pool sized like
+    the connection pool and awaited from the event loop.
+    """
+
+    def __init__(self, engine: Optional[DatabaseEngine] = None, max_workers: int = 4):
+        self.engine = engine if engine is not None else DatabaseEngine(pool_size=max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-engine")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def connect(self, server: str, database: str, auth: str = "windows",
+                      username: Optional[str] = None, password: Optional[str] = None) -> str:
+        return await self._run(self.engine.connect, server, database, auth, username, password)
+
+    async def disconnect(self) -> None:
+        await self._run(self.engine.disconnect)
+
+    async def create_database(self, server: str, database: str) -> None:
+        await self._run(self.engine.create_database, server, database)
+
+    async def table_names(self, check: bool = False) -> List[str]:
+        return await self._run(self.engine.table_names, check)
+
+    async def columns(self, table_name: str) -> List[ColumnInfo]:
+        return await self._run(self.engine.columns, table_name)
+
+    async def table_stats(self) -> List[TableStats]:
+        return await self._run(self.engine.table_stats)
+
+    async def run_ddl(self, query: str) -> None:
+        await self._run(self.engine.run_ddl, query)
+
+    async def create_table(self, table_name: str, columns: Sequence[ColumnDefinition]) -> str:
+        return await self._run(self.engine.create_table, table_name, columns)
+
+    async def drop_table(self, table_name: str) -> None:
+        await self._run(self.engine.drop_table, table_name)
+
+    async def insert_row(self, table_name: str, values: Dict[str, Any]) -> None:
+        await self._run(self.engine.insert_row, table_name, values)
+
+    async def insert_rows(self, table_name: str, columns: Sequence[ColumnInfo],
+                          rows: Sequence[Sequence[str]]) -> Tuple[int, Dict[int, Exception]]:
+        return await self._run(self.engine.insert_rows, table_name, columns, rows)
+
+    async def import_file(self, table_name: str, path: str, **options) -> ImportResult:
+        return await self._run(self.engine.import_file, table_name, path, **options)
+
+    async def fetch_all(self, query: str, max_rows: Optional[int] = None) -> QueryResult:
+        return await self._run(self.engine.fetch_all, query, max_rows)
+
+    async def stream(self, query: str, batch_size: int = 1000):
+        # Async generator of row batches; the cursor is closed when the
+        # caller stops iterating
+        cursor = await self._run(self.engine.open_query, query)
+        try:
+            if cursor.description is None:
+                return
+            while True:
+                rows = await self._run(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            await self._run(cursor.close)
+
+    async def explain(self, query: str, actual: bool = False) -> List[Statement]:
+        return await self._run(self.engine.explain, query, actual)
+
+    async def export(self, query: str, path: str, fmt: Optional[str] = None) -> ExportResult:
+        return await self._run(self.engine.export, query, path, fmt)
+
+    async def close(self) -> None:
+        await self._run(self.engine.close)
+        self.executor.shutdown(wait=False)
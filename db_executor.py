@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+from instrumentation import set_current_operation
+
+
+class DBExecutor:
+    """Runs database calls on worker threads and hands results back to Tk.
+
+    Tk widgets may only be touched from the main thread, so workers never call
+    UI code directly: finished tasks are pushed onto a result queue that the
+    main loop drains every ``poll_interval`` milliseconds via ``after``.
+    """
+
+    def __init__(self, root, workers=1, poll_interval=50):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.busy_listeners = []
+        self.error_handler = None
+        self.instrumentation = None
+        self.threads = []
+
+        for index in range(workers):
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"db-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+        self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def add_busy_listener(self, callback):
+        self.busy_listeners.append(callback)
+
+    def submit(self, func, *args, on_success=None, on_error=None, operation=None, **kwargs):
+        # Queue func(*args, **kwargs) for a worker; callbacks run on the Tk thread.
+        # The operation (or one named after func) collects the task's timings;
+        # time spent in the callback is counted as its render phase.
+        if operation is None and self.instrumentation is not None:
+            operation = self.instrumentation.begin("task", getattr(func, "__name__", "task"))
+        self.pending += 1
+        if self.pending == 1:
+            self._notify_busy(True)
+        self.tasks.put((func, args, kwargs, on_success, on_error or self.error_handler, operation))
+
+    def post(self, callback, *args):
+        # Schedule callback(*args) on the Tk thread from a worker (e.g. progress)
+        self.results.put((callback, args, False, None))
+
+    def shutdown(self):
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        for _ in self.threads:
+            self.tasks.put(None)
+
+    def _worker(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            func, args, kwargs, on_success, on_error, operation = task
+            set_current_operation(operation)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if operation is not None:
+                    operation.fail(e)
+                self.results.put((on_error, (e,), True, operation))
+            else:
+                self.results.put((on_success, (result,), True, operation))
+            finally:
+                set_current_operation(None)
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    callback, args, finished, operation = self.results.get_nowait()
+                except queue.Empty:
+                    break
+
+                if finished:
+                    self.pending -= 1
+                    if self.pending == 0:
+                        self._notify_busy(False)
+
+                if callback is not None:
+                    started = time.perf_counter()
+                    try:
+                        callback(*args)
+                    except Exception as e:
+                        self.root.report_callback_exception(type(e), e, e.__traceback__)
+                    if operation is not None:
+                        operation.add_time("render", time.perf_counter() - started)
+
+                if finished and operation is not None and operation.auto_finish:
+                    operation.finish()
+        finally:
+            if self._poll_id is not None:
+                self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _notify_busy(self, busy):
+        for listener in self.busy_listeners:
+            listener(busy)
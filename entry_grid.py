@@ -0,0 +1,170 @@
+from tkinter import ttk
+
+
+ERROR_COLUMN = "#error"
+
+
+class EntryGrid:
+    """Spreadsheet-style multi-row editor on top of a ttk.Treeview.
+
+    Double-click a cell to edit it (Enter/Tab commit, Escape cancels) and use
+    Ctrl+V to paste tab-separated rows copied from Excel or another grid.
+    Values stay text until they are submitted; rows that fail are kept with
+    their error in the last column so they can be fixed and resubmitted.
+    """
+
+    def __init__(self, parent, height=10):
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, show="headings", height=height, selectmode="extended")
+        self.vsb = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.hsb = ttk.Scrollbar(self.frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(yscrollcommand=self.vsb.set, xscrollcommand=self.hsb.set)
+
+        self.vsb.pack(side="right", fill="y")
+        self.hsb.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+        self.tree.tag_configure("error", background="#FFCDD2")
+
+        self.columns = []
+        self.editor = None
+        # Text per item, kept here because Treeview hands values back converted
+        # (ttk turns "007" into 7)
+        self.values = {}
+
+        self.tree.bind("<Double-1>", self.on_double_click)
+        self.tree.bind("<Control-v>", self.on_paste)
+        self.tree.bind("<Control-V>", self.on_paste)
+        self.tree.bind("<Delete>", lambda event: self.delete_selected())
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    def set_columns(self, columns):
+        # columns: list of (name, data_type)
+        self.cancel_edit()
+        self.clear()
+        self.columns = list(columns)
+        names = [name for name, _ in self.columns]
+        self.tree["columns"] = names + [ERROR_COLUMN]
+        for name, data_type in self.columns:
+            self.tree.heading(name, text=f"{name} ({data_type})")
+            self.tree.column(name, width=120, minwidth=60)
+        self.tree.heading(ERROR_COLUMN, text="Error")
+        self.tree.column(ERROR_COLUMN, width=200, minwidth=80)
+
+    def add_row(self, values=None):
+        values = list(values or [])
+        values = (values + [""] * len(self.columns))[:len(self.columns)]
+        item = self.tree.insert("", "end", values=values + [""])
+        self.values[item] = values
+        return item
+
+    def delete_selected(self):
+        self.cancel_edit()
+        selection = self.tree.selection()
+        if selection:
+            self.tree.delete(*selection)
+            for item in selection:
+                self.values.pop(item, None)
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.values.clear()
+
+    def rows(self):
+        # Text values of every non-blank row, as (item, values) pairs
+        rows = []
+        for item in self.tree.get_children():
+            values = self.values[item]
+            if any(value.strip() for value in values):
+                rows.append((item, list(values)))
+        return rows
+
+    def show_results(self, items, errors):
+        # Drop the rows that were inserted; keep failed ones with their error
+        for index, item in enumerate(items):
+            if index in errors:
+                self.tree.item(item, values=self.values[item] + [str(errors[index])], tags=("error",))
+            else:
+                self.tree.delete(item)
+                self.values.pop(item, None)
+
+    def paste(self, text):
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        if lines and lines[-1] == "":
+            lines.pop()
+        rows = [line.split("\t") for line in lines]
+
+        # Skip a header row copied along with the data
+        names = [name.lower() for name, _ in self.columns]
+        if rows and [cell.strip().lower() for cell in rows[0]][:len(names)] == names:
+            rows = rows[1:]
+
+        for row in rows:
+            self.add_row(row)
+        return len(rows)
+
+    def on_paste(self, event):
+        try:
+            text = self.tree.clipboard_get()
+        except Exception:
+            return "break"
+        self.paste(text)
+        return "break"
+
+    def on_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)
+        if not item or not column:
+            return
+        index = int(column[1:]) - 1
+        if index < len(self.columns):
+            self.begin_edit(item, index)
+
+    def begin_edit(self, item, index):
+        self.cancel_edit()
+        bbox = self.tree.bbox(item, index)
+        if not bbox:
+            self.tree.see(item)
+            bbox = self.tree.bbox(item, index)
+            if not bbox:
+                return
+        x, y, width, height = bbox
+
+        editor = self.editor = ttk.Entry(self.tree)
+        editor.insert(0, self.values[item][index])
+        editor.select_range(0, "end")
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+
+        # Each binding carries its own editor: a late FocusOut from a replaced
+        # editor must not write into the cell now being edited
+        editor.bind("<Return>", lambda event: self.commit_edit(editor, item, index))
+        editor.bind("<Tab>", lambda event: self.commit_edit(editor, item, index, advance=True))
+        editor.bind("<Escape>", lambda event: self.cancel_edit())
+        editor.bind("<FocusOut>", lambda event: self.commit_edit(editor, item, index))
+
+    def commit_edit(self, editor, item, index, advance=False):
+        if editor is not self.editor:
+            return "break"
+        value = editor.get()
+        self.cancel_edit()
+        if self.tree.exists(item):
+            self.values[item][index] = value
+            self.tree.item(item, values=self.values[item] + [""], tags=())
+
+            if advance:
+                if index + 1 < len(self.columns):
+                    self.begin_edit(item, index + 1)
+                else:
+                    following = self.tree.next(item) or self.add_row()
+                    self.begin_edit(following, 0)
+        return "break"
+
+    def cancel_edit(self):
+        if self.editor is not None:
+            editor, self.editor = self.editor, None
+            editor.destroy()
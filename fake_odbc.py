@@ -0,0 +1,275 @@
+"""In-process stand-in for pyodbc that serves synthetic tables.
+
+Used by benchmark.py to run the engine without SQL Server or an ODBC driver.
+It understands the statements the application itself sends: the catalog
+queries of schema_cache, table_pager, table_stats and table_copy, SELECT * FROM [table] (with the
+pager's TOP/OFFSET forms), INSERT and the transaction statements around them.
+Anything else executes as a no-op without a result set.
+
+Each table has an int key column [id] followed by columns cycling through
+nvarchar, int, decimal, datetime, bit and varbinary. Cell values come from a
+small pool so generating them is cheap, but every fetch builds new row
+tuples, as the real driver builds new Row objects.
+"""
+import datetime
+import re
+import threading
+import time
+from decimal import Decimal
+
+
+apilevel = "2.0"
+paramstyle = "qmark"
+
+
+class Error(Exception):
+    pass
+
+
+class ProgrammingError(Error):
+    pass
+
+
+# (SQL type name, Python type, max_length, precision, scale, value(i))
+COLUMN_TYPES = (
+    ("nvarchar", str, 200, 0, 0, lambda i: f"value {i % 997}"),
+    ("int", int, 4, 10, 0, lambda i: i * 7 % 100003),
+    ("decimal", Decimal, 9, 18, 2, lambda i: Decimal(i % 100000) / 100),
+    ("datetime", datetime.datetime, 8, 23, 3,
+     lambda i: datetime.datetime(2020, 1, 1) + datetime.timedelta(minutes=i % 525600)),
+    ("bit", bool, 1, 1, 0, lambda i: i % 2 == 0),
+    ("varbinary", bytes, 16, 0, 0, lambda i: (i % 65536).to_bytes(2, "big") * 8),
+)
+
+VALUE_POOL_SIZE = 4096
+
+TABLE_PATTERN = re.compile(r"\bFROM\s+\[((?:[^\]]|\]\])+)\]", re.I)
+INSERT_PATTERN = re.compile(r"^\s*INSERT\s+INTO\s+\[((?:[^\]]|\]\])+)\]", re.I)
+TOP_PATTERN = re.compile(r"\bTOP\s*\(?\s*(\d+)", re.I)
+
+
+class Table:
+    def __init__(self, object_id, name, rows, columns):
+        self.object_id = object_id
+        self.name = name
+        self.rows = rows
+        self.inserted = 0
+        self.modify_date = datetime.datetime(2024, 1, 1)
+        self.columns = [("id",) + COLUMN_TYPES[1][:5]]
+        for index in range(columns - 1):
+            column_type = COLUMN_TYPES[index % len(COLUMN_TYPES)]
+            self.columns.append((f"col{index + 1}_{column_type[0]}",) + column_type[:5])
+        # Pre-built values per column type; row i takes entry i % VALUE_POOL_SIZE
+        self.pools = [None] + [
+            [COLUMN_TYPES[index % len(COLUMN_TYPES)][5](i) for i in range(VALUE_POOL_SIZE)]
+            for index in range(columns - 1)
+        ]
+
+    @property
+    def description(self):
+        # (name, type_code, display_size, internal_size, precision, scale, null_ok)
+        return [
+            (name, python_type, None, max_length, precision, scale, name != "id")
+            for name, _, python_type, max_length, precision, scale in self.columns
+        ]
+
+    def generate(self, start, stop):
+        pools = self.pools[1:]
+        for i in range(start, stop):
+            position = i % VALUE_POOL_SIZE
+            yield (i,) + tuple(pool[position] for pool in pools)
+
+
+class Server:
+    """Synthetic tables shared by every connection, plus round-trip counters.
+
+    ``latency`` seconds are slept on every execute and fetch, to model the
+    network between the application and SQL Server.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        self.connections_opened = 0
+
+    def add_table(self, name, rows, columns=8):
+        table = Table(len(self.tables) + 1, name, rows, max(columns, 1))
+        self.tables[name.lower()] = table
+        return table
+
+    def table(self, name):
+        table = self.tables.get(name.replace("]]", "]").lower())
+        if table is None:
+            raise ProgrammingError(f"Invalid object name '{name}'.")
+        return table
+
+    def round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counters(self):
+        with self.lock:
+            self.round_trips = 0
+            self.connections_opened = 0
+
+
+server = Server()
+
+
+def connect(conn_str, autocommit=False, **kwargs):
+    with server.lock:
+        server.connections_opened += 1
+    server.round_trip()
+    return Connection(server, autocommit)
+
+
+class Connection:
+    def __init__(self, server, autocommit=False):
+        self.server = server
+        self.autocommit = autocommit
+        self.closed = False
+
+    def cursor(self):
+        if self.closed:
+            raise ProgrammingError("Attempt to use a closed connection.")
+        return Cursor(self)
+
+    def commit(self):
+        self.server.round_trip()
+
+    def rollback(self):
+        self.server.round_trip()
+
+    def close(self):
+        self.closed = True
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.server = connection.server
+        self.description = None
+        self.rowcount = -1
+        self.messages = []
+        self.fast_executemany = False
+        self.rows = iter(())
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        self.server.round_trip()
+        self.description = None
+        self.rowcount = -1
+        self.rows = iter(())
+
+        lowered = sql.lower()
+        insert = INSERT_PATTERN.match(sql)
+        if insert:
+            self.server.table(insert.group(1)).inserted += 1
+            self.rowcount = 1
+        elif "sys.allocation_units" in lowered:
+            self._result(
+                [(name, object) for name in ("schema", "table", "rows", "reserved_kb", "used_kb",
+                                             "indexes", "modify_date", "last_update")],
+                [("dbo", table.name, table.rows + table.inserted, table.rows // 10, table.rows // 12, 1,
+                  table.modify_date, None) for table in self.server.tables.values()]
+            )
+        elif "is_computed" in lowered:
+            table = self.server.tables.get(params[0].strip("[]").lower())
+            self._result([("name", str), ("is_identity", bool), ("is_computed", bool), ("type", str)],
+                         [(name, False, False, type_name) for name, type_name, *_ in table.columns] if table else [])
+        elif "sys.columns" in lowered and "sys.objects" in lowered:
+            self._catalog(params)
+        elif "sys.objects" in lowered:
+            self._result([("object_id", int), ("modify_date", datetime.datetime)],
+                         [(table.object_id, table.modify_date) for table in self.server.tables.values()])
+        elif "sys.index_columns" in lowered:
+            self.server.table(params[0].strip("[]"))
+            self._result([("name", str)], [("id",)])
+        elif "dm_db_partition_stats" in lowered:
+            table = self.server.table(params[0].strip("[]"))
+            self._result([("row_count", int)], [(table.rows + table.inserted,)])
+        elif lowered.strip() == "select 1":
+            self._result([("", int)], [(1,)])
+        elif lowered.lstrip().startswith(("select", "with")):
+            self._select(sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        insert = INSERT_PATTERN.match(sql)
+        if insert is None:
+            raise ProgrammingError("executemany is only supported for INSERT")
+        seq_of_params = list(seq_of_params)
+        # fast_executemany sends the whole array in one round trip
+        for _ in range(1 if self.fast_executemany else len(seq_of_params)):
+            self.server.round_trip()
+        self.server.table(insert.group(1)).inserted += len(seq_of_params)
+        self.description = None
+        self.rowcount = len(seq_of_params)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=1):
+        self.server.round_trip()
+        return [row for _, row in zip(range(size), self.rows)]
+
+    def fetchall(self):
+        self.server.round_trip()
+        return list(self.rows)
+
+    def nextset(self):
+        self.description = None
+        self.rows = iter(())
+        return False
+
+    def cancel(self):
+        self.rows = iter(())
+
+    def close(self):
+        self.rows = iter(())
+
+    def _result(self, columns, rows):
+        self.description = [(name, python_type, None, None, None, None, True) for name, python_type in columns]
+        self.rows = iter(rows)
+        self.rowcount = -1
+
+    def _catalog(self, params):
+        ids = set(params)
+        rows = []
+        for table in self.server.tables.values():
+            if ids and table.object_id not in ids:
+                continue
+            for name, type_name, _, max_length, precision, scale in table.columns:
+                rows.append((
+                    table.object_id, "dbo", table.name, table.modify_date,
+                    name, type_name, name != "id", max_length, precision, scale, False
+                ))
+        columns = ["object_id", "schema", "table", "modify_date", "column", "type",
+                   "is_nullable", "max_length", "precision", "scale", "is_identity"]
+        self._result([(name, object) for name in columns], rows)
+
+    def _select(self, sql, params):
+        match = TABLE_PATTERN.search(sql)
+        if match is None:
+            raise ProgrammingError(f"Unsupported statement: {sql[:80]}")
+        table = self.server.table(match.group(1))
+        total = table.rows
+        start, stop = 0, total
+        if "OFFSET ? ROWS" in sql.upper():
+            start = params[0]
+            stop = start + params[1]
+        else:
+            top = TOP_PATTERN.search(sql)
+            if top is not None:
+                # Seek pages continue after the key passed as the first parameter
+                if params:
+                    start = params[0] + (1 if " > ?" in sql else 0)
+                stop = start + int(top.group(1))
+        self.description = table.description
+        self.rows = table.generate(start, min(stop, total))
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import current_operation, set_current_operation
+
+
+Target = namedtuple("Target", ["server", "database"])
+TargetResult = namedtuple(
+    "TargetResult",
+    ["target", "description", "rows", "truncated", "rows_affected", "elapsed", "error"]
+)
+FanOutResult = namedtuple("FanOutResult", ["targets_run", "targets_failed", "elapsed", "cancelled"])
+
+DATABASES_QUERY = """
+SELECT name FROM sys.databases
+WHERE database_id > 4 AND state_desc = 'ONLINE' AND HAS_DBACCESS(name) = 1
+ORDER BY name
+"""
+
+
+def parse_targets(text, default_server):
+    # One target per line, "server/database" or a database on default_server
+    targets = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "/" in line:
+            server, database = line.rsplit("/", 1)
+            target = Target(server.strip(), database.strip())
+        else:
+            target = Target(default_server, line)
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+def list_databases(connection):
+    cursor = connection.cursor()
+    cursor.execute(DATABASES_QUERY)
+    return [row[0] for row in cursor.fetchall()]
+
+
+class FanOutRunner:
+    """Runs one query against many (server, database) targets concurrently.
+
+    At most ``max_workers`` targets run at a time, each on a connection from
+    its own pool. A target returns at most ``max_rows`` rows. Pools are
+    borrowed from the connection manager, so the ones opened only for the
+    fan-out are closed again when their last target finishes and a run over
+    dozens of databases does not leave dozens of idle sessions, while pools
+    other operations hold stay open.
+    ``on_target_finished(TargetResult)`` is called from the pool threads.
+    """
+
+    def __init__(self, connections, targets, query, max_workers=8, max_rows=10000,
+                 on_target_finished=None):
+        self.connections = connections
+        self.targets = targets
+        self.query = query
+        self.max_workers = max(1, max_workers)
+        self.max_rows = max_rows
+        self.on_target_finished = on_target_finished
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        # Targets that have not started yet are skipped
+        self.cancel_event.set()
+
+    def run(self):
+        operation = current_operation()
+        started = time.perf_counter()
+
+        def run_target(target):
+            set_current_operation(operation)
+            try:
+                if self.cancel_event.is_set():
+                    return None
+                result = self._run_target(target)
+                if self.on_target_finished is not None:
+                    self.on_target_finished(result)
+                return result.error is None
+            finally:
+                set_current_operation(None)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.targets) or 1)) as pool:
+            outcomes = [outcome for outcome in pool.map(run_target, self.targets) if outcome is not None]
+        return FanOutResult(
+            len(outcomes),
+            outcomes.count(False),
+            time.perf_counter() - started,
+            len(outcomes) < len(self.targets)
+        )
+
+    def _run_target(self, target):
+        started = time.perf_counter()
+        pool = self.connections.borrow(target.server, target.database)
+        try:
+            # The query is the user's, so its session state is not pooled
+            with pool.connection(discard=True) as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(self.query)
+                    if cursor.description is None:
+                        conn.commit()
+                        return TargetResult(target, None, [], False, cursor.rowcount,
+                                            time.perf_counter() - started, None)
+                    rows = cursor.fetchmany(self.max_rows + 1)
+                    truncated = len(rows) > self.max_rows
+                    return TargetResult(target, cursor.description, rows[:self.max_rows], truncated, None,
+                                        time.perf_counter() - started, None)
+                finally:
+                    cursor.close()
+        except Exception as e:
+            return TargetResult(target, None, [], False, None, time.perf_counter() - started, e)
+        finally:
+            self.connections.release(pool)
@@ -0,0 +1,76 @@
+import datetime
+from decimal import Decimal
+
+
+NULL_MARKER = "NULL"
+BINARY_PREVIEW_BYTES = 32
+
+
+def _format_datetime(value):
+    return value.isoformat(sep=" ")
+
+
+def _format_binary(value):
+    preview = "0x" + bytes(value[:BINARY_PREVIEW_BYTES]).hex().upper()
+    if len(value) > BINARY_PREVIEW_BYTES:
+        preview += f"... ({len(value):,} bytes)"
+    return preview
+
+
+def _format_bool(value):
+    return "1" if value else "0"
+
+
+def _decimal_formatter(scale):
+    if scale is None:
+        return str
+    pattern = f"{{:.{scale}f}}"
+    return pattern.format
+
+
+def _null_safe(format_value):
+    def formatter(value):
+        if value is None:
+            return NULL_MARKER
+        return format_value(value)
+    return formatter
+
+
+def formatter_for(column):
+    # Choose the display formatter for one cursor.description entry
+    type_code = column[1]
+    if type_code is str:
+        format_value = str
+    elif type_code is datetime.datetime:
+        format_value = _format_datetime
+    elif type_code is datetime.date:
+        format_value = datetime.date.isoformat
+    elif type_code is datetime.time:
+        format_value = datetime.time.isoformat
+    elif type_code is Decimal:
+        format_value = _decimal_formatter(column[5])
+    elif type_code in (bytes, bytearray):
+        format_value = _format_binary
+    elif type_code is bool:
+        format_value = _format_bool
+    else:
+        format_value = str
+    return _null_safe(format_value)
+
+
+def row_formatter(description):
+    """Build a function that formats a batch of rows for display.
+
+    Formatters are picked once per column from the description; each batch is
+    then transposed and every column is formatted with a single map() call
+    instead of re-dispatching on the value type for every cell.
+    """
+    formatters = [formatter_for(column) for column in description]
+
+    def format_rows(rows):
+        if not rows:
+            return []
+        columns = [map(format_value, values) for format_value, values in zip(formatters, zip(*rows))]
+        return list(zip(*columns))
+
+    return format_rows
@@ -0,0 +1,135 @@
+import datetime
+import re
+
+from converters import converter_for
+from lob_preview import is_lob
+from table_pager import quote_name
+
+
+TEXT_TYPES = ("char", "varchar", "text", "nchar", "nvarchar", "ntext", "sysname")
+# Non-unicode columns compare with varchar parameters; an nvarchar parameter
+# would convert the column and turn an index seek into a scan
+ANSI_TYPES = ("char", "varchar", "text")
+UNFILTERABLE_TYPES = ("xml", "image", "geography", "geometry", "hierarchyid", "sql_variant")
+UNSORTABLE_TYPES = ("text", "ntext", "image", "xml", "geography", "geometry")
+# Parameters cast to the column's own type for the same reason
+CAST_TYPES = ("datetime", "smalldatetime", "date")
+
+OPERATOR_PATTERN = re.compile(r"^(>=|<=|<>|!=|=|>|<)\s*(.*)$", re.S)
+DATE_ONLY_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class FilterError(ValueError):
+    def __init__(self, column, message):
+        super().__init__(f"{column}: {message}")
+        self.column = column
+
+
+def typed_parameter(column):
+    # A placeholder that binds as the column's own type
+    data_type = column.data_type.lower()
+    if data_type in ANSI_TYPES:
+        return "CAST(? AS varchar(max))" if column.max_length == -1 or data_type == "text" else "CAST(? AS varchar(8000))"
+    if data_type in CAST_TYPES:
+        return f"CAST(? AS {data_type})"
+    return "?"
+
+
+def _escape_like(text):
+    return re.sub(r"([\\%_\[])", r"\\\1", text)
+
+
+def _convert(column, text):
+    try:
+        value = converter_for(column.data_type)(text)
+    except (ValueError, TypeError, OverflowError) as e:
+        raise FilterError(column.name, f"cannot use {text!r} ({e})")
+    if value is None:
+        raise FilterError(column.name, "a value is required")
+    return value
+
+
+def build_predicate(column, text):
+    """Turn one filter box into (sql, params) for the column.
+
+    Accepted forms: ``NULL``, ``NOT NULL``, ``op value`` with op one of
+    = <> != > >= < <=, ``low..high`` (inclusive) and a bare value. A bare
+    value matches a text column by prefix (``*`` matches anything, as in
+    ``*needle*``) and any other column by equality; a bare date on a datetime
+    column matches that whole day. Predicates compare the bare column to
+    parameters of its own type so that indexes on it can be used.
+    """
+    name = quote_name(column.name)
+    data_type = column.data_type.lower()
+    text = text.strip()
+    if text.upper() == "NULL":
+        return f"{name} IS NULL", []
+    if text.upper() == "NOT NULL":
+        return f"{name} IS NOT NULL", []
+    if data_type in UNFILTERABLE_TYPES or (is_lob(column) and data_type not in TEXT_TYPES):
+        raise FilterError(column.name, f"{data_type} columns can only be filtered with NULL or NOT NULL")
+
+    param = typed_parameter(column)
+    is_text = data_type in TEXT_TYPES
+    comparable = not is_lob(column) or data_type in ("varchar", "nvarchar")
+
+    match = OPERATOR_PATTERN.match(text)
+    if match is not None:
+        op, value = match.group(1), match.group(2).strip()
+        if not comparable:
+            raise FilterError(column.name, f"{data_type} columns can only be matched by text")
+        op = "<>" if op == "!=" else op
+        if is_text:
+            return f"{name} {op} {param}", [value]
+        return f"{name} {op} {param}", [_convert(column, value)]
+
+    if ".." in text and not is_text:
+        low, high = (part.strip() for part in text.split("..", 1))
+        return f"{name} >= {param} AND {name} <= {param}", [_convert(column, low), _convert(column, high)]
+
+    if is_text:
+        pattern = "%".join(_escape_like(part) for part in text.split("*"))
+        if "*" not in text:
+            pattern += "%"
+        return f"{name} LIKE {param} ESCAPE '\\'", [pattern]
+
+    if data_type in ("datetime", "datetime2", "smalldatetime") and DATE_ONLY_PATTERN.match(text):
+        day = _convert(column, text)
+        try:
+            next_day = day + datetime.timedelta(days=1)
+        except (TypeError, OverflowError) as e:
+            raise FilterError(column.name, f"cannot use {text!r} ({e})")
+        return f"{name} >= {param} AND {name} < {param}", [day, next_day]
+    return f"{name} = {param}", [_convert(column, text)]
+
+
+def build_where(columns, filters):
+    # filters maps column name -> filter text; returns (sql or None, params)
+    by_name = {column.name: column for column in columns}
+    terms = []
+    params = []
+    for name, text in filters.items():
+        if not text or not text.strip():
+            continue
+        column = by_name.get(name)
+        if column is None:
+            raise FilterError(name, "no such column")
+        sql, values = build_predicate(column, text)
+        terms.append(f"({sql})")
+        params.extend(values)
+    if not terms:
+        return None, []
+    return " AND ".join(terms), params
+
+
+def build_order(columns, sort):
+    # sort is (column name, descending); returns the ORDER BY text or None
+    if not sort:
+        return None
+    name, descending = sort
+    column = next((column for column in columns if column.name == name), None)
+    if column is None:
+        raise FilterError(name, "no such column")
+    if column.data_type.lower() in UNSORTABLE_TYPES:
+        raise FilterError(name, f"{column.data_type} columns cannot be sorted")
+    return quote_name(name) + (" DESC" if descending else "")
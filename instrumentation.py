@@ -0,0 +1,158 @@
+import csv
+import datetime
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+PHASES = ("connect", "execute", "fetch", "render")
+
+_local = threading.local()
+
+
+def current_operation():
+    # Operation the calling worker thread is running, if any
+    return getattr(_local, "operation", None)
+
+
+def set_current_operation(operation):
+    _local.operation = operation
+
+
+def estimate_bytes(rows):
+    # Size of the first row times the row count; exact sizes would cost a
+    # pass over every cell
+    if not rows:
+        return 0
+    sample = sum(
+        len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+        for value in rows[0]
+    )
+    return sample * len(rows)
+
+
+class Operation:
+    """Timing record for one database operation.
+
+    Phases accumulate, so a streamed result that is fetched and rendered in
+    many batches ends up with its total fetch and render time.
+    """
+
+    def __init__(self, recorder, kind, label, auto_finish=True):
+        self.recorder = recorder
+        self.kind = kind
+        self.label = label
+        self.auto_finish = auto_finish
+        self.started_at = datetime.datetime.now()
+        self.started = time.perf_counter()
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.total = None
+        self.rows = 0
+        self.bytes = 0
+        self.statements = 0
+        self.messages = []
+        self.error = None
+        self.finished = False
+        self.capture_statistics = recorder.capture_statistics
+        self.lock = threading.Lock()
+
+    def add_time(self, phase, seconds):
+        with self.lock:
+            self.timings[phase] += seconds
+
+    def add_statement(self, seconds):
+        with self.lock:
+            self.timings["execute"] += seconds
+            self.statements += 1
+
+    def add_rows(self, rows, seconds):
+        with self.lock:
+            self.timings["fetch"] += seconds
+            self.rows += len(rows)
+            self.bytes += estimate_bytes(rows)
+
+    def add_messages(self, messages):
+        if messages:
+            with self.lock:
+                self.messages.extend(str(message[1]) for message in messages)
+
+    def fail(self, error):
+        self.error = str(error)
+
+    def finish(self):
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+            self.total = time.perf_counter() - self.started
+        self.recorder.record(self)
+
+    def as_dict(self):
+        with self.lock:
+            record = {
+                "started_at": self.started_at.isoformat(sep=" ", timespec="milliseconds"),
+                "kind": self.kind,
+                "label": self.label,
+            }
+            for phase in PHASES:
+                record[f"{phase}_ms"] = round(self.timings[phase] * 1000, 1)
+            record["total_ms"] = round((self.total or 0) * 1000, 1)
+            record["rows"] = self.rows
+            record["bytes"] = self.bytes
+            record["statements"] = self.statements
+            record["error"] = self.error or ""
+            record["messages"] = "\n".join(self.messages)
+            return record
+
+
+class Instrumentation:
+    """Ring buffer of finished operations.
+
+    Operations that never reached the server (no connection checkout, no
+    statement) and did not fail are not recorded.
+    """
+
+    def __init__(self, capacity=500):
+        self.records = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.capture_statistics = False
+
+    def begin(self, kind, label, auto_finish=True):
+        return Operation(self, kind, label, auto_finish)
+
+    def add_listener(self, callback):
+        # Called with each recorded Operation, possibly from a worker thread
+        self.listeners.append(callback)
+
+    def record(self, operation):
+        if not operation.statements and not operation.timings["connect"] and not operation.error:
+            return
+        with self.lock:
+            self.records.append(operation)
+        for listener in self.listeners:
+            listener(operation)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.records)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def export(self, path):
+        records = [operation.as_dict() for operation in self.snapshot()]
+        if os.path.splitext(path)[1].lower() == ".json":
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=4)
+            return len(records)
+
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            fields = list(records[0]) if records else ["started_at", "kind", "label"]
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+        return len(records)
@@ -0,0 +1,151 @@
+from formatters import BINARY_PREVIEW_BYTES, NULL_MARKER, row_formatter
+from table_pager import quote_name
+
+
+PREVIEW_CHARS = 256
+CHUNK_SIZE = 512 * 1024
+
+# Types that are always stored as LOBs; (max) variants are recognised by max_length -1
+LOB_TYPES = {"text", "ntext", "image", "xml"}
+MAX_TYPES = {"varchar", "nvarchar", "varbinary"}
+BINARY_TYPES = {"image", "varbinary"}
+# Bytes per character, to tell a truncated preview from a complete one
+WIDE_TYPES = {"ntext", "nvarchar", "xml"}
+
+
+def is_lob(column):
+    data_type = column.data_type.lower()
+    return data_type in LOB_TYPES or (data_type in MAX_TYPES and column.max_length == -1)
+
+
+def value_expression(column):
+    # SUBSTRING accepts every LOB type except xml, which is read as text
+    name = quote_name(column.name)
+    if column.data_type.lower() == "xml":
+        return f"CAST({name} AS nvarchar(max))"
+    return name
+
+
+class LobPreview:
+    """Select list for browsing a table without transferring whole LOB values.
+
+    Every LOB column is selected as its first ``preview_chars`` characters
+    (or BINARY_PREVIEW_BYTES bytes) and its DATALENGTH is appended after the
+    table's own columns; row_formatter() folds the lengths back into the
+    preview cells. Full values are read by key with read_chunks().
+    """
+
+    def __init__(self, columns, key_columns, preview_chars=PREVIEW_CHARS):
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.preview_chars = preview_chars
+        self.lob_positions = [index for index, column in enumerate(self.columns) if is_lob(column)]
+        names = [column.name for column in self.columns]
+        self.key_positions = [names.index(name) for name in self.key_columns if name in names]
+
+    @property
+    def active(self):
+        return bool(self.lob_positions)
+
+    @property
+    def select_list(self):
+        if not self.active:
+            return "*"
+        items = []
+        for column in self.columns:
+            name = quote_name(column.name)
+            if is_lob(column):
+                size = BINARY_PREVIEW_BYTES if self.is_binary(column) else self.preview_chars
+                items.append(f"SUBSTRING({value_expression(column)}, 1, {size}) AS {name}")
+            else:
+                items.append(name)
+        for position in self.lob_positions:
+            column = self.columns[position]
+            items.append(f"DATALENGTH({quote_name(column.name)}) AS {quote_name(column.name + '$length')}")
+        return ", ".join(items)
+
+    def key_of(self, raw):
+        # Key values from a row's unformatted values
+        return tuple(raw[position] for position in self.key_positions)
+
+    def is_binary(self, column):
+        return column.data_type.lower() in BINARY_TYPES
+
+    def is_lob_position(self, position):
+        return position in self.lob_positions
+
+    def display_description(self, description):
+        # The cursor description without the appended length columns
+        return description[:len(self.columns)] if self.active else description
+
+    def row_formatter(self, description):
+        format_display = row_formatter(self.display_description(description))
+        if not self.active:
+            return format_display
+
+        width = len(self.columns)
+        lobs = [
+            (position, width + index, self.is_binary(self.columns[position]),
+             2 if self.columns[position].data_type.lower() in WIDE_TYPES else 1)
+            for index, position in enumerate(self.lob_positions)
+        ]
+        preview_chars = self.preview_chars
+
+        def format_rows(rows):
+            formatted = format_display([row[:width] for row in rows])
+            for index, row in enumerate(formatted):
+                cells = None
+                for position, length_position, binary, char_width in lobs:
+                    value, length = rows[index][position], rows[index][length_position]
+                    if value is None:
+                        continue
+                    if binary:
+                        truncated = length > len(value)
+                        text = "0x" + bytes(value).hex().upper()
+                    else:
+                        truncated = len(value) >= preview_chars and length > len(value) * char_width
+                        text = value
+                    if truncated:
+                        if cells is None:
+                            cells = list(row)
+                        cells[position] = f"{text}... ({length:,} bytes)"
+                if cells is not None:
+                    formatted[index] = tuple(cells)
+            return formatted
+
+        return format_rows
+
+
+def read_chunks(connection, table_name, column, key_columns, key, chunk_size=CHUNK_SIZE):
+    """Yield one row's full LOB value in pieces of ``chunk_size`` characters
+    (bytes for binary columns), each piece read with its own SUBSTRING query."""
+    if not key_columns:
+        raise ValueError(f"{table_name} has no primary key; full values cannot be read")
+    where = " AND ".join(f"{quote_name(name)} = ?" for name in key_columns)
+    sql = f"SELECT SUBSTRING({value_expression(column)}, ?, ?) FROM {quote_name(table_name)} WHERE {where}"
+    cursor = connection.cursor()
+    try:
+        start = 1
+        while True:
+            cursor.execute(sql, [start, chunk_size] + list(key))
+            row = cursor.fetchone()
+            if row is None:
+                raise LookupError("The row no longer exists")
+            chunk = row[0]
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            start += chunk_size
+    finally:
+        cursor.close()
+
+
+def format_chunk(chunk):
+    # Viewer text for one piece of a value
+    if chunk is None:
+        return NULL_MARKER
+    if isinstance(chunk, (bytes, bytearray)):
+        return bytes(chunk).hex().upper()
+    return chunk
@@ -0,0 +1,144 @@
+import datetime
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+
+from result_cache import normalize_query
+
+
+HistoryEntry = namedtuple(
+    "HistoryEntry",
+    ["query", "target", "last_run", "runs", "elapsed_ms", "rows", "error"]
+)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY,
+        executed_at TEXT NOT NULL,
+        target TEXT NOT NULL,
+        query TEXT NOT NULL,
+        normalized TEXT NOT NULL,
+        elapsed_ms REAL,
+        rows INTEGER,
+        error TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS history_normalized ON history (normalized)",
+    "CREATE INDEX IF NOT EXISTS history_executed_at ON history (executed_at)",
+]
+
+# Full-text index kept in sync by triggers; only created when the SQLite
+# build has FTS5
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS history_fts
+       USING fts5(normalized, content='history', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+        INSERT INTO history_fts (rowid, normalized) VALUES (new.id, new.normalized);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+        INSERT INTO history_fts (history_fts, rowid, normalized) VALUES ('delete', old.id, old.normalized);
+    END""",
+]
+
+# Latest run of each distinct query among the matching rows
+SEARCH_QUERY = """
+SELECT h.query, h.target, h.executed_at, g.runs, h.elapsed_ms, h.rows, h.error
+FROM (
+    SELECT normalized, MAX(id) AS last_id, COUNT(*) AS runs
+    FROM history
+    WHERE {filter}
+    GROUP BY normalized
+) g
+JOIN history h ON h.id = g.last_id
+ORDER BY h.id DESC
+LIMIT ?
+"""
+
+
+class QueryHistory:
+    """Executed queries with their timing, kept in a local SQLite file.
+
+    Searches match whole words and word prefixes through an FTS5 index when
+    SQLite provides one, and fall back to a substring match otherwise. Only
+    the newest ``max_entries`` runs are kept.
+    """
+
+    def __init__(self, path, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        try:
+            for statement in FTS_SCHEMA:
+                self.conn.execute(statement)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.full_text = False
+        self.conn.commit()
+        self._prune()
+
+    def add(self, target, query, elapsed=None, rows=None, error=None):
+        # Returns the entry id, so the row count can be filled in later
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO history (executed_at, target, query, normalized, elapsed_ms, rows, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.datetime.now().isoformat(sep=" ", timespec="seconds"),
+                    target,
+                    query,
+                    normalize_query(query),
+                    None if elapsed is None else round(elapsed * 1000, 1),
+                    rows,
+                    None if error is None else str(error)
+                )
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def update(self, entry_id, rows=None, error=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE history SET rows = COALESCE(?, rows), error = COALESCE(?, error) WHERE id = ?",
+                (rows, None if error is None else str(error), entry_id)
+            )
+            self.conn.commit()
+
+    def search(self, text="", limit=200):
+        words = re.findall(r"\w+", text)
+        if not words:
+            sql, params = SEARCH_QUERY.format(filter="1 = 1"), []
+        elif self.full_text:
+            # Every word must match, the last one (still being typed) as a prefix
+            match = " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+            sql = SEARCH_QUERY.format(filter="id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+            params = [match.strip()]
+        else:
+            sql = SEARCH_QUERY.format(filter="normalized LIKE ? ESCAPE '\\'")
+            escaped = text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params = [f"%{escaped}%"]
+
+        with self.lock:
+            rows = self.conn.execute(sql, params + [limit]).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM history")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _prune(self):
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM history WHERE id <= (SELECT MAX(id) FROM history) - ?",
+                (self.max_entries,)
+            )
+            self.conn.commit()
@@ -0,0 +1,205 @@
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+
+NS = {"p": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+PLAN_COLUMN = "Microsoft SQL Server 2005 XML Showplan"
+
+SCAN_OPS = {"Table Scan", "Clustered Index Scan", "Index Scan"}
+LOOKUP_OPS = {"Key Lookup", "RID Lookup"}
+# Warnings elements that mean the operator spilled to tempdb
+SPILL_WARNINGS = ("SpillToTempDb", "HashSpillDetails", "SortSpillDetails", "ExchangeSpillDetails")
+OTHER_WARNINGS = {
+    "NoJoinPredicate": "no join predicate",
+    "ColumnsWithNoStatistics": "missing statistics",
+    "PlanAffectingConvert": "implicit conversion",
+    "UnmatchedIndexes": "unmatched filtered index",
+}
+# Actual rows this many times off the estimate are flagged
+MISESTIMATE_FACTOR = 10
+
+Statement = namedtuple("Statement", ["text", "cost", "operators", "missing_indexes"])
+MissingIndex = namedtuple("MissingIndex", ["impact", "table", "equality", "inequality", "include"])
+
+
+class PlanOperator:
+    """One RelOp of a showplan, with its children and flagged problems."""
+
+    def __init__(self, node_id, physical_op, logical_op, object_name, estimated_rows,
+                 subtree_cost, actual_rows=None):
+        self.node_id = node_id
+        self.physical_op = physical_op
+        self.logical_op = logical_op
+        self.object_name = object_name
+        self.estimated_rows = estimated_rows
+        self.subtree_cost = subtree_cost
+        self.actual_rows = actual_rows
+        self.children = []
+        self.flags = []
+        self.own_cost = subtree_cost
+        self.cost_share = 0.0
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _child_relops(element):
+    # RelOps nested under this element but not under another RelOp
+    for child in element:
+        if _local(child.tag) == "RelOp":
+            yield child
+        else:
+            yield from _child_relops(child)
+
+
+def _object_name(relop):
+    for child in relop:
+        if _local(child.tag) == "RelOp":
+            continue
+        obj = child.find("p:Object", NS)
+        if obj is not None:
+            parts = [obj.get(name, "").strip("[]") for name in ("Schema", "Table", "Index")]
+            name = ".".join(part for part in parts[:2] if part)
+            return f"{name} ({parts[2]})" if parts[2] else name
+    return ""
+
+
+def _actual_rows(relop):
+    counters = relop.findall("p:RunTimeInformation/p:RunTimeCountersPerThread", NS)
+    if not counters:
+        return None
+    return sum(int(_float(counter.get("ActualRows"))) for counter in counters)
+
+
+def _flags(relop, operator):
+    flags = []
+    if operator.physical_op in SCAN_OPS:
+        flags.append("scan")
+    if operator.physical_op in LOOKUP_OPS or relop.find("p:IndexScan[@Lookup='1']", NS) is not None:
+        flags.append("key lookup")
+
+    warnings = relop.find("p:Warnings", NS)
+    if warnings is not None:
+        for child in warnings:
+            name = _local(child.tag)
+            if name in SPILL_WARNINGS:
+                if "spill" not in flags:
+                    flags.append("spill")
+            elif name in OTHER_WARNINGS and OTHER_WARNINGS[name] not in flags:
+                flags.append(OTHER_WARNINGS[name])
+        if warnings.get("NoJoinPredicate") == "1" and "no join predicate" not in flags:
+            flags.append("no join predicate")
+
+    if operator.actual_rows is not None and operator.estimated_rows > 0:
+        ratio = (operator.actual_rows + 1) / (operator.estimated_rows + 1)
+        if ratio >= MISESTIMATE_FACTOR or ratio <= 1 / MISESTIMATE_FACTOR:
+            flags.append("row misestimate")
+    return flags
+
+
+def _parse_relop(relop):
+    operator = PlanOperator(
+        relop.get("NodeId"),
+        relop.get("PhysicalOp", ""),
+        relop.get("LogicalOp", ""),
+        _object_name(relop),
+        _float(relop.get("EstimateRows")),
+        _float(relop.get("EstimatedTotalSubtreeCost")),
+        _actual_rows(relop)
+    )
+    operator.children = [_parse_relop(child) for child in _child_relops(relop)]
+    operator.own_cost = max(operator.subtree_cost - sum(child.subtree_cost for child in operator.children), 0.0)
+    operator.flags = _flags(relop, operator)
+    return operator
+
+
+def _missing_indexes(statement):
+    found = []
+    for group in statement.findall(".//p:MissingIndexes/p:MissingIndexGroup", NS):
+        impact = _float(group.get("Impact"))
+        for index in group.findall("p:MissingIndex", NS):
+            table = ".".join(index.get(name, "") for name in ("Schema", "Table"))
+            usage = {"EQUALITY": [], "INEQUALITY": [], "INCLUDE": []}
+            for column_group in index.findall("p:ColumnGroup", NS):
+                names = [column.get("Name") for column in column_group.findall("p:Column", NS)]
+                usage.setdefault(column_group.get("Usage"), []).extend(names)
+            found.append(MissingIndex(impact, table, usage["EQUALITY"], usage["INEQUALITY"], usage["INCLUDE"]))
+    return found
+
+
+def parse_plan(xml_text):
+    """Parse one showplan XML document into a list of Statements.
+
+    Each statement carries its root operators; every operator knows its own
+    cost (subtree cost minus its children's) and its share of the statement
+    cost, and lists the problems spotted in it.
+    """
+    root = ET.fromstring(xml_text)
+    statements = []
+    for stmt in root.iter(f"{{{NS['p']}}}StmtSimple"):
+        plan = stmt.find("p:QueryPlan", NS)
+        operators = [_parse_relop(relop) for relop in _child_relops(plan)] if plan is not None else []
+        cost = _float(stmt.get("StatementSubTreeCost")) or sum(op.subtree_cost for op in operators)
+        for top in operators:
+            for operator in top.walk():
+                operator.cost_share = operator.own_cost / cost if cost else 0.0
+        statements.append(Statement(
+            " ".join((stmt.get("StatementText") or "").split()),
+            cost,
+            operators,
+            _missing_indexes(stmt)
+        ))
+    return statements
+
+
+def hotspots(statements, limit=10):
+    # Operators of all statements ranked by their own cost
+    operators = [operator for statement in statements for top in statement.operators for operator in top.walk()]
+    operators.sort(key=lambda operator: operator.own_cost, reverse=True)
+    return operators[:limit]
+
+
+def index_suggestion(missing):
+    keys = missing.equality + missing.inequality
+    name = "_".join(part.strip("[]") for part in [missing.table.split(".")[-1]] + keys)
+    sql = f"CREATE INDEX [IX_{name}] ON {missing.table} ({', '.join(keys)})"
+    if missing.include:
+        sql += f" INCLUDE ({', '.join(missing.include)})"
+    return sql
+
+
+def capture_plan(cursor, query, actual=False):
+    """Run query on a PooledCursor and return the showplan XML documents.
+
+    Estimated plans use SHOWPLAN_XML, so the query is compiled but not run.
+    Actual plans use STATISTICS XML: the query does run, its own result sets
+    are read and discarded, and the plan arrives as an extra result set. The
+    caller does not commit, so changes made by an explained statement are
+    rolled back when the connection returns to the pool.
+    """
+    cursor.set_session_option("STATISTICS XML" if actual else "SHOWPLAN_XML")
+    cursor.execute(query)
+    plans = []
+    while True:
+        if cursor.description is not None:
+            if not actual or cursor.description[0][0] == PLAN_COLUMN:
+                plans.extend(row[0] for row in cursor.fetchall())
+            else:
+                while cursor.fetchmany(5000):
+                    pass
+        if not cursor.nextset():
+            break
+    return plans
@@ -0,0 +1,124 @@
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+
+CachedResult = namedtuple("CachedResult", ["description", "rows", "stored_at", "size"])
+
+# Literals and comments are kept verbatim; whitespace between them is collapsed
+_TOKEN_PATTERN = re.compile(r"('(?:[^']|'')*'|\[[^\]]*\]|\"[^\"]*\"|--[^\n]*|/\*.*?\*/|\s+)", re.S)
+
+_READ_ONLY_START = re.compile(r"^\s*(SELECT|WITH)\b", re.I)
+# Anything that writes, changes session state or calls code whose effects
+# (or results) a cached copy could not reproduce
+_WRITE_PATTERN = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|INTO|EXEC|EXECUTE|CREATE|ALTER|DROP|TRUNCATE|GRANT|REVOKE|DENY|"
+    r"SET|DECLARE|BEGIN|COMMIT|ROLLBACK|NEWID|RAND|GETDATE|SYSDATETIME|CURRENT_TIMESTAMP)\b",
+    re.I
+)
+
+
+def normalize_query(query):
+    """Collapse whitespace and drop comments outside literals and a trailing ';'.
+
+    Two queries that only differ in layout normalize to the same text; the
+    case of identifiers and literals is preserved since it can matter.
+    """
+    parts = []
+    for token in _TOKEN_PATTERN.split(query):
+        if not token:
+            continue
+        if token.isspace() or token.startswith("--") or token.startswith("/*"):
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        else:
+            parts.append(token)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def _strip_literals(query):
+    # Quoted names become a placeholder so [Update] is not read as a keyword
+    def strip(token):
+        if token.startswith(("'", "--", "/*")):
+            return " "
+        if token.startswith(("[", '"')):
+            return " _ "
+        return token
+    return "".join(strip(token) for token in _TOKEN_PATTERN.split(query))
+
+
+def is_cacheable(query):
+    # Plain SELECT statements only; keywords inside string literals are ignored
+    code = _strip_literals(query)
+    return bool(_READ_ONLY_START.match(code)) and not _WRITE_PATTERN.search(code)
+
+
+def _estimate_size(rows):
+    size = 0
+    for row in rows:
+        for value in row:
+            size += len(value) if isinstance(value, str) else 16
+    return size
+
+
+class ResultCache:
+    """Size-bounded LRU cache of finished SELECT results.
+
+    Entries are keyed by (target, normalized query) and expire ``ttl``
+    seconds after they were stored. When the cached rows exceed
+    ``max_bytes`` the least recently used entries are dropped; results of
+    more than ``max_rows`` rows are never cached.
+    """
+
+    def __init__(self, ttl=300, max_bytes=64 * 1024 * 1024, max_rows=100000):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, target, query):
+        key = (target, normalize_query(query))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, target, query, description, rows):
+        if len(rows) > self.max_rows or not is_cacheable(query):
+            return False
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return False
+
+        key = (target, normalize_query(query))
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = CachedResult(description, list(rows), time.monotonic(), size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+        return True
+
+    def invalidate(self, target=None):
+        # Drop every entry of one target (after a write), or everything
+        with self.lock:
+            for key in list(self.entries):
+                if target is None or key[0] == target:
+                    self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.size -= entry.size
@@ -0,0 +1,174 @@
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+
+ExportResult = namedtuple("ExportResult", ["rows", "elapsed", "path", "cancelled"])
+
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+}
+
+
+def format_for_path(path):
+    return EXPORT_FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def _open_text(path, newline=None):
+    # "-" writes to stdout, which is left open
+    if path == "-":
+        return sys.stdout, False
+    return open(path, 'w', newline=newline, encoding='utf-8'), True
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+
+class CsvExportWriter:
+    def __init__(self, path, description):
+        self.file, self.owned = _open_text(path, newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([col[0] for col in description])
+        # csv would write bytes as "b'...'"; hex-encode binary columns instead
+        self.binary = [index for index, col in enumerate(description) if col[1] in (bytes, bytearray)]
+
+    def write(self, rows):
+        if self.binary:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for index in self.binary:
+                    if row[index] is not None:
+                        row[index] = row[index].hex()
+        self.writer.writerows(rows)
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class JsonLinesExportWriter:
+    def __init__(self, path, description):
+        self.file, self.owned = _open_text(path)
+        self.names = [col[0] for col in description]
+        self.encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+
+    def write(self, rows):
+        encode = self.encoder.encode
+        names = self.names
+        self.file.write("".join(encode(dict(zip(names, row))) + "\n" for row in rows))
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class ParquetExportWriter:
+    """Writes one Parquet row group per batch; requires pyarrow."""
+
+    def __init__(self, path, description):
+        if path == "-":
+            raise ValueError("Parquet output needs a file path")
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([
+            pyarrow.field(col[0], self._arrow_type(col), nullable=True) for col in description
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def _arrow_type(self, col):
+        pa = self.pa
+        type_code = col[1]
+        if type_code is bool:
+            return pa.bool_()
+        if type_code is int:
+            return pa.int64()
+        if type_code is float:
+            return pa.float64()
+        if type_code is Decimal:
+            precision, scale = col[4] or 38, col[5] or 0
+            return pa.decimal128(min(precision, 38), scale)
+        if type_code is datetime.datetime:
+            return pa.timestamp("us")
+        if type_code is datetime.date:
+            return pa.date32()
+        if type_code is datetime.time:
+            return pa.time64("us")
+        if type_code in (bytes, bytearray):
+            return pa.binary()
+        return pa.string()
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        arrays = [
+            self.pa.array(column, type=field.type)
+            for column, field in zip(columns, self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    "csv": CsvExportWriter,
+    "jsonl": JsonLinesExportWriter,
+    "parquet": ParquetExportWriter,
+}
+
+
+def export_cursor(cursor, path, fmt=None, batch_size=5000, progress=None, cancel_event=None):
+    """Stream an executed cursor to disk with fetchmany().
+
+    Only one batch is held in memory at a time. ``progress(rows, elapsed)``
+    is called after every batch; setting ``cancel_event`` stops the export
+    after the current batch and leaves a valid, truncated file.
+    """
+    if cursor.description is None:
+        raise ValueError("The statement did not return a result set")
+
+    writer = WRITERS[fmt or format_for_path(path)](path, cursor.description)
+    started = time.perf_counter()
+    rows_written = 0
+    cancelled = False
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.write(rows)
+            rows_written += len(rows)
+            if progress is not None:
+                progress(rows_written, time.perf_counter() - started)
+    finally:
+        writer.close()
+
+    return ExportResult(rows_written, time.perf_counter() - started, path, cancelled)
@@ -0,0 +1,395 @@
+import pickle
+import tempfile
+from collections import OrderedDict
+from tkinter import ttk
+
+from formatters import row_formatter
+from search_index import SearchIndex
+
+
+class RowSpool:
+    """Append-only row store with bounded memory.
+
+    Rows are grouped into fixed-size blocks. Full blocks are pickled into an
+    anonymous temporary file and only the most recently used ones are kept in
+    memory, so the footprint does not grow with the number of rows fetched.
+    """
+
+    def __init__(self, block_size=1000, cached_blocks=8):
+        self.block_size = block_size
+        self.cached_blocks = cached_blocks
+        self.file = None
+        self.block_index = []
+        self.cache = OrderedDict()
+        self.tail = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, rows):
+        for row in rows:
+            self.tail.append(row)
+            if len(self.tail) == self.block_size:
+                self._spill()
+        self.count += len(rows)
+
+    def get_rows(self, start, stop):
+        stop = min(stop, self.count)
+        rows = []
+        index = max(start, 0)
+        while index < stop:
+            block_no, position = divmod(index, self.block_size)
+            block = self._block(block_no)
+            take = min(stop - index, len(block) - position)
+            rows.extend(block[position:position + take])
+            index += take
+        return rows
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.block_index = []
+        self.cache.clear()
+        self.tail = []
+        self.count = 0
+
+    def _spill(self):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        data = pickle.dumps(self.tail, protocol=pickle.HIGHEST_PROTOCOL)
+        self.file.seek(0, 2)
+        self.block_index.append((self.file.tell(), len(data)))
+        self.file.write(data)
+        self._remember(len(self.block_index) - 1, self.tail)
+        self.tail = []
+
+    def _block(self, block_no):
+        if block_no == len(self.block_index):
+            return self.tail
+        if block_no in self.cache:
+            self.cache.move_to_end(block_no)
+            return self.cache[block_no]
+        offset, length = self.block_index[block_no]
+        self.file.seek(offset)
+        block = pickle.loads(self.file.read(length))
+        self._remember(block_no, block)
+        return block
+
+    def _remember(self, block_no, block):
+        self.cache[block_no] = block
+        self.cache.move_to_end(block_no)
+        while len(self.cache) > self.cached_blocks:
+            self.cache.popitem(last=False)
+
+
+class VirtualResultGrid:
+    """Virtualized view of a cursor inside a ttk.Treeview.
+
+    The tree only ever holds as many items as fit on screen; scrolling rewrites
+    their values from a RowSpool. Rows are pulled from the cursor with
+    fetchmany() on the DB executor whenever the visible window gets within
+    ``prefetch`` rows of the end of what has been fetched so far.
+
+    A searchable grid also feeds every row it receives into a SearchIndex;
+    rows in ``matches`` are highlighted and ``current_match`` more so.
+    """
+
+    def __init__(self, tree, scrollbar, executor, fetch_size=500, prefetch=200, searchable=False):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.executor = executor
+        self.fetch_size = fetch_size
+        self.prefetch = prefetch
+
+        self.spool = RowSpool()
+        # Unformatted values of each row, kept when the caller names the columns
+        self.raw = RowSpool()
+        self.raw_positions = None
+        self.cursor = None
+        self.operation = None
+        self.format_rows = None
+        self.generation = 0
+        self.offset = 0
+        self.visible = 1
+        self.exhausted = True
+        self.fetching = False
+        self.on_rows_loaded = None
+        self.on_fetch_error = None
+        self.search_index = SearchIndex() if searchable else None
+        self.matches = set()
+        self.current_match = None
+        # Row index -> (values, tag) drawn instead of the spooled row, e.g.
+        # edits that are not saved yet
+        self.pending = {}
+        self.on_scroll = None
+        # on_rows_appended(start, count) runs for every batch added to the grid
+        self.on_rows_appended = None
+        self.tree.tag_configure("match", background="#FFF59D")
+        self.tree.tag_configure("current_match", background="#FFB74D")
+        self.tree.tag_configure("edited", foreground="#1565C0")
+        self.tree.tag_configure("deleted", foreground="#9E9E9E", background="#FFEBEE")
+
+        self.scrollbar.configure(command=self.on_scrollbar)
+        self.tree.configure(yscrollcommand=lambda first, last: None)
+        self.tree.bind("<Configure>", self.on_resize, add="+")
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.visible))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.visible))
+
+    def __len__(self):
+        return len(self.spool)
+
+    def load(self, open_cursor, on_ready=None, on_error=None, on_rows_loaded=None, operation=None,
+             formatter=None, raw_positions=None):
+        # open_cursor runs on the worker and must return an executed cursor.
+        # on_ready(description, rowcount) runs once the statement has executed.
+        # The operation, if given, spans the execute and every fetch and is
+        # finished when the cursor is closed. formatter(description) replaces
+        # row_formatter; raw_positions are the columns row_raw() returns
+        # (on_ready may also set raw_positions once the columns are known).
+        self.clear()
+        generation = self.generation
+        self.raw_positions = raw_positions
+        self.on_rows_loaded = on_rows_loaded
+        self.on_fetch_error = on_error
+        if operation is not None:
+            operation.auto_finish = False
+        self.operation = operation
+
+        def execute():
+            cursor = open_cursor()
+            return cursor, cursor.description, cursor.rowcount
+
+        def ready(result):
+            cursor, description, rowcount = result
+            if generation != self.generation:
+                self._close_cursor(cursor, operation)
+                return
+            if on_ready:
+                on_ready(description, rowcount)
+            if description is None:
+                self._close_cursor(cursor, operation)
+                self.operation = None
+                return
+            self.cursor = cursor
+            self.format_rows = (formatter or row_formatter)(description)
+            self.exhausted = False
+            self.fetch_more()
+
+        def failed(e):
+            if operation is not None:
+                operation.finish()
+            if generation == self.generation:
+                self.operation = None
+            if on_error:
+                on_error(e)
+
+        self.executor.submit(execute, on_success=ready, on_error=failed, operation=operation)
+
+    def show_rows(self, rows, raw=None):
+        # Display a fixed set of already formatted rows, e.g. one table page
+        self.clear()
+        self._append(rows, raw)
+        self.render()
+
+    def begin_stream(self):
+        # Rows are pushed in with append_rows() instead of fetched from a cursor
+        self.clear()
+        self.exhausted = False
+
+    def append_rows(self, rows, done=False):
+        self._append(rows)
+        if done:
+            self.exhausted = True
+        # Only redraw when the new rows can be on screen
+        if done or self.offset + self.visible > len(self.spool) - len(rows):
+            self.render()
+        else:
+            self._update_scrollbar()
+
+    def clear(self):
+        self.generation += 1
+        if self.cursor is not None:
+            self._close_cursor(self.cursor, self.operation)
+            self.cursor = None
+        self.operation = None
+        self.spool.close()
+        self.raw.close()
+        if self.search_index is not None:
+            self.search_index.clear()
+        self.matches = set()
+        self.current_match = None
+        self.raw_positions = None
+        self.pending = {}
+        self.offset = 0
+        self.exhausted = True
+        self.fetching = False
+        self.tree.delete(*self.tree.get_children())
+        self._update_scrollbar()
+
+    def fetch_more(self):
+        if self.fetching or self.exhausted or self.cursor is None:
+            return
+
+        self.fetching = True
+        generation = self.generation
+        cursor = self.cursor
+        operation = self.operation
+        size = self.fetch_size
+        format_rows = self.format_rows
+        raw_positions = self.raw_positions
+
+        def fetch():
+            rows = cursor.fetchmany(size)
+            raw = [tuple(row[pos] for pos in raw_positions) for row in rows] if raw_positions else None
+            return format_rows(rows), raw, len(rows) < size
+
+        def fetched(result):
+            if generation != self.generation:
+                return
+            rows, raw, done = result
+            self.fetching = False
+            self._append(rows, raw)
+            if done:
+                self.exhausted = True
+                self._close_cursor(self.cursor, operation)
+                self.cursor = None
+                self.operation = None
+            self.render()
+            if self.on_rows_loaded:
+                self.on_rows_loaded(len(self.spool), self.exhausted)
+
+        def failed(e):
+            if generation != self.generation:
+                return
+            self.fetching = False
+            self.exhausted = True
+            self._close_cursor(self.cursor, operation)
+            self.cursor = None
+            self.operation = None
+            if self.on_fetch_error:
+                self.on_fetch_error(e)
+
+        self.executor.submit(fetch, on_success=fetched, on_error=failed, operation=operation)
+
+    def render(self):
+        rows = self.spool.get_rows(self.offset, self.offset + self.visible)
+        items = self.tree.get_children()
+        matches = self.matches
+        pending = self.pending
+        for index, values in enumerate(rows):
+            row = self.offset + index
+            if row in pending:
+                values, tag = pending[row]
+                tags = (tag,)
+            elif row == self.current_match:
+                tags = ("current_match",)
+            elif row in matches:
+                tags = ("match",)
+            else:
+                tags = ()
+            if index < len(items):
+                self.tree.item(items[index], values=values, tags=tags)
+            else:
+                self.tree.insert("", "end", values=values, tags=tags)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        self._update_scrollbar()
+
+        if self.offset + self.visible + self.prefetch >= len(self.spool):
+            self.fetch_more()
+
+    def scroll_to(self, index):
+        last_offset = max(len(self.spool) - self.visible, 0)
+        offset = min(max(index, 0), last_offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.tree.selection_remove(self.tree.selection())
+            if self.on_scroll is not None:
+                self.on_scroll()
+        self.render()
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def show_match(self, index):
+        # Make a row the current match and scroll it into view
+        self.current_match = index
+        if index is not None and not self.offset <= index < self.offset + self.visible:
+            self.scroll_to(index - self.visible // 2)
+        else:
+            self.render()
+
+    def row_index(self, item):
+        # Absolute row number of a tree item, for callers that act on selections
+        return self.offset + self.tree.index(item)
+
+    def row_values(self, index):
+        rows = self.spool.get_rows(index, index + 1)
+        return rows[0] if rows else None
+
+    def row_raw(self, index):
+        # Unformatted values of a row, or None if they were not kept
+        if index >= len(self.raw):
+            return None
+        return self.raw.get_rows(index, index + 1)[0]
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self._virtual_total()))
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.scroll(amount * (self.visible if unit == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def on_resize(self, event):
+        row_height = self._row_height()
+        visible = max((event.height - row_height) // row_height, 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def _append(self, rows, raw=None):
+        start = len(self.spool)
+        self.spool.append(rows)
+        if raw is not None:
+            self.raw.append(raw)
+        if self.search_index is not None:
+            self.search_index.add(rows)
+        if self.on_rows_appended is not None and rows:
+            self.on_rows_appended(start, len(rows))
+
+    def _virtual_total(self):
+        # Leave room past the last fetched row while more rows are available
+        total = len(self.spool)
+        if not self.exhausted:
+            total += self.visible
+        return max(total, 1)
+
+    def _update_scrollbar(self):
+        total = self._virtual_total()
+        first = self.offset / total
+        last = min((self.offset + self.visible) / total, 1.0)
+        self.scrollbar.set(first, last)
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style().lookup("Treeview", "rowheight")) or 20
+        except (TypeError, ValueError):
+            return 20
+
+    def _close_cursor(self, cursor, operation=None):
+        # Closing collects the statement's messages, so the operation is only
+        # finished afterwards
+        def closed(result=None):
+            if operation is not None:
+                operation.finish()
+
+        self.executor.submit(cursor.close, on_success=closed, on_error=closed, operation=operation)
@@ -0,0 +1,179 @@
+import re
+import threading
+from collections import namedtuple
+
+
+ColumnInfo = namedtuple(
+    "ColumnInfo",
+    ["name", "data_type", "is_nullable", "max_length", "precision", "scale", "is_identity"]
+)
+
+
+class TableInfo:
+    def __init__(self, object_id, schema, name, modify_date):
+        self.object_id = object_id
+        self.schema = schema
+        self.name = name
+        self.modify_date = modify_date
+        self.columns = []
+
+
+# Tables and their columns in one round trip
+SCHEMA_QUERY = """
+    SELECT o.object_id, s.name, o.name, o.modify_date,
+           c.name, t.name, c.is_nullable, c.max_length, c.precision, c.scale, c.is_identity
+    FROM sys.objects o
+    JOIN sys.schemas s ON s.schema_id = o.schema_id
+    LEFT JOIN sys.columns c ON c.object_id = o.object_id
+    LEFT JOIN sys.types t ON t.user_type_id = c.user_type_id
+    WHERE o.type = 'U' AND o.is_ms_shipped = 0 {filter}
+    ORDER BY o.object_id, c.column_id
+"""
+
+# Cheap change check: one row per table, no column data
+MODIFY_DATES_QUERY = """
+    SELECT o.object_id, o.modify_date
+    FROM sys.objects o
+    WHERE o.type = 'U' AND o.is_ms_shipped = 0
+"""
+
+DDL_PATTERN = re.compile(r"\b(CREATE|ALTER|DROP)\s+TABLE\b|\bsp_rename\b", re.IGNORECASE)
+
+# SQL Server accepts at most 2100 parameters per statement
+MAX_IDS_PER_QUERY = 1000
+
+
+def is_ddl(sql):
+    return bool(DDL_PATTERN.search(sql))
+
+
+class SchemaCache:
+    """Table and column metadata shared by every tab.
+
+    The first load reads the whole catalog in a single query. After that,
+    sync() only compares sys.objects.modify_date per table and re-reads the
+    columns of tables that were added or altered. invalidate() marks the cache
+    stale so the next ensure() performs that check. restore() starts from a
+    saved snapshot (see schema_snapshot) instead of an empty cache.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.keys = {}
+        self.loaded = False
+        self.stale = True
+        # Names of the tables added, altered or dropped by the last sync, and
+        # whether anything changed since the cache was last saved
+        self.changed = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def ensure(self, connection):
+        # Sync only if nothing is loaded yet or a DDL change was signalled
+        if self.stale:
+            self.sync(connection)
+
+    def sync(self, connection):
+        cursor = connection.cursor()
+        try:
+            if not self.loaded:
+                cursor.execute(SCHEMA_QUERY.format(filter=""))
+                tables = self._read_tables(cursor)
+            else:
+                tables = self._sync_changed(cursor)
+        finally:
+            cursor.close()
+
+        by_name = {}
+        for table in sorted(tables.values(), key=lambda t: (t.schema != "dbo", t.schema, t.name)):
+            by_name.setdefault(table.name, table)
+        with self.lock:
+            # Unchanged tables keep their TableInfo, so identity tells what changed
+            old = self.tables
+            self.changed = {name for name in set(old) | set(by_name) if old.get(name) is not by_name.get(name)}
+            self.tables = by_name
+            # Indexes may have changed along with the tables; their keys are re-read on demand
+            self.keys = {name: keys for name, keys in self.keys.items() if name not in self.changed}
+            self.dirty = self.dirty or bool(self.changed)
+            self.loaded = True
+            self.stale = False
+
+    def restore(self, tables, keys):
+        # Load tables (in cache order) and keys saved earlier. They are served
+        # as if loaded; the caller checks them against the server with sync()
+        by_name = {}
+        for table in tables:
+            by_name.setdefault(table.name, table)
+        with self.lock:
+            self.tables = by_name
+            self.keys = dict(keys)
+            self.changed = set()
+            self.dirty = False
+            self.loaded = True
+            self.stale = False
+
+    def snapshot(self):
+        # (tables, keys) to save; marks the cache as saved
+        with self.lock:
+            self.dirty = False
+            return list(self.tables.values()), dict(self.keys)
+
+    def invalidate(self):
+        self.stale = True
+
+    def table_names(self):
+        with self.lock:
+            return sorted(self.tables, key=str.lower)
+
+    def table(self, name):
+        with self.lock:
+            return self.tables.get(name)
+
+    def columns(self, name):
+        table = self.table(name)
+        return list(table.columns) if table else []
+
+    def key_columns(self, name):
+        # None if the key of this table has not been looked up yet
+        with self.lock:
+            return self.keys.get(name)
+
+    def set_key_columns(self, name, key_columns):
+        with self.lock:
+            self.keys[name] = list(key_columns)
+            self.dirty = True
+
+    def _sync_changed(self, cursor):
+        with self.lock:
+            current = {table.object_id: table for table in self.tables.values()}
+
+        cursor.execute(MODIFY_DATES_QUERY)
+        server_dates = {row[0]: row[1] for row in cursor.fetchall()}
+
+        # Dropped tables simply disappear; new or altered ones are re-read
+        tables = {}
+        changed = []
+        for object_id, modify_date in server_dates.items():
+            table = current.get(object_id)
+            if table is not None and table.modify_date == modify_date:
+                tables[object_id] = table
+            else:
+                changed.append(object_id)
+
+        for start in range(0, len(changed), MAX_IDS_PER_QUERY):
+            chunk = changed[start:start + MAX_IDS_PER_QUERY]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(SCHEMA_QUERY.format(filter=f"AND o.object_id IN ({placeholders})"), chunk)
+            tables.update(self._read_tables(cursor))
+        return tables
+
+    def _read_tables(self, cursor):
+        tables = {}
+        for row in cursor.fetchall():
+            object_id = row[0]
+            table = tables.get(object_id)
+            if table is None:
+                table = tables[object_id] = TableInfo(object_id, row[1], row[2], row[3])
+            if row[4] is not None:
+                table.columns.append(ColumnInfo(row[4], row[5], bool(row[6]), row[7], row[8], row[9], bool(row[10])))
+        return tables
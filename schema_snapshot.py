@@ -0,0 +1,205 @@
+import datetime
+import json
+import sqlite3
+import threading
+from collections import namedtuple
+
+from schema_cache import ColumnInfo, TableInfo
+
+
+SnapshotInfo = namedtuple("SnapshotInfo", ["target", "saved_at", "tables"])
+SchemaChange = namedtuple("SchemaChange", ["kind", "table", "detail"])
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS snapshots (
+        target TEXT PRIMARY KEY,
+        saved_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS snapshot_tables (
+        target TEXT NOT NULL,
+        object_id INTEGER NOT NULL,
+        schema_name TEXT NOT NULL,
+        name TEXT NOT NULL,
+        modify_date TEXT,
+        key_columns TEXT,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (target, object_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS snapshot_columns (
+        target TEXT NOT NULL,
+        object_id INTEGER NOT NULL,
+        ordinal INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        data_type TEXT,
+        is_nullable INTEGER,
+        max_length INTEGER,
+        precision INTEGER,
+        scale INTEGER,
+        is_identity INTEGER,
+        PRIMARY KEY (target, object_id, ordinal)
+    )""",
+]
+
+
+def _date_text(value):
+    return value.isoformat() if value is not None else None
+
+
+def _parse_date(text):
+    return datetime.datetime.fromisoformat(text) if text is not None else None
+
+
+class SchemaSnapshotStore:
+    """Schema cache contents of every database connected to, in a local SQLite file.
+
+    A snapshot holds each table's object_id, modify_date, columns and known
+    key columns, keyed by the engine's target ("server/database"). Restoring
+    one lets the schema cache answer at once; its next sync then only
+    compares modify dates and re-reads the tables that changed. The file is
+    opened on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def load(self, target):
+        # (tables in cache order, {table name: key columns}, saved_at), or None
+        with self.lock:
+            conn = self._connection()
+            saved = conn.execute("SELECT saved_at FROM snapshots WHERE target = ?", (target,)).fetchone()
+            if saved is None:
+                return None
+            table_rows = conn.execute(
+                "SELECT object_id, schema_name, name, modify_date, key_columns FROM snapshot_tables "
+                "WHERE target = ? ORDER BY position",
+                (target,)
+            ).fetchall()
+            column_rows = conn.execute(
+                "SELECT object_id, name, data_type, is_nullable, max_length, precision, scale, is_identity "
+                "FROM snapshot_columns WHERE target = ? ORDER BY object_id, ordinal",
+                (target,)
+            ).fetchall()
+
+        tables = {}
+        keys = {}
+        for object_id, schema, name, modify_date, key_columns in table_rows:
+            tables[object_id] = TableInfo(object_id, schema, name, _parse_date(modify_date))
+            if key_columns is not None:
+                keys[name] = json.loads(key_columns)
+        for object_id, name, data_type, is_nullable, max_length, precision, scale, is_identity in column_rows:
+            table = tables.get(object_id)
+            if table is not None:
+                table.columns.append(ColumnInfo(
+                    name, data_type, bool(is_nullable), max_length, precision, scale, bool(is_identity)
+                ))
+        return list(tables.values()), keys, saved[0]
+
+    def save(self, target, tables, keys):
+        # Replaces the target's snapshot in one transaction
+        table_rows = [
+            (target, table.object_id, table.schema, table.name, _date_text(table.modify_date),
+             json.dumps(keys[table.name]) if table.name in keys else None, position)
+            for position, table in enumerate(tables)
+        ]
+        column_rows = [
+            (target, table.object_id, ordinal, column.name, column.data_type, int(column.is_nullable),
+             column.max_length, column.precision, column.scale, int(column.is_identity))
+            for table in tables
+            for ordinal, column in enumerate(table.columns)
+        ]
+        saved_at = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                self._delete(conn, target)
+                conn.execute("INSERT INTO snapshots (target, saved_at) VALUES (?, ?)", (target, saved_at))
+                conn.executemany("INSERT INTO snapshot_tables VALUES (?, ?, ?, ?, ?, ?, ?)", table_rows)
+                conn.executemany("INSERT INTO snapshot_columns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", column_rows)
+
+    def snapshots(self):
+        with self.lock:
+            rows = self._connection().execute(
+                "SELECT s.target, s.saved_at, COUNT(t.object_id) FROM snapshots s "
+                "LEFT JOIN snapshot_tables t ON t.target = s.target "
+                "GROUP BY s.target, s.saved_at ORDER BY s.target"
+            ).fetchall()
+        return [SnapshotInfo(*row) for row in rows]
+
+    def delete(self, target):
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                self._delete(conn, target)
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _connection(self):
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self.conn = conn
+        return self.conn
+
+    def _delete(self, conn, target):
+        for table in ("snapshots", "snapshot_tables", "snapshot_columns"):
+            conn.execute(f"DELETE FROM {table} WHERE target = ?", (target,))
+
+
+def _describe(column):
+    text = column.data_type
+    if column.max_length is not None and column.data_type.lower() in (
+            "char", "varchar", "nchar", "nvarchar", "binary", "varbinary"):
+        text += "(max)" if column.max_length == -1 else f"({column.max_length} bytes)"
+    elif column.data_type.lower() in ("decimal", "numeric"):
+        text += f"({column.precision}, {column.scale})"
+    text += " NULL" if column.is_nullable else " NOT NULL"
+    if column.is_identity:
+        text += " IDENTITY"
+    return text
+
+
+def diff_schemas(old_tables, new_tables):
+    """Differences between two lists of TableInfo, e.g. two snapshots.
+
+    Tables are matched by schema and name (case-insensitive) and columns by
+    name; returns SchemaChange(kind, "schema.table", detail) entries with
+    kind one of added, dropped and altered.
+    """
+    def by_name(tables):
+        return {f"{table.schema}.{table.name}".lower(): table for table in tables}
+
+    old, new = by_name(old_tables), by_name(new_tables)
+    changes = []
+    for name in sorted(set(old) | set(new)):
+        before, after = old.get(name), new.get(name)
+        if before is None:
+            changes.append(SchemaChange("added", f"{after.schema}.{after.name}", f"{len(after.columns)} columns"))
+            continue
+        if after is None:
+            changes.append(SchemaChange("dropped", f"{before.schema}.{before.name}", ""))
+            continue
+        label = f"{after.schema}.{after.name}"
+        old_columns = {column.name.lower(): column for column in before.columns}
+        new_columns = {column.name.lower(): column for column in after.columns}
+        for column in after.columns:
+            previous = old_columns.get(column.name.lower())
+            if previous is None:
+                changes.append(SchemaChange("altered", label, f"column {column.name} added: {_describe(column)}"))
+            elif _describe(previous) != _describe(column):
+                changes.append(SchemaChange(
+                    "altered", label, f"column {column.name}: {_describe(previous)} -> {_describe(column)}"
+                ))
+        for column in before.columns:
+            if column.name.lower() not in new_columns:
+                changes.append(SchemaChange("altered", label, f"column {column.name} dropped"))
+    return changes
@@ -0,0 +1,174 @@
+import re
+import threading
+import time
+from collections import namedtuple
+
+
+Batch = namedtuple("Batch", ["text", "count", "line"])
+BatchResult = namedtuple("BatchResult", ["number", "line", "elapsed", "result_sets", "rows_affected", "messages", "error"])
+ScriptResult = namedtuple("ScriptResult", ["batches_run", "batches_failed", "elapsed", "cancelled"])
+
+GO_PATTERN = re.compile(r"^\s*GO(?:\s+(\d+))?\s*(?:--.*)?$", re.I)
+
+
+def _scan_line(line, in_string, comment_depth):
+    # Track whether the next line starts inside a string or block comment
+    i = 0
+    while i < len(line):
+        pair = line[i:i + 2]
+        if comment_depth:
+            if pair == "*/":
+                comment_depth -= 1
+                i += 1
+            elif pair == "/*":
+                comment_depth += 1
+                i += 1
+        elif in_string:
+            if line[i] == "'":
+                in_string = False
+        elif pair == "--":
+            break
+        elif pair == "/*":
+            comment_depth += 1
+            i += 1
+        elif line[i] == "'":
+            in_string = True
+        i += 1
+    return in_string, comment_depth
+
+
+def split_batches(script):
+    """Split a script into batches on lines that hold only ``GO [count]``.
+
+    GO inside string literals and block comments is left alone, as sqlcmd
+    and SSMS do. Each Batch records its repeat count and first line number.
+    """
+    batches = []
+    lines = []
+    start = 1
+    in_string = False
+    comment_depth = 0
+    for number, line in enumerate(script.splitlines(), 1):
+        match = None if in_string or comment_depth else GO_PATTERN.match(line)
+        if match:
+            text = "\n".join(lines).strip()
+            if text:
+                batches.append(Batch(text, int(match.group(1) or 1), start))
+            lines = []
+            start = number + 1
+            continue
+        if not lines and not line.strip():
+            start = number + 1
+        lines.append(line)
+        in_string, comment_depth = _scan_line(line, in_string, comment_depth)
+
+    text = "\n".join(lines).strip()
+    if text:
+        batches.append(Batch(text, 1, start))
+    return batches
+
+
+class ScriptRunner:
+    """Runs batches in order on one pooled connection.
+
+    The session (temp tables, SET options, USE) carries over from batch to
+    batch, and each batch commits on its own, like SSMS. The connection is
+    closed when the script ends rather than returned to the pool, so none
+    of that state leaks into later calls. Every result set of
+    a batch is walked with nextset() and streamed in ``fetch_size`` chunks:
+    ``on_result_set(key, description)`` announces it and
+    ``on_rows(key, rows, done)`` delivers its rows, where key is
+    (batch number, result set number). ``on_batch_finished(BatchResult)``
+    reports timing, row counts, server messages and the error, if any.
+    All callbacks run on the calling (worker) thread.
+    """
+
+    def __init__(self, pool, batches, stop_on_error=True, fetch_size=1000,
+                 on_result_set=None, on_rows=None, on_batch_finished=None):
+        self.pool = pool
+        self.batches = batches
+        self.stop_on_error = stop_on_error
+        self.fetch_size = fetch_size
+        self.on_result_set = on_result_set
+        self.on_rows = on_rows
+        self.on_batch_finished = on_batch_finished
+        self.cancel_event = threading.Event()
+        self.cursor = None
+
+    def cancel(self):
+        # May be called from any thread; interrupts the running statement
+        self.cancel_event.set()
+        cursor = self.cursor
+        if cursor is not None:
+            try:
+                cursor.cancel()
+            except Exception:
+                pass
+
+    def run(self):
+        started = time.perf_counter()
+        batches_run = batches_failed = 0
+        with self.pool.connection(discard=True) as conn:
+            conn.autocommit = True
+            try:
+                self.cursor = conn.cursor()
+                number = 0
+                for batch in self.batches:
+                    for _ in range(batch.count):
+                        if self.cancel_event.is_set():
+                            break
+                        number += 1
+                        result = self._run_batch(number, batch)
+                        batches_run += 1
+                        if self.on_batch_finished is not None:
+                            self.on_batch_finished(result)
+                        if result.error is not None:
+                            batches_failed += 1
+                            if self.stop_on_error:
+                                self.cancel_event.set()
+                    if self.cancel_event.is_set():
+                        break
+            finally:
+                self.cursor = None
+                conn.autocommit = False
+
+        cancelled = self.cancel_event.is_set() and batches_run < sum(batch.count for batch in self.batches)
+        return ScriptResult(batches_run, batches_failed, time.perf_counter() - started, cancelled)
+
+    def _run_batch(self, number, batch):
+        cursor = self.cursor
+        started = time.perf_counter()
+        result_sets = 0
+        rows_affected = 0
+        messages = []
+        error = None
+        try:
+            cursor.execute(batch.text)
+            while True:
+                messages.extend(str(message[1]) for message in getattr(cursor, "messages", None) or [])
+                if cursor.description is not None:
+                    result_sets += 1
+                    self._stream(cursor, (number, result_sets))
+                    if self.cancel_event.is_set():
+                        break
+                elif cursor.rowcount is not None and cursor.rowcount >= 0:
+                    rows_affected += cursor.rowcount
+                if not cursor.nextset():
+                    break
+        except Exception as e:
+            error = e
+        return BatchResult(
+            number, batch.line, time.perf_counter() - started,
+            result_sets, rows_affected, messages, error
+        )
+
+    def _stream(self, cursor, key):
+        if self.on_result_set is not None:
+            self.on_result_set(key, cursor.description)
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            done = len(rows) < self.fetch_size or self.cancel_event.is_set()
+            if self.on_rows is not None:
+                self.on_rows(key, rows, done)
+            if done:
+                break
@@ -0,0 +1,106 @@
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+
+CHUNK_ROWS = 2000
+# "İ".lower() is "i" followed by a combining dot above; dropping the dot
+# lets "istanbul" find "İstanbul"
+COMBINING_DOT = "\u0307"
+
+
+def fold(text):
+    return text.lower().replace(COMBINING_DOT, "")
+
+
+class SearchChunk:
+    __slots__ = ("start", "count", "texts", "offsets")
+
+    def __init__(self, start, rows):
+        self.start = start
+        self.count = len(rows)
+        self.texts = []
+        self.offsets = []
+        for values in zip(*rows):
+            # One lowercase string per column; rows are separated by newlines,
+            # so newlines inside values become spaces
+            lowered = list(map(str.lower, values))
+            text = "\n".join(lowered)
+            if text.count("\n") != len(lowered) - 1 or COMBINING_DOT in text:
+                lowered = [fold(value).replace("\n", " ") for value in lowered]
+                text = "\n".join(lowered)
+            self.texts.append(text + "\n")
+            self.offsets.append([0] + list(accumulate(len(value) + 1 for value in lowered))[:-1])
+
+
+class SearchIndex:
+    """Per-column lowercase text of the rows loaded into a result grid.
+
+    Rows are added in chunks as they arrive. Within a chunk every column is
+    a single newline-separated string, so a search is one str.find() or
+    regex search per match over contiguous text instead of a visit to every
+    cell; a match position is mapped back to its row with a binary search.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, rows):
+        # rows are the formatted (string) rows shown in the grid
+        for start in range(0, len(rows), CHUNK_ROWS):
+            part = rows[start:start + CHUNK_ROWS]
+            self.chunks.append(SearchChunk(self.count, part))
+            self.count += len(part)
+
+    def clear(self):
+        self.chunks = []
+        self.count = 0
+
+    def matches(self, text, column=None, regex=False, start=0):
+        """Yield the matching row numbers chunk by chunk, in ascending order.
+
+        Every chunk yields a list, possibly empty, so callers can stop after
+        any chunk and resume later; chunks added meanwhile are searched too.
+        ``column`` limits the search to one column position. Raises re.error
+        for an invalid regular expression.
+        """
+        if regex:
+            pattern = re.compile(text, re.IGNORECASE | re.MULTILINE)
+            find = pattern.search
+        else:
+            needle = fold(text)
+
+        chunks = self.chunks
+        index = 0
+        while index < len(chunks):
+            chunk = chunks[index]
+            index += 1
+            if chunk.start + chunk.count <= start:
+                continue
+            columns = range(len(chunk.texts)) if column is None else [column]
+            found = set()
+            for position in columns:
+                if position >= len(chunk.texts):
+                    continue
+                haystack = chunk.texts[position]
+                offsets = chunk.offsets[position]
+                pos = 0
+                while True:
+                    if regex:
+                        match = find(haystack, pos)
+                        hit = -1 if match is None else match.start()
+                    else:
+                        hit = haystack.find(needle, pos)
+                    if hit < 0:
+                        break
+                    row = bisect_right(offsets, hit) - 1
+                    found.add(row)
+                    # Each row counts once; continue at the next row
+                    if row + 1 >= len(offsets):
+                        break
+                    pos = offsets[row + 1]
+            yield sorted(chunk.start + row for row in found if chunk.start + row >= start)
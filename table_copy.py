@@ -0,0 +1,288 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from bulk_import import build_insert_query
+from instrumentation import current_operation, set_current_operation
+from table_pager import quote_name, seek_predicate
+
+
+CopyResult = namedtuple(
+    "CopyResult",
+    ["rows_copied", "elapsed", "last_key", "resumed_after", "created", "cancelled"]
+)
+
+# Insertable columns of the target; computed and rowversion columns are
+# filled in by the server
+TARGET_COLUMNS_QUERY = """
+    SELECT c.name, c.is_identity, c.is_computed, t.name
+    FROM sys.columns c
+    JOIN sys.types t ON t.user_type_id = c.user_type_id
+    WHERE c.object_id = OBJECT_ID(?)
+    ORDER BY c.column_id
+"""
+
+GENERATED_TYPES = ("timestamp", "rowversion")
+SIZED_TYPES = ("char", "varchar", "binary", "varbinary")
+WIDE_SIZED_TYPES = ("nchar", "nvarchar")
+SCALED_TYPES = ("datetime2", "time", "datetimeoffset")
+PRECISE_TYPES = ("decimal", "numeric")
+
+
+class CopyError(Exception):
+    """A copy failed part way; everything up to ``last_key`` was committed."""
+
+    def __init__(self, error, rows_copied, last_key):
+        committed = f"{rows_copied:,} rows were committed"
+        if last_key is not None:
+            committed += f", up to key {last_key!r}; run the copy again with resume to continue"
+        super().__init__(f"{error} ({committed})")
+        self.rows_copied = rows_copied
+        self.last_key = last_key
+
+
+def column_type(column):
+    # Type of a ColumnInfo as written in a column definition
+    data_type = column.data_type.lower()
+    if data_type in SIZED_TYPES:
+        size = "max" if column.max_length == -1 else column.max_length
+    elif data_type in WIDE_SIZED_TYPES:
+        size = "max" if column.max_length == -1 else column.max_length // 2
+    elif data_type in PRECISE_TYPES:
+        return f"{data_type}({column.precision}, {column.scale})"
+    elif data_type in SCALED_TYPES:
+        size = column.scale
+    else:
+        return data_type
+    return f"{data_type}({size})"
+
+
+def create_table_sql(table_name, columns, key_columns):
+    definitions = []
+    for column in columns:
+        definition = f"{quote_name(column.name)} {column_type(column)}"
+        if column.is_identity:
+            definition += " IDENTITY(1, 1)"
+        definition += " NULL" if column.is_nullable else " NOT NULL"
+        definitions.append(definition)
+    if key_columns:
+        definitions.append(f"PRIMARY KEY ({', '.join(quote_name(name) for name in key_columns)})")
+    return f"CREATE TABLE {quote_name(table_name)} (\n    " + ",\n    ".join(definitions) + "\n)"
+
+
+def read_target_columns(connection, table_name):
+    # [(name, is_identity, insertable)], empty if the table does not exist
+    cursor = connection.cursor()
+    try:
+        cursor.execute(TARGET_COLUMNS_QUERY, quote_name(table_name))
+        return [
+            (name, bool(is_identity), not is_computed and data_type.lower() not in GENERATED_TYPES)
+            for name, is_identity, is_computed, data_type in cursor.fetchall()
+        ]
+    finally:
+        cursor.close()
+
+
+class TableCopier:
+    """Copies a table, or the result of a query, into a table on another connection.
+
+    A reader thread executes the source SELECT and fetches ``batch_size``
+    rows at a time into a queue holding at most ``queue_batches`` batches;
+    the thread calling run() takes them off and inserts each with one
+    fast_executemany call, committing every ``commit_interval`` rows. The
+    network reads from the source and the writes to the target overlap, and
+    memory is bounded by the queue.
+
+    A table is copied in key order, so after a failure or cancel ``resume``
+    continues after the highest key already in the target. ``create_target``
+    creates a missing target table from the source columns and key. Source
+    columns missing from the target are an error; computed and rowversion
+    columns of the target are skipped, and identity values are copied.
+    """
+
+    def __init__(self, source_pool, target_pool, target_table, source_table=None, columns=None,
+                 key_columns=None, query=None, batch_size=5000, commit_interval=50000, queue_batches=4,
+                 create_target=False, resume=False, progress=None, cancel_event=None):
+        if (source_table is None) == (query is None):
+            raise ValueError("Copy either a table or a query")
+        if query is not None and (create_target or resume):
+            raise ValueError("Creating the target and resuming are only possible when copying a table")
+        if resume and not key_columns:
+            raise ValueError(f"{source_table} has no primary key; a copy of it cannot be resumed")
+        self.source_pool = source_pool
+        self.target_pool = target_pool
+        self.target_table = target_table
+        self.source_table = source_table
+        self.columns = list(columns or [])
+        self.key_columns = list(key_columns or [])
+        self.query = query
+        self.batch_size = batch_size
+        self.commit_interval = max(commit_interval, batch_size)
+        self.queue_batches = max(queue_batches, 1)
+        self.create_target = create_target
+        self.resume = resume
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+    def run(self):
+        started = time.perf_counter()
+        stop = threading.Event()
+        batches = queue.Queue(self.queue_batches)
+        rows_copied = 0
+        last_key = resumed_after = None
+        created = cancelled = False
+
+        with self.target_pool.connection() as conn:
+            target_columns = read_target_columns(conn, self.target_table)
+            if not target_columns:
+                if not self.create_target:
+                    raise ValueError(f"Target table {self.target_table} does not exist")
+                conn.cursor().execute(create_table_sql(self.target_table, self.columns, self.key_columns))
+                conn.commit()
+                target_columns = read_target_columns(conn, self.target_table)
+                created = True
+            elif self.resume:
+                resumed_after = last_key = self._last_target_key(conn)
+
+            sql, params = self._source_query(resumed_after)
+            reader = threading.Thread(
+                target=self._read, args=(sql, params, batches, stop, current_operation()),
+                name="table-copy-reader", daemon=True
+            )
+            reader.start()
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            identity_insert = None
+            uncommitted = 0
+            uncommitted_key = None
+            try:
+                description = self._take(batches)
+                names, positions, key_positions, identity = self._map_columns(description, target_columns)
+                insert = build_insert_query(self.target_table, names)
+                if identity:
+                    identity_insert = f"SET IDENTITY_INSERT {quote_name(self.target_table)}"
+                    cursor.execute(identity_insert + " ON")
+                projected = positions != list(range(len(description)))
+
+                while True:
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        cancelled = True
+                        break
+                    rows = self._take(batches)
+                    if rows is None:
+                        break
+                    params = [tuple(row[pos] for pos in positions) for row in rows] if projected else rows
+                    cursor.executemany(insert, params)
+                    uncommitted += len(rows)
+                    if key_positions:
+                        uncommitted_key = tuple(rows[-1][pos] for pos in key_positions)
+                    if uncommitted >= self.commit_interval:
+                        conn.commit()
+                        rows_copied += uncommitted
+                        last_key = uncommitted_key or last_key
+                        uncommitted = 0
+                    if self.progress is not None:
+                        self.progress(rows_copied + uncommitted, time.perf_counter() - started)
+
+                conn.commit()
+                rows_copied += uncommitted
+                last_key = uncommitted_key or last_key
+            except Exception as e:
+                conn.rollback()
+                raise CopyError(e, rows_copied, last_key) from e
+            finally:
+                stop.set()
+                if identity_insert is not None:
+                    try:
+                        cursor.execute(identity_insert + " OFF")
+                    except Exception:
+                        pass
+                cursor.close()
+                reader.join()
+
+        return CopyResult(rows_copied, time.perf_counter() - started, last_key, resumed_after, created, cancelled)
+
+    def _source_query(self, after_key):
+        if self.query is not None:
+            return self.query, []
+        select_list = ", ".join(quote_name(column.name) for column in self.columns)
+        sql = f"SELECT {select_list} FROM {quote_name(self.source_table)}"
+        params = []
+        if after_key is not None:
+            seek, params = seek_predicate(self.key_columns, after_key, ">")
+            sql += f" WHERE {seek}"
+        if self.key_columns:
+            sql += " ORDER BY " + ", ".join(quote_name(name) for name in self.key_columns)
+        return sql, params
+
+    def _last_target_key(self, connection):
+        # The target is written in key order, so its highest key is where to continue
+        keys = ", ".join(quote_name(name) for name in self.key_columns)
+        order = ", ".join(quote_name(name) + " DESC" for name in self.key_columns)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT TOP (1) {keys} FROM {quote_name(self.target_table)} ORDER BY {order}")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        return tuple(row) if row is not None else None
+
+    def _map_columns(self, description, target_columns):
+        if description is None:
+            raise ValueError("The source query returns no result set")
+        target = {name.lower(): (name, is_identity, insertable) for name, is_identity, insertable in target_columns}
+        source_names = [col[0] for col in description]
+        missing = [name for name in source_names if name.lower() not in target]
+        if missing:
+            raise ValueError(f"Columns not found in {self.target_table}: {', '.join(missing)}")
+        names, positions = [], []
+        identity = False
+        for position, name in enumerate(source_names):
+            target_name, is_identity, insertable = target[name.lower()]
+            if insertable:
+                names.append(target_name)
+                positions.append(position)
+                identity = identity or is_identity
+        if not names:
+            raise ValueError(f"{self.target_table} has no insertable columns in common with the source")
+        lowered = [name.lower() for name in source_names]
+        key_positions = [lowered.index(name.lower()) for name in self.key_columns if name.lower() in lowered]
+        return names, positions, key_positions, identity
+
+    def _read(self, sql, params, batches, stop, operation):
+        # Reader thread: the description first, then row batches, then None;
+        # an exception is passed on in place of the next item
+        set_current_operation(operation)
+        try:
+            # A source query is the user's, so its session is not pooled
+            with self.source_pool.connection(discard=self.query is not None) as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(sql, params)
+                    self._put(batches, cursor.description, stop)
+                    while cursor.description is not None and not stop.is_set():
+                        rows = cursor.fetchmany(self.batch_size)
+                        if not rows:
+                            break
+                        self._put(batches, rows, stop)
+                finally:
+                    cursor.close()
+            self._put(batches, None, stop)
+        except Exception as e:
+            self._put(batches, e, stop)
+
+    def _put(self, batches, item, stop):
+        # Blocks while the queue is full, unless the writer has stopped
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _take(self, batches):
+        item = batches.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
@@ -0,0 +1,225 @@
+import math
+
+
+# Key columns of the primary key, or failing that the first unique index whose
+# key columns are all NOT NULL (NULLs would break the seek comparisons)
+SEEK_KEY_QUERY = """
+    SELECT c.name
+    FROM sys.index_columns ic
+    JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE ic.object_id = OBJECT_ID(?)
+      AND ic.key_ordinal > 0
+      AND ic.index_id = (
+          SELECT TOP 1 i.index_id
+          FROM sys.indexes i
+          WHERE i.object_id = ic.object_id
+            AND (i.is_primary_key = 1 OR i.is_unique = 1)
+            AND i.has_filter = 0
+            AND NOT EXISTS (
+                SELECT 1
+                FROM sys.index_columns ic2
+                JOIN sys.columns c2 ON c2.object_id = ic2.object_id AND c2.column_id = ic2.column_id
+                WHERE ic2.object_id = i.object_id
+                  AND ic2.index_id = i.index_id
+                  AND ic2.key_ordinal > 0
+                  AND c2.is_nullable = 1
+            )
+          ORDER BY i.is_primary_key DESC, CASE WHEN i.type = 1 THEN 0 ELSE 1 END, i.index_id
+      )
+    ORDER BY ic.key_ordinal
+"""
+
+# Row count from partition metadata; never scans the table
+ROW_COUNT_QUERY = """
+    SELECT SUM(row_count)
+    FROM sys.dm_db_partition_stats
+    WHERE object_id = OBJECT_ID(?) AND index_id IN (0, 1)
+"""
+
+
+def quote_name(name):
+    return "[" + name.replace("]", "]]") + "]"
+
+
+class TablePager:
+    """Builds one-page queries for browsing a table without an open cursor.
+
+    With a usable key the pager seeks: next/previous pages continue from the
+    last/first key of the current page, and the boundary keys of every page
+    seen are remembered so jumping back to one is also a seek. Jumping ahead
+    to a page never visited, or browsing a table without a key, falls back to
+    ``OFFSET ... FETCH NEXT`` ordered by the key (or the first column).
+
+    ``where`` (with its ``where_params``) restricts every page to matching
+    rows. ``order`` sorts by other columns; the key is appended to it as a
+    tie-breaker and pages are then always fetched with OFFSET.
+    """
+
+    def __init__(self, table_name, key_columns, page_size=100, total_rows=None, select_list="*",
+                 where=None, where_params=(), order=None):
+        self.table_name = table_name
+        self.select_list = select_list
+        self.where = where
+        self.where_params = list(where_params)
+        self.order = order
+        self.key_columns = list(key_columns)
+        self.page_size = page_size
+        self.total_rows = total_rows
+        self.page = 0
+        self.first_keys = {}
+        self.last_keys = {}
+        self.row_count = 0
+
+    @property
+    def keyed(self):
+        return bool(self.key_columns)
+
+    @property
+    def page_count(self):
+        if self.total_rows is None:
+            return None
+        return max(math.ceil(self.total_rows / self.page_size), 1)
+
+    @property
+    def has_next(self):
+        return self.row_count == self.page_size
+
+    @property
+    def has_prev(self):
+        return self.page > 0
+
+    def page_query(self, page):
+        # Returns (sql, params) that fetch the given zero-based page
+        if self.order is not None:
+            order = ", ".join([self.order] + [quote_name(col) for col in self.key_columns])
+            return self._offset_query(page, order)
+        if not self.keyed:
+            return self._offset_query(page, "1")
+
+        if page == 0:
+            return self._select_top()
+        if page in self.first_keys:
+            return self._select_top(self.first_keys[page], ">=")
+        if page - 1 in self.last_keys:
+            return self._select_top(self.last_keys[page - 1], ">")
+        if page + 1 in self.first_keys:
+            return self._select_before(self.first_keys[page + 1])
+        order = ", ".join(quote_name(col) for col in self.key_columns)
+        return self._offset_query(page, order)
+
+    def page_loaded(self, page, description, rows):
+        # Remember the boundary keys of a page that was just fetched
+        self.page = page
+        self.row_count = len(rows)
+        if not self.keyed or not rows:
+            return
+        names = [col[0] for col in description]
+        positions = [names.index(col) for col in self.key_columns]
+        self.first_keys[page] = tuple(rows[0][pos] for pos in positions)
+        self.last_keys[page] = tuple(rows[-1][pos] for pos in positions)
+
+    def full_query(self, select_list="*"):
+        # (sql, params) for every row the pager browses, in the same order
+        table = quote_name(self.table_name)
+        sql = f"SELECT {select_list} FROM {table}{self._where_clause()}"
+        if self.order is not None:
+            sql += " ORDER BY " + ", ".join([self.order] + [quote_name(col) for col in self.key_columns])
+        return sql, list(self.where_params)
+
+    def _where_clause(self, seek=None):
+        terms = [f"({term})" for term in (self.where, seek) if term]
+        return " WHERE " + " AND ".join(terms) if terms else ""
+
+    def _select_top(self, key=None, op=None):
+        table = quote_name(self.table_name)
+        order = ", ".join(quote_name(col) for col in self.key_columns)
+        if key is None:
+            sql = f"SELECT TOP ({self.page_size}) {self.select_list} FROM {table}{self._where_clause()} ORDER BY {order}"
+            return sql, list(self.where_params)
+        seek, params = self._seek_predicate(key, op)
+        where = self._where_clause(seek)
+        sql = f"SELECT TOP ({self.page_size}) {self.select_list} FROM {table}{where} ORDER BY {order}"
+        return sql, self.where_params + params
+
+    def _select_before(self, key):
+        table = quote_name(self.table_name)
+        order = ", ".join(quote_name(col) for col in self.key_columns)
+        order_desc = ", ".join(quote_name(col) + " DESC" for col in self.key_columns)
+        seek, params = self._seek_predicate(key, "<")
+        sql = (
+            f"SELECT * FROM (SELECT TOP ({self.page_size}) {self.select_list} FROM {table}"
+            f"{self._where_clause(seek)} ORDER BY {order_desc}) AS page ORDER BY {order}"
+        )
+        return sql, self.where_params + params
+
+    def _offset_query(self, page, order):
+        table = quote_name(self.table_name)
+        sql = (
+            f"SELECT {self.select_list} FROM {table}{self._where_clause()} "
+            f"ORDER BY {order} OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+        )
+        return sql, self.where_params + [page * self.page_size, self.page_size]
+
+    def _seek_predicate(self, key, op):
+        return seek_predicate(self.key_columns, key, op)
+
+
+def seek_predicate(key_columns, key, op):
+    # (k1, k2) > (a, b) expanded to: k1 >= a AND (k1 > a OR (k1 = a AND k2 > b)).
+    # The leading range term lets the optimizer seek on the first key column.
+    strict = op[0]
+    columns = [quote_name(col) for col in key_columns]
+    terms = []
+    params = []
+    for index, column in enumerate(columns):
+        parts = [f"{prev} = ?" for prev in columns[:index]]
+        params.extend(key[:index])
+        last_op = op if index == len(columns) - 1 else strict
+        parts.append(f"{column} {last_op} ?")
+        params.append(key[index])
+        terms.append("(" + " AND ".join(parts) + ")")
+    lead = f"{columns[0]} {strict}= ?"
+    return f"{lead} AND ({' OR '.join(terms)})", [key[0]] + params
+
+
+def seek_key_columns(connection, table_name):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SEEK_KEY_QUERY, quote_name(table_name))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def open_pager(connection, table_name, page_size=100, select_list="*", key_columns=None,
+               where=None, where_params=(), order=None):
+    # Runs on the DB worker thread: discovers the seek key (unless given) and row count
+    if key_columns is None:
+        key_columns = seek_key_columns(connection, table_name)
+    if where is not None:
+        # Partition stats count the whole table; a filtered count would scan
+        return TablePager(table_name, key_columns, page_size, None, select_list, where, where_params, order)
+    cursor = connection.cursor()
+    try:
+        try:
+            cursor.execute(ROW_COUNT_QUERY, quote_name(table_name))
+            total_rows = cursor.fetchone()[0]
+        except Exception:
+            # VIEW DATABASE STATE may not be granted; page count is then unknown
+            total_rows = None
+    finally:
+        cursor.close()
+    return TablePager(table_name, key_columns, page_size, total_rows, select_list, order=order)
+
+
+def fetch_page(connection, pager, page):
+    # Runs on the DB worker thread; the cursor is closed before returning
+    sql, params = pager.page_query(page)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        description = cursor.description
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return description, rows
@@ -0,0 +1,57 @@
+from collections import namedtuple
+
+
+TableStats = namedtuple(
+    "TableStats",
+    ["schema", "name", "rows", "reserved_kb", "used_kb", "indexes", "modify_date", "last_update"]
+)
+
+# Sizes and row counts of every table from partition and allocation unit
+# metadata in one query; nothing is counted or scanned. Row counts are the
+# in-row data of the heap or clustered index. Needs no VIEW DATABASE STATE.
+TABLE_STATS_QUERY = """
+    SELECT s.name, o.name,
+           SUM(CASE WHEN p.index_id IN (0, 1) AND au.type = 1 THEN p.rows ELSE 0 END),
+           SUM(au.total_pages) * 8,
+           SUM(au.used_pages) * 8,
+           (SELECT COUNT(*) FROM sys.indexes i
+            WHERE i.object_id = o.object_id AND i.index_id > 0 AND i.is_hypothetical = 0),
+           o.modify_date,
+           {last_update}
+    FROM sys.objects o
+    JOIN sys.schemas s ON s.schema_id = o.schema_id
+    LEFT JOIN sys.partitions p ON p.object_id = o.object_id
+    LEFT JOIN sys.allocation_units au
+        ON (au.type IN (1, 3) AND au.container_id = p.hobt_id)
+        OR (au.type = 2 AND au.container_id = p.partition_id)
+    WHERE o.type = 'U' AND o.is_ms_shipped = 0
+    GROUP BY o.object_id, s.name, o.name, o.modify_date
+"""
+
+# Last data change since the server started; needs VIEW SERVER STATE
+LAST_UPDATE_COLUMN = """(SELECT MAX(us.last_user_update) FROM sys.dm_db_index_usage_stats us
+            WHERE us.database_id = DB_ID() AND us.object_id = o.object_id)"""
+
+
+def read_table_stats(connection):
+    # Ordered like the schema cache: dbo first, then by schema and name
+    cursor = connection.cursor()
+    try:
+        try:
+            cursor.execute(TABLE_STATS_QUERY.format(last_update=LAST_UPDATE_COLUMN))
+        except Exception:
+            cursor.execute(TABLE_STATS_QUERY.format(last_update="NULL"))
+        stats = [TableStats(*row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    return sorted(stats, key=lambda s: (s.schema != "dbo", s.schema.lower(), s.name.lower()))
+
+
+def format_size(kb):
+    if kb is None:
+        return ""
+    if kb >= 1024 * 1024:
+        return f"{kb / (1024 * 1024):,.1f} GB"
+    if kb >= 1024:
+        return f"{kb / 1024:,.1f} MB"
+    return f"{kb:,} KB"
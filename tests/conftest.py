@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connection_pool  # noqa: E402
+import fake_odbc  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    # A fresh fake_odbc server behind every connection the code under test opens
+    fake_odbc.server = fake_odbc.Server()
+    connection_pool.driver = fake_odbc
+    yield fake_odbc.server
+    connection_pool.driver = None
@@ -0,0 +1,82 @@
+import csv
+
+import pytest
+
+from bulk_import import insert_rows
+from db_engine import DatabaseEngine
+
+
+@pytest.fixture
+def engine(server):
+    server.add_table("Orders", 0, columns=3)
+    engine = DatabaseEngine()
+    engine.connect("s", "db")
+    yield engine
+    engine.close()
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def read_rejects(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_import_inserts_every_row(engine, server, tmp_path):
+    path = write(tmp_path / "orders.csv", "col1_nvarchar,col2_int\na,1\nb,2\n")
+    result = engine.import_file("Orders", path)
+    assert (result.rows_read, result.rows_inserted, result.rows_rejected) == (2, 2, 0)
+    assert result.reject_path is None
+    assert server.table("Orders").inserted == 2
+
+
+def test_records_with_the_wrong_field_count_are_rejected(engine, server, tmp_path):
+    path = write(tmp_path / "orders.csv", "col1_nvarchar,col2_int\na,1\nb\nc,3,extra\nd,4\n")
+    result = engine.import_file("Orders", path)
+    assert (result.rows_read, result.rows_inserted, result.rows_rejected) == (4, 2, 2)
+    assert server.table("Orders").inserted == 2
+    rejects = read_rejects(result.reject_path)
+    assert rejects[0] == ["record", "col1_nvarchar", "col2_int", "error"]
+    assert rejects[1] == ["3", "b", "expected 2 fields, found 1"]
+    assert rejects[2] == ["4", "c", "3", "extra", "expected 2 fields, found 3"]
+
+
+def test_conversion_failures_are_rejected(engine, tmp_path):
+    path = write(tmp_path / "orders.tsv", "col2_int\tcol1_nvarchar\n1\ta\nten\tb\n")
+    result = engine.import_file("Orders", path, batch_size=1)
+    assert (result.rows_inserted, result.rows_rejected) == (1, 1)
+    rejects = read_rejects(result.reject_path)
+    assert rejects[1][:3] == ["3", "ten", "b"]
+    assert "col2_int" in rejects[1][3]
+
+
+def test_unknown_header_columns_fail(engine, tmp_path):
+    path = write(tmp_path / "orders.csv", "nope\n1\n")
+    with pytest.raises(ValueError, match="nope"):
+        engine.import_file("Orders", path)
+
+
+class RefusingCursor:
+    # Refuses the whole batch and then every row whose first value is negative
+    def __init__(self):
+        self.inserted = []
+
+    def execute(self, sql, params=None):
+        if params is not None:
+            if params[0] < 0:
+                raise ValueError("constraint violated")
+            self.inserted.append(params)
+
+    def executemany(self, sql, params):
+        raise ValueError("constraint violated")
+
+
+def test_insert_rows_isolates_refused_rows():
+    cursor = RefusingCursor()
+    inserted, failed = insert_rows(cursor, "INSERT", [(0, (1,)), (1, (-1,)), (2, (3,))])
+    assert inserted == 2
+    assert cursor.inserted == [(1,), (3,)]
+    assert [index for index, _ in failed] == [1]
@@ -0,0 +1,102 @@
+import pytest
+
+from change_set import ChangeSet, ConcurrencyError
+from schema_cache import ColumnInfo
+
+
+COLUMNS = [
+    ColumnInfo("id", "int", False, 4, 10, 0, False),
+    ColumnInfo("name", "nvarchar", True, 100, 0, 0, False),
+    ColumnInfo("qty", "int", False, 4, 10, 0, False),
+]
+
+
+class Connection:
+    def __init__(self, error=None):
+        self.error = error
+        self.executed = []
+        self.committed = self.rolled_back = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+        if self.error is not None:
+            raise self.error
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_statements_check_the_loaded_values():
+    change_set = ChangeSet("Orders", COLUMNS, ["id"])
+    change_set.edit((1, "a", 5), "qty", "6")
+    change_set.delete((2, None, 7))
+    (update, update_params, _, _), (delete, delete_params, _, _) = change_set.statements()
+    assert update == "UPDATE [Orders] SET [qty] = ? WHERE [id] = ? AND [qty] = ?"
+    assert update_params == [6, 1, 5]
+    assert delete == "DELETE FROM [Orders] WHERE [id] = ? AND [name] IS NULL AND [qty] = ?"
+    assert delete_params == [2, 7]
+
+
+def test_edit_rejects_keys_and_nulls():
+    change_set = ChangeSet("Orders", COLUMNS, ["id"])
+    with pytest.raises(ValueError):
+        change_set.edit((1, "a", 5), "id", "2")
+    with pytest.raises(ValueError):
+        change_set.edit((1, "a", 5), "qty", "")
+    assert len(change_set) == 0
+
+
+def test_batches_split_on_the_parameter_limit():
+    change_set = ChangeSet("Orders", COLUMNS, ["id"])
+    for key in range(5):
+        change_set.edit((key, "a", 1), "qty", "2")
+    batches = list(change_set.batches(max_params=6))
+    assert [len(keys) for _, _, keys in batches] == [2, 2, 1]
+    sql, params, keys = batches[0]
+    assert sql.startswith("SET NOCOUNT ON;")
+    assert "THROW 50001, 'change-set conflict 1', 1;" in sql
+    assert keys == [((0,), "update"), ((1,), "update")]
+
+
+def test_apply_commits_and_clears():
+    change_set = ChangeSet("Orders", COLUMNS, ["id"])
+    change_set.edit((1, "a", 5), "name", "b")
+    change_set.delete((2, "c", 7))
+    connection = Connection()
+    assert change_set.apply(connection) == (1, 1)
+    assert connection.committed
+    assert len(change_set) == 0
+
+
+def test_conflict_rolls_back_and_names_the_row():
+    change_set = ChangeSet("Orders", COLUMNS, ["id"])
+    change_set.edit((1, "a", 5), "name", "b")
+    change_set.delete((2, "c", 7))
+    connection = Connection(Exception("[42000] change-set conflict 1 (50001)"))
+    with pytest.raises(ConcurrencyError) as raised:
+        change_set.apply(connection)
+    assert raised.value.key == (2,)
+    assert connection.rolled_back and not connection.committed
+    assert len(change_set) == 2
+
+
+def test_other_errors_roll_back_unchanged():
+    change_set = ChangeSet("Orders", COLUMNS, ["id"])
+    change_set.edit((1, "a", 5), "name", "b")
+    connection = Connection(RuntimeError("deadlock"))
+    with pytest.raises(RuntimeError):
+        change_set.apply(connection)
+    assert connection.rolled_back
+    assert len(change_set) == 1
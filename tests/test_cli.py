@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import cli
+
+
+def export(tmp_path, name, extension, *options):
+    output = tmp_path / f"out{extension}"
+    code = cli.main([
+        "query", "-S", "server", "-d", "db", "--quiet",
+        "-q", f"SELECT * FROM [{name}]", "-o", str(output), *options
+    ])
+    return code, output
+
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl", ".parquet"])
+def test_export_empty_result(server, tmp_path, extension):
+    if extension == ".parquet":
+        pytest.importorskip("pyarrow")
+    server.add_table("Empty", 0, columns=4)
+    code, output = export(tmp_path, "Empty", extension)
+    assert code == 0
+    assert output.exists()
+
+
+def test_export_empty_result_parquet_keeps_schema(server, tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    server.add_table("Empty", 0, columns=4)
+    code, output = export(tmp_path, "Empty", ".parquet")
+    assert code == 0
+    table = parquet.read_table(output)
+    assert table.num_rows == 0
+    assert table.num_columns == 4
+
+
+def test_export_last_fetch_empty(server, tmp_path):
+    # 10 rows fetched 5 at a time: the third fetch returns no rows
+    server.add_table("Orders", 10, columns=3)
+    code, output = export(tmp_path, "Orders", ".jsonl", "--batch-size", "5")
+    assert code == 0
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["id"] for row in rows] == list(range(10))
@@ -0,0 +1,185 @@
+import pytest
+
+from connection_pool import ConnectionManager, ConnectionPool, PoolClosedError
+from db_engine import DatabaseEngine
+
+
+class Connection:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.executed = []
+
+    def cursor(self):
+        return Cursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, *params):
+        self.connection.executed.append(sql)
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool():
+    opened = []
+
+    def connect():
+        opened.append(Connection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, max_size=2)
+    pool.opened = opened
+    return pool
+
+
+def test_release_rolls_back_and_reuses(pool):
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    assert len(pool.opened) == 1
+    assert pool.opened[0].rollbacks == 2
+    assert not pool.opened[0].closed
+
+
+def test_connection_discard_closes(pool):
+    with pool.connection(discard=True):
+        pass
+    assert pool.opened[0].closed
+    assert pool.size == 0
+    with pool.connection():
+        pass
+    assert len(pool.opened) == 2
+
+
+def test_cursor_discard_closes_without_resetting(pool):
+    cursor = pool.cursor(discard=True)
+    cursor.enable_statistics()
+    cursor.close()
+    connection = pool.opened[0]
+    assert connection.closed
+    assert connection.executed == ["SET STATISTICS IO, TIME ON"]
+    assert pool.size == 0
+
+
+def test_cursor_resets_session_options(pool):
+    cursor = pool.cursor()
+    cursor.enable_statistics()
+    cursor.close()
+    connection = pool.opened[0]
+    assert not connection.closed
+    assert connection.executed[-1] == "SET STATISTICS IO, TIME OFF"
+    assert pool.size == 1
+
+
+def test_failed_rollback_discards(pool):
+    with pool.connection():
+        pass
+    connection = pool.opened[0]
+
+    def broken():
+        raise RuntimeError("connection lost")
+
+    connection.rollback = broken
+    with pool.connection():
+        pass
+    assert connection.closed
+    assert pool.size == 0
+
+
+def test_closed_pool_refuses(pool):
+    pool.close()
+    with pytest.raises(PoolClosedError):
+        pool.acquire()
+
+
+def test_acquire_times_out_when_full(pool):
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    pool.release(first)
+    pool.release(second)
+
+
+def test_pool_key_includes_credentials(server):
+    connections = ConnectionManager()
+    good = connections.pool("S", "Db", "sql", "sa", "right")
+    assert connections.pool("s", "db", "sql", "sa", "right") is good
+    assert connections.pool("s", "db", "sql", "sa", "wrong") is not good
+
+
+def test_borrow_closes_a_pool_it_opened_after_the_last_release(server):
+    connections = ConnectionManager()
+    first = connections.borrow("s", "other")
+    second = connections.borrow("S", "Other")
+    assert second is first
+    connections.release(first)
+    assert not first.closed
+    connections.release(second)
+    assert first.closed
+    assert connections.pools == {}
+
+
+def test_borrow_leaves_existing_pools_open(server):
+    connections = ConnectionManager()
+    pool = connections.pool("s", "db")
+    borrowed = connections.borrow("s", "db")
+    assert borrowed is pool
+    connections.release(borrowed)
+    assert not pool.closed
+
+
+def test_pool_keeps_a_borrowed_pool_open(server):
+    connections = ConnectionManager()
+    borrowed = connections.borrow("s", "db")
+    assert connections.pool("s", "db") is borrowed
+    connections.release(borrowed)
+    assert not borrowed.closed
+
+
+def test_failed_connect_forgets_the_pool(server, monkeypatch):
+    import connection_pool
+    import fake_odbc
+
+    def connect(conn_str, **kwargs):
+        if "PWD=wrong" in conn_str:
+            raise fake_odbc.Error("Login failed")
+        return fake_odbc.connect(conn_str)
+
+    monkeypatch.setattr(connection_pool, "connect", connect)
+    engine = DatabaseEngine()
+    with pytest.raises(fake_odbc.Error):
+        engine.connect("s", "db", "sql", "sa", "wrong")
+    assert engine.connections.pools == {}
+    engine.connect("s", "db", "sql", "sa", "right")
+    assert engine.connected
+    engine.close()
+
+
+def test_user_sql_does_not_return_its_connection(server):
+    server.add_table("Orders", 10, columns=3)
+    engine = DatabaseEngine()
+    engine.connect("s", "db")
+    assert engine.pool.size == 1
+    engine.fetch_all("SELECT * FROM [Orders]")
+    assert engine.pool.size == 0
+    engine.close()
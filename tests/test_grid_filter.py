@@ -0,0 +1,83 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from grid_filter import FilterError, build_order, build_predicate, build_where
+from schema_cache import ColumnInfo
+
+
+def column(name, data_type, max_length=None, precision=None, scale=None):
+    return ColumnInfo(name, data_type, True, max_length, precision, scale, False)
+
+
+NAME = column("Name", "varchar", 50)
+TITLE = column("Title", "nvarchar", 100)
+QTY = column("Qty", "int")
+PRICE = column("Price", "decimal", precision=10, scale=2)
+CREATED = column("Created", "datetime")
+STAMP = column("Stamp", "datetimeoffset", scale=7)
+DOC = column("Doc", "xml", -1)
+
+
+def test_null_filters():
+    assert build_predicate(QTY, " null ") == ("[Qty] IS NULL", [])
+    assert build_predicate(DOC, "NOT NULL") == ("[Doc] IS NOT NULL", [])
+
+
+def test_text_prefix_and_wildcards():
+    assert build_predicate(NAME, "ab") == ("[Name] LIKE CAST(? AS varchar(8000)) ESCAPE '\\'", ["ab%"])
+    assert build_predicate(TITLE, "*a_b*") == ("[Title] LIKE ? ESCAPE '\\'", ["%a\\_b%"])
+
+
+def test_operators_convert_to_the_column_type():
+    assert build_predicate(QTY, ">= 5") == ("[Qty] >= ?", [5])
+    assert build_predicate(PRICE, "!=1.50") == ("[Price] <> ?", [Decimal("1.50")])
+    assert build_predicate(NAME, "< m") == ("[Name] < CAST(? AS varchar(8000))", ["m"])
+
+
+def test_range():
+    assert build_predicate(QTY, "1..10") == ("[Qty] >= ? AND [Qty] <= ?", [1, 10])
+
+
+def test_bare_value_is_equality():
+    assert build_predicate(QTY, "7") == ("[Qty] = ?", [7])
+
+
+def test_bare_date_matches_the_whole_day():
+    sql, params = build_predicate(CREATED, "2024-05-01")
+    assert sql == "[Created] >= CAST(? AS datetime) AND [Created] < CAST(? AS datetime)"
+    assert params == [datetime.datetime(2024, 5, 1), datetime.datetime(2024, 5, 2)]
+
+
+def test_bare_date_on_datetimeoffset_is_equality():
+    assert build_predicate(STAMP, "2024-05-01") == ("[Stamp] = ?", ["2024-05-01"])
+
+
+@pytest.mark.parametrize("col, text", [
+    (QTY, "abc"),
+    (QTY, "> "),
+    (QTY, "1..x"),
+    (CREATED, "9999-12-31"),
+    (DOC, "<a/>"),
+])
+def test_bad_filters_raise_filter_error(col, text):
+    with pytest.raises(FilterError) as raised:
+        build_predicate(col, text)
+    assert raised.value.column == col.name
+
+
+def test_build_where_skips_blank_filters():
+    sql, params = build_where([NAME, QTY], {"Name": " ", "Qty": "3"})
+    assert sql == "([Qty] = ?)"
+    assert params == [3]
+    assert build_where([NAME], {"Name": ""}) == (None, [])
+    with pytest.raises(FilterError):
+        build_where([NAME], {"Missing": "1"})
+
+
+def test_build_order():
+    assert build_order([QTY], ("Qty", True)) == "[Qty] DESC"
+    assert build_order([QTY], None) is None
+    with pytest.raises(FilterError):
+        build_order([DOC], ("Doc", False))
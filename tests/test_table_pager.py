@@ -0,0 +1,39 @@
+from table_pager import quote_name, seek_predicate
+
+
+def test_quote_name_escapes_brackets():
+    assert quote_name("Order]Lines") == "[Order]]Lines]"
+
+
+def test_seek_predicate_single_key():
+    sql, params = seek_predicate(["id"], (42,), ">")
+    assert sql == "[id] >= ? AND (([id] > ?))"
+    assert params == [42, 42]
+
+
+def test_seek_predicate_composite_key():
+    sql, params = seek_predicate(["a", "b"], (1, "x"), ">")
+    assert sql == "[a] >= ? AND (([a] > ?) OR ([a] = ? AND [b] > ?))"
+    assert params == [1, 1, 1, "x"]
+
+
+def test_seek_predicate_inclusive_backwards():
+    # The last key column takes the operator as given, the others its strict form
+    sql, params = seek_predicate(["a", "b", "c"], (1, 2, 3), "<=")
+    assert sql == (
+        "[a] <= ? AND (([a] < ?) OR ([a] = ? AND [b] < ?) OR ([a] = ? AND [b] = ? AND [c] <= ?))"
+    )
+    assert params == [1, 1, 1, 2, 1, 2, 3]
+
+
+def test_seek_predicate_matches_tuple_order():
+    # Evaluate the predicate in Python against every key in a small grid
+    keys = [(a, b) for a in range(3) for b in range(3)]
+    for after in keys:
+        sql, params = seek_predicate(["a", "b"], after, ">")
+        expression = sql.replace("[a]", "a").replace("[b]", "b").replace(" = ", " == ")
+        expression = expression.replace("AND", "and").replace("OR", "or")
+        for value in params:
+            expression = expression.replace("?", repr(value), 1)
+        for a, b in keys:
+            assert eval(expression, {"a": a, "b": b}) == ((a, b) > after)